@@ -0,0 +1,1264 @@
+"""Acoes no portal: comunicacao processual, Gerenciador de Atos e anexo do oficio."""
+import re
+import time
+from pathlib import Path
+
+from comum import env_bool, normalize
+from grid import _ensure_apo_pen_grid_visible, open_apo_pen_menu
+from sessao import find_frame_with_text
+
+
+def _select_option_like(container, selectors: list[str], desired: str, fallback_first: bool = True) -> bool:
+    """Tenta selecionar uma opcao em <select> ou combobox com heuristica de substring normalizada."""
+    desired_norm = normalize(desired or "").lower().strip()
+    for sel in selectors:
+        try:
+            loc = container.locator(sel).first
+            if loc.count() == 0:
+                continue
+            tag = None
+            try:
+                tag = (loc.evaluate("el => el.tagName") or "").lower()
+            except Exception:
+                tag = None
+            if tag == "select":
+                try:
+                    options = loc.evaluate("el => Array.from(el.options||[]).map(o => ({value:o.value, text:o.textContent||''}))")
+                except Exception:
+                    options = []
+                pick_val = None
+                if options:
+                    if desired_norm:
+                        for opt in options:
+                            if desired_norm in normalize(opt.get("text", "")).lower():
+                                pick_val = opt.get("value") or opt.get("text")
+                                break
+                        if not pick_val:
+                            for opt in options:
+                                if desired_norm in normalize(opt.get("value", "")).lower():
+                                    pick_val = opt.get("value")
+                                    break
+                    if not pick_val and options and fallback_first:
+                        for opt in options:
+                            if normalize(opt.get("text", "")).strip():
+                                pick_val = opt.get("value") or opt.get("text")
+                                break
+                if pick_val is not None:
+                    try:
+                        loc.select_option(value=pick_val)
+                    except Exception:
+                        try:
+                            loc.select_option(label=pick_val)
+                        except Exception:
+                            pass
+                    try:
+                        loc.dispatch_event("change")
+                    except Exception:
+                        pass
+                    return True
+            try:
+                loc.click()
+            except Exception:
+                pass
+            if desired_norm:
+                try:
+                    loc.fill(desired)
+                    try:
+                        loc.press("Enter")
+                    except Exception:
+                        pass
+                    return True
+                except Exception:
+                    pass
+        except Exception:
+            continue
+    return False
+
+
+def open_caixa_correio_from_grid(context, page, processo: str):
+    """Abre a Caixa de Correio / Comunicacao Processual a partir da grid Em confeccao APO-PEN."""
+    try:
+        if not _ensure_apo_pen_grid_visible(page, timeout_ms=8000):
+            open_apo_pen_menu(page)
+            _ensure_apo_pen_grid_visible(page, timeout_ms=15000)
+    except Exception:
+        pass
+
+    # Filtra pelo numero do processo (mesmos seletores das funcoes existentes)
+    try:
+        inp = page.locator("input[id$='_DXFREditorcol17_I'], input[name$='$DXFREditorcol17']").first
+        inp.wait_for(state="visible", timeout=10000)
+        try:
+            inp.fill("")
+        except Exception:
+            pass
+        inp.fill(processo)
+        try:
+            inp.press("Enter")
+        except Exception:
+            pass
+    except Exception:
+        try:
+            header = page.locator("#sptMesaTrabalho_gvProcesso_DXHeadersRow0 td").filter(
+                has_text=re.compile(r"N\s*o?\s*Processo", re.I)
+            ).first
+            if header.count() > 0:
+                hid = header.get_attribute("id") or ""
+                m = re.search(r"col(\d+)$", hid)
+                if m:
+                    col_idx = m.group(1)
+                    inp = page.locator(f"#sptMesaTrabalho_gvProcesso_DXFREditorcol{col_idx}_I").first
+                    if inp.count() > 0:
+                        inp.fill(processo)
+                        try:
+                            inp.press("Enter")
+                        except Exception:
+                            pass
+        except Exception:
+            pass
+
+    # Aguarda a primeira linha
+    row = None
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            r = page.locator("#sptMesaTrabalho_gvProcesso_DXMainTable tr[id*='DXDataRow'], #gvProcesso_DXMainTable tr[id*='DXDataRow']").first
+            if r.count() > 0:
+                row = r
+                break
+        except Exception:
+            pass
+        time.sleep(0.2)
+    if row is None:
+        return page
+
+    pages_before = list(context.pages)
+    icon_selectors = [
+        "img[src*='img_notificacao' i]",
+        "img[src*='notificacao' i]",
+        "a:has(img[src*='notificacao' i])",
+    ]
+    target = None
+    for sel in icon_selectors:
+        try:
+            loc = row.locator(sel).first
+            if loc.count() == 0:
+                continue
+            try:
+                with page.expect_popup(timeout=6000) as pop_info:
+                    loc.click()
+                target = pop_info.value
+                try:
+                    target.wait_for_load_state("domcontentloaded", timeout=8000)
+                except Exception:
+                    pass
+                break
+            except Exception:
+                try:
+                    loc.click()
+                except Exception:
+                    pass
+                break
+        except Exception:
+            continue
+
+    if target is None:
+        # Detecta nova pagina
+        for _ in range(10):
+            pages_now = list(context.pages)
+            if len(pages_now) > len(pages_before):
+                try:
+                    target = [p for p in pages_now if p not in pages_before][-1]
+                except Exception:
+                    target = pages_now[-1]
+                try:
+                    target.wait_for_load_state("domcontentloaded", timeout=5000)
+                except Exception:
+                    pass
+                break
+            time.sleep(0.4)
+
+    if target is None:
+        try:
+            fr = find_frame_with_text(page, "Comunica", timeout_ms=8000)
+            target = fr
+        except Exception:
+            target = page
+    return target
+
+
+def criar_comunicacao_processual(context, page_like, dados: dict) -> bool:
+    """Preenche e cria uma nova Comunicacao Processual."""
+    processo = dados.get("processo") or ""
+    secretaria = dados.get("secretaria") or ""
+    relator = dados.get("relator") or ""
+    tipo = dados.get("tipo") or ""
+    prazo = int(dados.get("prazo") or 0) if dados.get("prazo") is not None else 0
+    desc_custom = dados.get("descricao") or ""
+    if not desc_custom:
+        desc_custom = f"Oficio {tipo} - modelo {secretaria} - gerado automaticamente".strip(" -")
+    target = page_like
+
+    # Procura container que tenha o botao 'Nova Comunicacao Processual'
+    containers = [page_like]
+    try:
+        containers.extend(list(getattr(page_like, "frames", [])))
+    except Exception:
+        pass
+    for c in containers:
+        try:
+            btn = c.get_by_role("button", name=re.compile(r"Nova\s+Comunic", re.I)).first
+            if btn.count() > 0:
+                target = c
+                break
+        except Exception:
+            continue
+
+    # Clica no botao e captura possivel popup
+    try:
+        btn = target.get_by_role("button", name=re.compile(r"Nova\s+Comunic", re.I)).first
+    except Exception:
+        btn = None
+    pages_before = list(context.pages)
+    if btn and btn.count() > 0:
+        popup_host = target if hasattr(target, "expect_popup") else None
+        if popup_host:
+            try:
+                with popup_host.expect_popup(timeout=6000) as pop_info:  # type: ignore[attr-defined]
+                    btn.click()
+                target = pop_info.value  # type: ignore[name-defined]
+                try:
+                    target.wait_for_load_state("domcontentloaded", timeout=8000)
+                except Exception:
+                    pass
+            except Exception:
+                try:
+                    btn.click()
+                except Exception:
+                    try:
+                        btn.click(force=True)
+                    except Exception:
+                        pass
+        else:
+            try:
+                btn.click()
+            except Exception:
+                try:
+                    btn.click(force=True)
+                except Exception:
+                    pass
+
+    if hasattr(target, "frames") and target not in containers:
+        try:
+            target.wait_for_load_state("domcontentloaded", timeout=8000)
+        except Exception:
+            pass
+
+    # Se nenhuma nova pagina abriu, tenta detectar mudanca de contexto
+    if hasattr(context, "pages") and target == page_like:
+        try:
+            pages_now = list(context.pages)
+            if len(pages_now) > len(pages_before):
+                target = [p for p in pages_now if p not in pages_before][-1]
+        except Exception:
+            pass
+
+    # Escolhe o container do formulario (frame ou propria pagina)
+    form_container = target
+    try:
+        frames = list(getattr(target, "frames", []))
+    except Exception:
+        frames = []
+    for fr in frames:
+        try:
+            if fr.locator("select, textarea, input").count() > 0:
+                form_container = fr
+                break
+        except Exception:
+            continue
+
+    # Destinatario
+    dest_ok = False
+    if secretaria:
+        dest_ok = _select_option_like(form_container, [
+            "select[id*='Destin' i]",
+            "select[name*='Destin' i]",
+            "select[id*='Secretaria' i]",
+            "select[name*='Secretaria' i]",
+        ], secretaria, fallback_first=True)
+        if not dest_ok:
+            try:
+                form_container.get_by_text(re.compile(re.escape(normalize(secretaria)), re.I)).first.click()
+                dest_ok = True
+            except Exception:
+                dest_ok = False
+    if not dest_ok:
+        _select_option_like(form_container, [
+            "select[id*='Destin' i]",
+            "select[name*='Destin' i]",
+        ], "", fallback_first=True)
+
+    # Relator
+    if relator:
+        _select_option_like(form_container, [
+            "select[id*='Relator' i]",
+            "select[name*='Relator' i]",
+        ], relator, fallback_first=True)
+        try:
+            cb = form_container.get_by_role("combobox", name=re.compile("Relator", re.I)).first
+            if cb.count() > 0:
+                cb.click()
+                cb.fill(relator)
+                try:
+                    cb.press("Enter")
+                except Exception:
+                    pass
+        except Exception:
+            pass
+
+    # Descricao
+    try:
+        form_container.get_by_label(re.compile(r"Descricao", re.I)).first.fill(desc_custom)
+    except Exception:
+        try:
+            form_container.locator("textarea, input[type='text']").first.fill(desc_custom)
+        except Exception:
+            pass
+
+    # Status de entrega: Urgente
+    status_done = False
+    try:
+        form_container.get_by_role("radio", name=re.compile("Urgente", re.I)).first.check()
+        status_done = True
+    except Exception:
+        try:
+            form_container.get_by_label(re.compile("Urgente", re.I)).first.check()
+            status_done = True
+        except Exception:
+            status_done = False
+    if not status_done:
+        _select_option_like(form_container, [
+            "select[id*='Status' i]",
+            "select[name*='Status' i]",
+        ], "Urgente", fallback_first=True)
+
+    # Prazo
+    if prazo:
+        desired_prazo = f"{prazo}"
+        ok_prazo = _select_option_like(form_container, [
+            "select[id*='Prazo' i]",
+            "select[name*='Prazo' i]",
+        ], desired_prazo, fallback_first=False)
+        if not ok_prazo:
+            try:
+                form_container.get_by_role("radio", name=re.compile(desired_prazo, re.I)).first.check()
+            except Exception:
+                try:
+                    form_container.get_by_text(re.compile(rf"{prazo}\s*dias", re.I)).first.click()
+                except Exception:
+                    pass
+
+    # Confirma/salva
+    saved = False
+    for sel in [
+        "button:has-text('Salvar')",
+        "button:has-text('Gravar')",
+        "button:has-text('Confirmar')",
+        "input[type='submit'][value*='Salvar' i]",
+        "input[type='submit'][value*='Gravar' i]",
+        "input[type='submit'][value*='Confirmar' i]",
+    ]:
+        try:
+            form_container.locator(sel).first.click()
+            saved = True
+            break
+        except Exception:
+            continue
+    if not saved:
+        try:
+            form_container.get_by_role("button", name=re.compile("Salvar|Confirmar|Cadastrar", re.I)).first.click()
+            saved = True
+        except Exception:
+            pass
+
+    if saved:
+        print(f"Comunicacao processual criada para o processo {processo} (prazo {prazo} dias, tipo {tipo}, secretaria {secretaria}).")
+    else:
+        print("Aviso: nao foi possivel confirmar o formulario de Comunicacao Processual.")
+    return saved
+
+def open_gerenciador_atos_from_grid(context, page, processo: str):
+    """Filter the grid by 'N° Processo' and open the Gerenciador de Atos (clip icon) popup.
+
+    Heuristics:
+    - Reuse the filter input used by open_processo_from_grid.
+    - In the first data row, look for a link to Ato/GerenciaAto.aspx or an icon that resembles a clip/attachment/atos.
+    """
+    # Ensure grid is visible (if needed, try to open 'Em confecção APO-PEN')
+    try:
+        # If grid not present, try to navigate via menu
+        if page.locator("#sptMesaTrabalho_gvProcesso_DXMainTable").count() == 0:
+            fr_menu = find_frame_with_text(page, "Processos", timeout_ms=10000)
+            fr_menu.get_by_text("Processos", exact=True).first.click(force=True)
+            time.sleep(0.5)
+            fr_menu.get_by_text(re.compile(r"Em\s*confec.*APO-?PEN", re.I)).first.click(force=True)
+            page.wait_for_load_state("domcontentloaded", timeout=20000)
+    except Exception:
+        pass
+
+    # Filter by process number
+    try:
+        inp = page.locator("input[id$='_DXFREditorcol17_I'], input[name$='$DXFREditorcol17']").first
+        inp.wait_for(state="visible", timeout=10000)
+        try:
+            inp.fill("")
+        except Exception:
+            pass
+        inp.fill(processo)
+        try:
+            inp.press("Enter")
+        except Exception:
+            pass
+    except Exception:
+        return None
+
+    # Wait for the first row
+    row = None
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            r = page.locator("#sptMesaTrabalho_gvProcesso_DXMainTable tr[id*='DXDataRow']").first
+            if r.count() > 0:
+                row = r
+                break
+        except Exception:
+            pass
+        time.sleep(0.2)
+    if row is None:
+        return None
+
+    # Try to click the Gerenciador de Atos link/icon
+    selectors = [
+        "a[href*='/Ato/GerenciaAto.aspx' i]",
+        "a[onclick*='GerenciaAto' i]",
+        "img[src*='clip' i]",
+        "img[alt*='Ato' i]",
+        "img[src*='ato' i]",
+        "img[src*='anexo' i]",
+        "a:has(img)"
+    ]
+    popup_page = None
+    for sel in selectors:
+        try:
+            loc = row.locator(sel).first
+            if loc.count() == 0:
+                continue
+            with page.expect_popup(timeout=5000) as pop_info:
+                loc.click()
+            popup_page = pop_info.value
+            try:
+                popup_page.wait_for_load_state("domcontentloaded", timeout=10000)
+            except Exception:
+                pass
+            break
+        except Exception:
+            continue
+    return popup_page
+
+
+def attach_docx_via_gerenciador_atos(context, page, processo: str, docx_path: Path) -> bool:
+    """Try to attach the DOCX via the Gerenciador de Atos popup.
+
+    Steps:
+    - Open 'Gerenciador de Atos' from the grid by clicking the clip icon (popup window).
+    - Click 'Anexar Ato' button in the popup.
+    - On the upload page, select the DOCX and click to submit.
+    Returns True on best-effort success.
+    """
+    # Se nao receber um caminho valido, tenta pegar o DOCX mais recente da pasta output
+    if not docx_path or not docx_path.exists():
+        try:
+            output_dir = Path("output")
+            latest = None
+            for p in sorted(output_dir.glob("*.docx"), key=lambda x: x.stat().st_mtime, reverse=True):
+                latest = p
+                break
+            if latest is None:
+                return False
+            docx_path = latest
+        except Exception:
+            return False
+
+    try:
+        if re.search(r"/Ato/GerenciaAto\.aspx", page.url, re.I):
+            pop = page
+        else:
+            pop = open_gerenciador_atos_from_grid(context, page, processo)
+    except Exception as e:
+        pop = None
+
+    if not pop:
+        return False
+
+    # 1) Clicar preferencialmente em 'Anexar Ato' (novo fluxo); se nao existir, tenta 'Anexar Atos'
+    clicked = False
+    for sel in [
+        "#btnAnexaAto_CD, #btnAnexaAto, #btnAnexaAto_I", # Anexar Ato (singular)
+        "button:has-text('Anexar Ato')",
+        "input[type='submit'][value*='Anexar Ato' i]",
+        # Fallbacks (fluxo antigo 'Anexar Atos')
+        "#btnAnexaAtos, #btnAnexaAtos_I",
+        "button:has-text('Anexar Atos')",
+        "input[type='submit'][value*='Anexar Atos' i]"
+    ]:
+        try:
+            loc = pop.locator(sel).first
+            if loc.count() > 0:
+                with pop.expect_navigation(url=re.compile(r"uploadato|uploadAtos", re.I), timeout=15000):
+                    loc.click()
+                clicked = True
+                break
+        except Exception:
+            continue
+
+    # If no navigation happened, try to proceed anyway on same popup
+    target = pop
+    try:
+        if re.search(r"uploadato|uploadAtos", target.url, re.I) is None:
+            # Maybe the click changed location without full navigation; wait a bit
+            try:
+                target.wait_for_url(re.compile(r"uploadato|uploadAtos", re.I), timeout=8000)
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    # 2) On upload page, set input file
+    uploaded = False
+    try:
+        # Novo fluxo simples (uploadato.aspx): input #uplAto
+        try:
+            el_simple = target.locator("#uplAto, input[name='uplAto']").first
+            if el_simple.count() > 0:
+                el_simple.set_input_files(str(docx_path.resolve()))
+                print(f"Arquivo selecionado (uplAto): {docx_path.name}")
+                try:
+                    target.evaluate("try{ if(window.UpdateUploadButton) UpdateUploadButton(); }catch(e){}")
+                except Exception:
+                    pass
+                uploaded = True
+        except Exception:
+            pass
+
+        # Preferred: click the "Selecione o(s) arquivo(s)" button and use file chooser
+        # But first, if the exact DevExpress file input id is present, set directly.
+        try:
+            el_direct = target.locator("#cbpArquivos_UplAtos_TextBox0_Input").first
+            if el_direct.count() > 0:
+                el_direct.set_input_files(str(docx_path.resolve()))
+                print(f"Arquivo selecionado para upload (id direto): {docx_path.name}")
+                try:
+                    target.evaluate("try{ if(window.UpdateUploadButton) UpdateUploadButton(); }catch(e){}")
+                except Exception:
+                    pass
+                uploaded = True
+        except Exception:
+            pass
+        if not uploaded:
+            try:
+                with target.expect_file_chooser(timeout=6000) as fc_info:
+                    # Tenta seletores exatos do ASPxUploadControl
+                    selectors = [
+                        "#cbpArquivos_UplAtos_Browse0 a",
+                        "#cbpArquivos_UplAtos_BrowseT a",
+                        "td[id^='cbpArquivos_UplAtos_Browse'] a",
+                        "td.dxucBrowseButton a",
+                        "a:has-text('Selecione o(s) arquivo(s)')"
+                    ]
+                    clicked = False
+                    for sel in selectors:
+                        loc = target.locator(sel).first
+                        if loc.count() > 0:
+                            loc.click()
+                            clicked = True
+                            break
+                    if not clicked:
+                        # Fallback: busca por texto
+                        target.get_by_text(re.compile(r"Selecione\s*o\(s\)\s*arquivo\(s\)", re.I)).first.click()
+                fc = fc_info.value
+                fc.set_files(str(docx_path.resolve()))
+                print(f"Arquivo selecionado para upload: {docx_path.name}")
+                try:
+                    target.evaluate("try{ if(window.UpdateUploadButton) UpdateUploadButton(); }catch(e){}")
+                except Exception:
+                    pass
+                uploaded = True
+            except Exception:
+                pass
+
+        if not uploaded:
+            # Fallback: set hidden input[type=file] directly (DevExpress UploadControl)
+            inp = None
+            for sel in [
+                "input[id^='cbpArquivos_UplAtos_TextBox'][id$='_Input']",
+                "input[type='file']",
+                "input[name*='File' i]",
+                "input[id*='File' i]",
+                "input[id*='upload' i]",
+                "input[id*='upl' i]",
+            ]:
+                try:
+                    el = target.query_selector(sel)
+                    if el:
+                        inp = el
+                        break
+                except Exception:
+                    continue
+            if not inp:
+                return False
+            inp.set_input_files(str(docx_path.resolve()))
+            print(f"Arquivo selecionado para upload (fallback): {docx_path.name}")
+            try:
+                target.evaluate("try{ if(window.UpdateUploadButton) UpdateUploadButton(); }catch(e){}")
+            except Exception:
+                pass
+            uploaded = True
+    except Exception:
+        return False
+
+    # Wait for classification controls to render (novo/antigo)
+    try:
+        target.wait_for_selector("#cbbTiposAtos_I, #divGvArquivos select, tr select, table select", timeout=15000)
+    except Exception:
+        pass
+
+    # 2.1) Classificar como Ofício SSG (novo fluxo); manter fallbacks antigos
+    try:
+        # Tentativa direta via DevExpress: definir valor 79 ('Ofício SSG')
+        try:
+            target.evaluate(
+                "(function(){\n"
+                "  try {\n"
+                "    var cb = (window.ASPx && ASPx.GetControlCollection) ? ASPx.GetControlCollection().GetByName('cbbTiposAtos') : (window.cbbTiposAtos || null);\n"
+                "    if (cb && cb.SetValue) { cb.SetValue('79'); cb.SetText('Ofício SSG'); return true; }\n"
+                "  } catch(e) {}\n"
+                "  try {\n"
+                "    var vi=document.getElementById('cbbTiposAtos_VI'); var ti=document.getElementById('cbbTiposAtos_I');\n"
+                "    if (vi) vi.value='79'; if (ti) ti.value='Ofício SSG'; return !!(vi||ti);\n"
+                "  } catch(e) {}\n"
+                "  return false;\n"
+                "})()"
+            )
+        except Exception:
+            pass        # Combo global da página nova (uploadato.aspx)
+        try:
+            cg = target.locator("#cbbTiposAtos_I").first
+            if cg.count() > 0:
+                try:
+                    cg.click()
+                except Exception:
+                    pass
+                try:
+                    cg.fill("Oficio SSG")
+                except Exception:
+                    pass
+                # tenta abrir dropdown e escolher explicitamente
+                try:
+                    ddbtn = target.locator("#cbbTiposAtos_B-1").first
+                    if ddbtn.count() > 0:
+                        ddbtn.click()
+                        try:
+                            target.get_by_text(re.compile(r"of[ií]cio\s*ssg", re.I)).first.click()
+                        except Exception:
+                            pass
+                except Exception:
+                    pass
+        except Exception:
+            pass
+
+        # DevExpress ASPxComboBox dentro do grid (input id termina com _cbbTipoAto_I)
+        try:
+            tipo_inp = target.locator("input[id$='_cbbTipoAto_I'], input[id*='_cbbTipoAto_I']").first
+            if tipo_inp.count() > 0:
+                try:
+                    tipo_inp.click()
+                except Exception:
+                    pass
+                try:
+                    tipo_inp.fill("Ofício SSG")
+                except Exception:
+                    pass
+                # Tenta selecionar a opção na lista suspensa, se aparecer
+                try:
+                    opt = target.get_by_text(re.compile(r"of[ií]cio\\s*ssg", re.I)).first
+                    if opt.count() > 0:
+                        opt.click()
+                except Exception:
+                    pass
+                try:
+                    tipo_inp.press("Enter")
+                except Exception:
+                    pass
+        except Exception:
+            pass
+
+        row = None
+        try:
+            row = target.locator("tr:has(select)").first
+            if row.count() == 0 and docx_path.name:
+                row = target.locator(f"tr:has-text('{docx_path.name}')").first
+        except Exception:
+            row = None
+        if row and row.count() > 0:
+            # Prefer <select>
+            try:
+                sel = row.locator("select").first
+                if sel.count() > 0:
+                    try:
+                        # tentativa direta por label
+                        sel.select_option(label=re.compile(r"of[ií]cio\s*ssg", re.I))
+                    except Exception:
+                        # busca o value cujo texto contenha 'encaminhamento'
+                        try:
+                            value = sel.evaluate("el => { const opt = Array.from(el.options).find(o => /of[ií]cio\\s*ssg/i.test(o.textContent)); return opt ? opt.value : null; }")
+                            if value:
+                                sel.select_option(value=value)
+                            else:
+                                # fallbacks
+                                try:
+                                    sel.select_option(label=re.compile(r"encaminhamento", re.I))
+                                except Exception:
+                                    sel.select_option(label="ANEXO")
+                        except Exception:
+                            for lab in (re.compile(r"encaminhamento", re.I), "ANEXO"):
+                                try:
+                                    sel.select_option(label=lab)
+                                    break
+                                except Exception:
+                                    continue
+            except Exception:
+                pass
+            # Alternativa: combobox (role)
+            try:
+                cb = row.get_by_role("combobox").first
+                if cb.count() > 0:
+                    try:
+                        # Abra as opções e clique na opção com o texto
+                        cb.click()
+                        try:
+                            target.get_by_role("option", name=re.compile(r"of[ií]cio\s*ssg", re.I)).first.click()
+                        except Exception:
+                            target.get_by_text(re.compile(r"of[ií]cio\\s*ssg", re.I)).first.click()
+                    except Exception:
+                        try:
+                            target.get_by_text(re.compile(r"encaminhamento|^\\s*anexo\\s*$", re.I)).first.click()
+                        except Exception:
+                            pass
+            except Exception:
+                pass
+            # Fallback: clicar no texto ANEXO
+            try:
+                opt = target.get_by_text(re.compile(r"of[ií]cio\\s*ssg", re.I)).first
+                if opt.count() == 0:
+                    opt = target.get_by_text(re.compile(r"encaminhamento|^\\s*anexo\\s*$", re.I)).first
+                if opt.count() > 0:
+                    opt.click()
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    # 2.9) Se já houver arquivo selecionado, tenta submeter o formulário diretamente (mais robusto)
+    try:
+        has_file = target.evaluate(
+            "(function(){ try{ var inp=document.getElementById('uplAto'); return !!(inp && inp.value && inp.value.length>0); }catch(e){ return false; } })()"
+        )
+    except Exception:
+        has_file = False
+    if has_file:
+        try:
+            with target.expect_event('dialog', timeout=120000) as d:
+                target.evaluate(
+                    "(function(){ try{ var f=document.getElementById('frm'); if(!f) return; try{ f.removeAttribute('onsubmit'); f.onsubmit=null; }catch(_e){}; try{ window.WebForm_OnSubmit=function(){return true;}; window.ValidatorOnSubmit=function(){return true;}; window.Page_BlockSubmit=false; window.Page_IsValid=true; }catch(_e){}; var t=document.getElementById('__EVENTTARGET'); if(t) t.value='btnConfirmar'; var a=document.getElementById('__EVENTARGUMENT'); if(a) a.value=''; f.submit(); }catch(e){} })()"
+                )
+            try:
+                d.value.accept()
+            except Exception:
+                pass
+        except Exception:
+            try:
+                target.evaluate(
+                    "(function(){ try{ var f=document.getElementById('frm'); if(!f) return; try{ f.removeAttribute('onsubmit'); f.onsubmit=null; }catch(_e){}; try{ window.WebForm_OnSubmit=function(){return true;}; window.ValidatorOnSubmit=function(){return true;}; window.Page_BlockSubmit=false; window.Page_IsValid=true; }catch(_e){}; var t=document.getElementById('__EVENTTARGET'); if(t) t.value='btnConfirmar'; var a=document.getElementById('__EVENTARGUMENT'); if(a) a.value=''; f.submit(); }catch(e){} })()"
+                )
+            except Exception:
+                pass
+
+    # 3) Confirm submission
+    # Espera curta para backend processar seleção
+    try:
+        target.wait_for_load_state("networkidle", timeout=8000)
+    except Exception:
+        pass
+    # Tentativa rápida via API DevExpress (btnFechar/btnCancelar.DoClick)
+    try:
+        res_close = target.evaluate(
+            "(function(){\n"
+            "  try { var coll = (window.ASPx && ASPx.GetControlCollection) ? ASPx.GetControlCollection() : null;\n"
+            "        var b = coll ? (coll.GetByName('btnFechar') || coll.GetByName('btnCancelar')) : null;\n"
+            "        if (b && b.SetEnabled) b.SetEnabled(true);\n"
+            "        if (b && b.DoClick) { b.DoClick(); return true; } } catch(e) {}\n"
+            "  try { if (window.btnFechar && btnFechar.DoClick) { btnFechar.SetEnabled && btnFechar.SetEnabled(true); btnFechar.DoClick(); return true; } } catch(e) {}\n"
+            "  try { if (window.btnCancelar && btnCancelar.DoClick) { btnCancelar.SetEnabled && btnCancelar.SetEnabled(true); btnCancelar.DoClick(); return true; } } catch(e) {}\n"
+            "  return false;\n"
+            "})();"
+        )
+        if res_close:
+            # Pequena espera para o backend
+            time.sleep(1.0)
+            return True
+    except Exception:
+        pass
+
+    # 3) Confirm submission (fluxo: Próximo -> Fechar; com fallbacks)
+    for sel in [
+        # Primeiro avanço de etapa
+        "button:has-text('Próximo')",
+        "button:has-text('Proximo')",
+        "input[type='submit'][value*='Próximo' i]",
+        "input[type='submit'][value*='Proximo' i]",
+        "a:has-text('Próximo')",
+        "a:has-text('Proximo')",
+        # Confirmação direta
+        "button:has-text('Confirmar')",
+        "input[type='submit'][value*='Confirmar' i]",
+        "a:has-text('Confirmar')",
+        # Fallbacks
+        "button:has-text('Enviar')",
+        "button:has-text('Upload')",
+        "button:has-text('Salvar')",
+        "input[type='submit'][value*='Enviar' i]",
+        "input[type='submit'][value*='Upload' i]",
+        "input[type='submit'][value*='Salvar' i]",
+    ]:
+        try:
+            target.locator(sel).first.click()
+            break
+        except Exception:
+            continue
+
+    # Extra: garantir clique em 'Confirmar' quando aparecer
+    try:
+        # Aguarda aparecer algum seletor do botão Confirmar
+        try:
+            target.wait_for_selector(
+                "#cbpArquivos_btnConfirmar, #cbpArquivos_btnConfirmar_I, input[name='cbpArquivos$btnConfirmar'], #btnConfirmar, #btnConfirmar_I",
+                timeout=8000,
+            )
+        except Exception:
+            pass
+        clicked_confirm = False
+        # Instala um handler global para aceitar qualquer alerta de sucesso que apareça tardiamente
+        accepted_alert_flag = {"v": False}
+        def _auto_accept_dialog(d):
+            try:
+                d.accept()
+            except Exception:
+                pass
+            accepted_alert_flag["v"] = True
+        try:
+            target.on("dialog", _auto_accept_dialog)
+        except Exception:
+            pass
+        # Modo forçado: envia o form diretamente (ignora validações client-side)
+        try:
+            if env_bool("FORCE_CONFIRM_UPLOAD", False):
+                print("[uploadato] FORCE_CONFIRM_UPLOAD=on -> submetendo formulario diretamente")
+                target.evaluate(
+                    "(function(){ try{ var f=document.getElementById('frm'); if(!f) return; try{ f.removeAttribute('onsubmit'); f.onsubmit=null; }catch(_e){}; try{ window.WebForm_OnSubmit=function(){return true;}; window.ValidatorOnSubmit=function(){return true;}; window.Page_BlockSubmit=false; window.Page_IsValid=true; }catch(_e){}; var t=document.getElementById('__EVENTTARGET'); if(t) t.value='btnConfirmar'; var a=document.getElementById('__EVENTARGUMENT'); if(a) a.value=''; f.submit(); }catch(e){} })()"
+                )
+                clicked_confirm = True
+        except Exception:
+            pass
+        try:
+            target.evaluate("try{ var coll=(window.ASPx&&ASPx.GetControlCollection)?ASPx.GetControlCollection():null; var b=coll?coll.GetByName('btnConfirmar'):null; if(b&&b.SetEnabled) b.SetEnabled(true);}catch(e){}")
+        except Exception:
+            pass
+        # Tentativa via API DevExpress (btnConfirmar.DoClick) com tratamento de alert
+        try:
+            res = target.evaluate(
+                "(function(){\n"
+                "  try { var coll = (window.ASPx && ASPx.GetControlCollection) ? ASPx.GetControlCollection() : null;\n"
+                "        var b = coll ? coll.GetByName('btnConfirmar') : null;\n"
+                "        if (b && b.SetEnabled) b.SetEnabled(true);\n"
+                "        if (b && b.DoClick) { b.DoClick(); } } catch(e) {}\n"
+                "  try { if (window.btnConfirmar && btnConfirmar.DoClick) { btnConfirmar.SetEnabled && btnConfirmar.SetEnabled(true); btnConfirmar.DoClick(); } } catch(e) {}\n"
+                "  try { var t=document.getElementById('__EVENTTARGET'); if(t && t.value==='btnConfirmar') return true; } catch(e) {}\n"
+                "  try { var db=document.getElementById('divBotoes'); if (db && db.style && db.style.display==='none') return true; } catch(e) {}\n"
+                "  return false;\n"
+                "})();"
+            )
+            if res:
+                print("[uploadato] DevExpress DoClick acionado e postback sinalizado (__EVENTTARGET=btnConfirmar ou divBotoes oculto).")
+                try:
+                    with target.expect_event('dialog', timeout=30000) as d:
+                        pass
+                    try:
+                        d.value.accept()
+                    except Exception:
+                        pass
+                except Exception:
+                    pass
+                clicked_confirm = True
+        except Exception:
+            pass
+
+        # Executa o handler client-side oficial para definir e.processOnServer
+        if not clicked_confirm:
+            try:
+                # Loga resultado da validacao cliente e da decisao de prosseguir
+                valid_ok = target.evaluate("(function(){ try{ return !!(window.Page_ClientValidate && Page_ClientValidate()); }catch(e){ return false; } })()")
+                try:
+                    vinfo = target.evaluate(
+                        "(function(){ try{ var arr=[]; var vs=window.Page_Validators||[]; for(var i=0;i<vs.length;i++){ var v=vs[i]; arr.push((v.id||'')+':'+(v.isvalid===false?'INVALID':'OK')); } return arr.join('|'); }catch(e){ return ''; } })()"
+                    )
+                except Exception:
+                    vinfo = ""
+                print(f"[uploadato] Page_ClientValidate: {valid_ok} Validators: {vinfo}")
+                proceed = target.evaluate(
+                    "(function(){\n"
+                    "  try { var e={processOnServer:false};\n"
+                    "        try{ if(window.Page_ClientValidate) Page_ClientValidate(); }catch(ex){}\n"
+                    "        if (typeof window.btnConfirmarClientSide_Click === 'function') { window.btnConfirmarClientSide_Click(null, e); }\n"
+                    "        return !!e.processOnServer;\n"
+                    "  } catch(err) { return false; }\n"
+                    "})();"
+                )
+                print(f"[uploadato] btnConfirmarClientSide_Click -> processOnServer={proceed}")
+                if proceed:
+                    try:
+                        with target.expect_event('dialog', timeout=30000) as d:
+                            target.evaluate("try{ if(window.WebForm_DoPostBackWithOptions){ WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions('btnConfirmar','', true, '', '', false, false)); } else { __doPostBack('btnConfirmar',''); } }catch(e){ try{ var f=document.getElementById('frm'); if(f){ f.__EVENTTARGET.value='btnConfirmar'; f.__EVENTARGUMENT.value=''; f.submit(); } }catch(_){} }")
+                        try:
+                            d.value.accept()
+                        except Exception:
+                            pass
+                    except Exception:
+                        target.evaluate("try{ if(window.WebForm_DoPostBackWithOptions){ WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions('btnConfirmar','', true, '', '', false, false)); } else { __doPostBack('btnConfirmar',''); } }catch(e){ try{ var f=document.getElementById('frm'); if(f){ f.__EVENTTARGET.value='btnConfirmar'; f.__EVENTARGUMENT.value=''; f.submit(); } }catch(_){} }")
+                    try:
+                        post = target.evaluate("(function(){ var t=document.getElementById('__EVENTTARGET'); return !!(t && t.value==='btnConfirmar'); })()")
+                    except Exception:
+                        post = True
+                    clicked_confirm = bool(post)
+            except Exception:
+                pass
+        for conf_sel in (
+            "#cbpArquivos_btnConfirmar",          # container (antigo)
+            "#cbpArquivos_btnConfirmar_I",       # input submit (antigo)
+            "input[name='cbpArquivos$btnConfirmar']",
+            "#btnConfirmar",                      # novo uploadato.aspx
+            "#btnConfirmar_I",
+            "#btnConfirmar_CD",
+        ):
+            try:
+                loc = target.locator(conf_sel).first
+                if loc.count() > 0:
+                    try:
+                        # Tenta rolar para o botao antes de clicar
+                        try:
+                            hscroll = loc.element_handle(timeout=500)
+                            if hscroll:
+                                hscroll.scroll_into_view_if_needed(timeout=1000)
+                        except Exception:
+                            pass
+                        print(f"[uploadato] Clicando Confirmar via seletor: {conf_sel}")
+                        # Tentativa adicional: aciona click programatico direto no input/container DevExpress
+                        try:
+                            if conf_sel in ("#btnConfirmar_I", "#btnConfirmar", "#btnConfirmar_CD"):
+                                target.evaluate(
+                                    "try{ var el = document.querySelector('#btnConfirmar_I') || document.querySelector('#btnConfirmar') || document.querySelector('#btnConfirmar_CD'); if(el){ el.click && el.click(); } }catch(e){}"
+                                )
+                        except Exception:
+                            pass
+                        try:
+                            with target.expect_event('dialog', timeout=30000) as d:
+                                loc.click(force=True)
+                            try:
+                                d.value.accept()
+                            except Exception:
+                                pass
+                        except Exception:
+                            loc.click(force=True)
+                        # Verifica se __EVENTTARGET foi armado para btnConfirmar (indica postback)
+                        try:
+                            armed = target.evaluate("(function(){ var t=document.getElementById('__EVENTTARGET'); return !!(t && t.value==='btnConfirmar'); })()")
+                        except Exception:
+                            armed = True
+                        clicked_confirm = bool(armed)
+                        break
+                    except Exception:
+                        try:
+                            handle = loc.element_handle(timeout=1000)
+                        except Exception:
+                            handle = None
+                        if handle is not None:
+                            try:
+                                try:
+                                    with target.expect_event('dialog', timeout=30000) as d:
+                                        target.evaluate("el => el.click()", handle)
+                                    try:
+                                        d.value.accept()
+                                    except Exception:
+                                        pass
+                                except Exception:
+                                    target.evaluate("el => el.click()", handle)
+                                try:
+                                    armed2 = target.evaluate("(function(){ var t=document.getElementById('__EVENTTARGET'); return !!(t && t.value==='btnConfirmar'); })()")
+                                except Exception:
+                                    armed2 = True
+                                clicked_confirm = bool(armed2)
+                                break
+                            except Exception:
+                                pass
+            except Exception:
+                continue
+        if not clicked_confirm:
+            # fallback WebForms: aciona __doPostBack, tentando validar cliente e aceitar alert
+            try:
+                try:
+                    target.evaluate("try{ if(window.Page_ClientValidate) Page_ClientValidate(); }catch(e){};");
+                except Exception:
+                    pass
+                if "uploadato" in (target.url or "").lower():
+                    try:
+                        with target.expect_event('dialog', timeout=30000) as d:
+                            target.evaluate("try{ if(window.WebForm_DoPostBackWithOptions){ WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions('btnConfirmar','', true, '', '', false, false)); } else { __doPostBack('btnConfirmar',''); } }catch(e){ __doPostBack('btnConfirmar',''); }")
+                        try:
+                            d.value.accept()
+                        except Exception:
+                            pass
+                    except Exception:
+                        target.evaluate("try{ if(window.WebForm_DoPostBackWithOptions){ WebForm_DoPostBackWithOptions(new WebForm_PostBackOptions('btnConfirmar','', true, '', '', false, false)); } else { __doPostBack('btnConfirmar',''); } }catch(e){ __doPostBack('btnConfirmar',''); }")
+                else:
+                    try:
+                        with target.expect_event('dialog', timeout=30000) as d:
+                            target.evaluate("__doPostBack('cbpArquivos$btnConfirmar','')")
+                        try:
+                            d.value.accept()
+                        except Exception:
+                            pass
+                    except Exception:
+                        target.evaluate("__doPostBack('cbpArquivos$btnConfirmar','')")
+                # Confirma se o postback foi armado
+                try:
+                    armed3 = target.evaluate("(function(){ var t=document.getElementById('__EVENTTARGET'); return !!(t && t.value==='btnConfirmar'); })()")
+                except Exception:
+                    armed3 = True
+                clicked_confirm = bool(armed3)
+            except Exception:
+                pass
+        if not clicked_confirm:
+            # Ultimo recurso: submeter o form diretamente
+            try:
+                try:
+                    with target.expect_event('dialog', timeout=30000) as d:
+                        target.evaluate(
+                            "try{\n"
+                            "  var f=document.getElementById('frm');\n"
+                            "  if(f){\n"
+                            "    try{ f.removeAttribute('onsubmit'); f.onsubmit=null; }catch(_e){}\n"
+                            "    try{ window.WebForm_OnSubmit=function(){return true;}; }catch(_e){}\n"
+                            "    try{ window.ValidatorOnSubmit=function(){return true;}; window.Page_BlockSubmit=false; window.Page_IsValid=true; }catch(_e){}\n"
+                            "    try{ if(f.__EVENTTARGET) f.__EVENTTARGET.value='btnConfirmar'; if(f.__EVENTARGUMENT) f.__EVENTARGUMENT.value=''; }catch(_e){}\n"
+                            "    f.submit();\n"
+                            "  }\n"
+                            "}catch(e){}"
+                        );
+                    try:
+                        d.value.accept()
+                    except Exception:
+                        pass
+                except Exception:
+                    target.evaluate(
+                        "try{ var f=document.getElementById('frm'); if(f){ try{ f.removeAttribute('onsubmit'); f.onsubmit=null; }catch(_e){}; if(f.__EVENTTARGET) f.__EVENTTARGET.value='btnConfirmar'; if(f.__EVENTARGUMENT) f.__EVENTARGUMENT.value=''; f.submit(); } }catch(e){}"
+                    );
+                clicked_confirm = True
+            except Exception:
+                pass
+        if clicked_confirm:
+            try:
+                # Espera navegacao/redirect apos confirmar (alert pode segurar ate ser aceito)
+                target.wait_for_url(re.compile(r"GerenciaAto\\.aspx", re.I), timeout=120000)
+            except Exception:
+                pass
+            try:
+                target.wait_for_load_state("networkidle", timeout=20000)
+            except Exception:
+                pass
+        # Remove handler global de dialog para nao afetar demais passos
+        try:
+            target.off("dialog", _auto_accept_dialog)  # type: ignore[attr-defined]
+        except Exception:
+            pass
+    except Exception:
+        pass
+
+    # Extra: clique explicito em 'Proximo' e depois 'Confirmar' (IDs DevExpress)
+    try:
+        for sel in (
+            "#cbpArquivos_btnProximo_CD",
+            "#cbpArquivos_btnProximo_I",
+            "input[name='cbpArquivos$btnProximo']",
+        ):
+            try:
+                loc = target.locator(sel).first
+                if loc.count() > 0:
+                    loc.click()
+                    try:
+                        target.wait_for_load_state("networkidle", timeout=8000)
+                    except Exception:
+                        pass
+                    break
+            except Exception:
+                continue
+    except Exception:
+        pass
+
+    try:
+        for sel in (
+            "#cbpArquivos_btnConfirmar",         # container div
+            "#cbpArquivos_btnConfirmar_CD",     # clickable div
+            "#cbpArquivos_btnConfirmar_I",      # input inside
+            "input[name='cbpArquivos$btnConfirmar']",
+        ):
+            try:
+                loc = target.locator(sel).first
+                if loc.count() > 0:
+                    loc.click()
+                    try:
+                        target.wait_for_load_state("networkidle", timeout=10000)
+                    except Exception:
+                        pass
+                    break
+            except Exception:
+                continue
+    except Exception:
+        pass
+
+    # 3.1) 'Fechar' só depois que Confirmar realmente foi acionado
+    # Evita fechar/"Cancelar" acidentalmente a tela de upload antes do envio
+    try:
+        on_gerencia = re.search(r"/Ato/GerenciaAto\.aspx", target.url, re.I) is not None
+    except Exception:
+        on_gerencia = False
+
+    closed_after_upload = False
+    if clicked_confirm or on_gerencia:
+        try:
+            target.wait_for_load_state("networkidle", timeout=8000)
+        except Exception:
+            pass
+        # Aguarda explicitamente aparecer 'Fechar' (mais seguro)
+        try:
+            target.wait_for_selector(
+                "#btnFechar_CD, #btnFechar, #btnFechar_I, button:has-text('Fechar'), a:has-text('Fechar')",
+                timeout=20000,
+            )
+        except Exception:
+            pass
+
+        close_selectors = [
+            "#btnFechar_CD",
+            "#btnFechar",
+            "#btnFechar_I",
+            "button:has-text('Fechar')",
+            "a:has-text('Fechar')",
+            "input[type='button'][value*='Fechar' i]",
+            "input[type='submit'][value*='Fechar' i]",
+        ]
+        # Alguns ambientes usam 'Cancelar' como 'Fechar' apenas na tela GerenciaAto
+        if on_gerencia:
+            close_selectors += ["#btnCancelar_CD", "#btnCancelar", "#btnCancelar_I"]
+
+        for sel in close_selectors:
+            try:
+                loc = target.locator(sel).first
+                if loc.count() > 0:
+                    try:
+                        loc.click()
+                    except Exception:
+                        try:
+                            h = loc.element_handle(timeout=1000)
+                        except Exception:
+                            h = None
+                        if h is not None:
+                            try:
+                                target.evaluate("el => el.click()", h)
+                            except Exception:
+                                pass
+                    closed_after_upload = True
+                    break
+            except Exception:
+                continue
+    else:
+        print("[uploadato] Nao foi possivel confirmar envio; evitando fechar/cancelar para nao abortar o anexo.")
+
+    # Give some time for server
+    time.sleep(2.0)
+    return bool(clicked_confirm and closed_after_upload)
+
+
+def attach_docx_to_portal(context, page, docx_path: Path) -> bool:
+    """Try to attach the generated DOCX in the current process UI.
+
+    This looks for an <input type=file> or a button that opens a file chooser
+    in any visible frame and attempts to upload the provided file.
+    Returns True if the file was submitted to the form.
+    """
+    if not docx_path or not docx_path.exists():
+        return False
+
+    # 1) Direct file inputs across frames (bounded, non-blocking)
+    containers = [page] + list(page.frames)
+    for c in containers:
+        try:
+            el = c.query_selector("input[type='file']")
+            if el:
+                try:
+                    el.set_input_files(str(docx_path))
+                    print(f"Arquivo anexado via input[file]: {docx_path.name}")
+                    # Try to click a likely 'Salvar'/'Enviar' afterwards
+                    for btn_text in ("Salvar", "Gravar", "Enviar", "Confirmar"):
+                        try:
+                            c.get_by_role("button", name=re.compile(btn_text, re.I)).first.click()
+                            break
+                        except Exception:
+                            continue
+                    return True
+                except Exception:
+                    pass
+        except Exception:
+            continue
+
+    # 2) Try buttons that open a file chooser
+    trigger_texts = ["Anexar", "Incluir", "Inserir", "Upload", "Novo Documento", "Adicionar"]
+    for c in containers:
+        for txt in trigger_texts:
+            try:
+                with page.expect_file_chooser(timeout=5000) as fc_info:
+                    c.get_by_role("button", name=re.compile(txt, re.I)).first.click()
+                fc = fc_info.value
+                fc.set_files(str(docx_path))
+                print(f"Arquivo selecionado para upload: {docx_path.name}")
+                # Try to confirm
+                for btn_text in ("Salvar", "Gravar", "Enviar", "Confirmar"):
+                    try:
+                        c.get_by_role("button", name=re.compile(btn_text, re.I)).first.click()
+                        break
+                    except Exception:
+                        continue
+                return True
+            except Exception:
+                continue
+
+    print("Aviso: nao foi possivel localizar interface de anexo automaticamente.")
+    return False
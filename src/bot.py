@@ -10,7 +10,8 @@ from playwright.sync_api import sync_playwright
 
 from config import load_config
 from logger import init_logger
-from selectors import DEVEXPRESS_LOADING_SELECTORS
+from planilhas import iter_processos
+from seletores import DEVEXPRESS_LOADING_SELECTORS
 
 
 def slugify(text: str) -> str:
@@ -70,68 +71,7 @@ def find_latest_excel(download_dir: Path) -> Optional[Path]:
 
 
 def extract_processes_from_excel(path: Path) -> list[str]:
-    suffix = path.suffix.lower()
-    processos: list[str] = []
-    if suffix == ".xlsx":
-        from openpyxl import load_workbook  # type: ignore
-
-        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
-        ws = wb.active
-        header = None
-        idx = None
-        for row in ws.iter_rows(values_only=True):
-            values = ["" if v is None else str(v) for v in row]
-            if header is None:
-                header = values
-                idx = find_processo_column_index(header)
-                continue
-            if idx is None or idx >= len(values):
-                continue
-            val = values[idx]
-            if val and str(val).strip():
-                processos.append(str(val).strip())
-    elif suffix == ".xls":
-        import xlrd  # type: ignore
-
-        book = xlrd.open_workbook(str(path))
-        sheet = book.sheet_by_index(0)
-        header_row = 0
-        idx = None
-        for r in range(min(5, sheet.nrows)):
-            row_vals = [str(sheet.cell_value(r, c)) for c in range(sheet.ncols)]
-            idx_try = find_processo_column_index(row_vals)
-            if idx_try is not None:
-                header_row = r
-                idx = idx_try
-                break
-        if idx is None:
-            return []
-        for r in range(header_row + 1, sheet.nrows):
-            try:
-                v = sheet.cell_value(r, idx)
-            except Exception:
-                continue
-            if v is None:
-                continue
-            txt = str(v).strip()
-            if txt:
-                processos.append(txt)
-    return processos
-
-
-def find_processo_column_index(headers: list[str]) -> Optional[int]:
-    best_idx = None
-    for i, h in enumerate(headers):
-        hl = normalize(h).strip().lower()
-        if not hl:
-            continue
-        if "processo" in hl and any(tag in hl for tag in ("n", "no", "n.", "n ", "numero")):
-            return i
-        if best_idx is None and "processo" in hl:
-            best_idx = i
-    if best_idx is not None:
-        return best_idx
-    return None
+    return list(iter_processos(path))
 
 
 def normalize(text: str) -> str:
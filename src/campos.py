@@ -0,0 +1,123 @@
+"""Tabela declarativa dos campos lidos do texto do PDF e o scanner compilado que a aplica.
+
+Cada campo tem uma lista de padroes em ordem de prioridade (o primeiro padrao que casar
+em qualquer ponto do texto vence, como nas buscas `re.search` encadeadas de antes). O
+`FieldScanner` compila a tabela uma vez e procura sobre o texto ja em minusculas com
+padroes sem IGNORECASE: o sre so usa a busca rapida por prefixo literal em padroes
+sensiveis a caixa, e e ai que estava o custo. O valor e recortado do texto original
+pela mesma posicao, entao o resultado e identico ao das buscas com IGNORECASE.
+"""
+import re
+from typing import Optional
+
+FLAGS = re.IGNORECASE | re.MULTILINE
+
+# (campo, [padroes em ordem de prioridade]); o grupo 1 de cada padrao e o valor.
+FIELD_TABLE: list[tuple[str, list[str]]] = [
+    ("processo", [
+        r"Processo\s*(?:n[oº\.]|no)?\s*[:\-]?\s*([\d./-]+)",
+        r"N[ºo]\s*[:\-]?\s*([\d./-]+)\s*Processo",
+    ]),
+    ("interessado", [
+        r"Interessado\s*[:\-]\s*(.+)",
+        r"Requerente\s*[:\-]\s*(.+)",
+    ]),
+    ("assunto", [
+        r"Assunto\s*[:\-]\s*(.+)",
+        r"Objeto\s*[:\-]\s*(.+)",
+    ]),
+    ("data_documento", [
+        r"(\b\d{1,2}/\d{1,2}/\d{4}\b)",
+        r"\b(\d{1,2}\s+de\s+[a-zcaiou]+\s+de\s+\d{4})\b",
+    ]),
+    ("cpf", [
+        r"CPF\s*[:\-]\s*([0-9.\-]{11,14})",
+        r"\b(\d{3}\.\d{3}\.\d{3}\-\d{2})\b",
+    ]),
+    ("matricula", [
+        r"Matr[ií]cula\s*[:\-]\s*([A-Za-z0-9/\.-]+)",
+        r"Registro\s*Funcional\s*[:\-]\s*([A-Za-z0-9/\.-]+)",
+        r"\bRF\b\s*[:\-]\s*([A-Za-z0-9/\.-]+)",
+    ]),
+    ("cargo", [
+        r"Cargo\s*[:\-]\s*(.+)",
+        r"Fun[cç][aã]o\s*[:\-]\s*(.+)",
+    ]),
+    ("nascimento", [
+        r"Data\s*de\s*Nascimento\s*[:\-]\s*([0-9/]{8,10})",
+        r"Nascimento\s*[:\-]\s*([0-9/]{8,10})",
+    ]),
+    ("tipo_processo", [
+        r"Tipo\s*de\s*Processo\s*[:\-]\s*(.+)",
+        r"Tipo\s*do\s*Processo\s*[:\-]\s*(.+)",
+        r"Classe\s*[:\-]\s*(.+)",
+        r"Categoria\s*[:\-]\s*(.+)",
+        r"Tipo\s*[:\-]\s*(.+)",
+    ]),
+    ("natureza", [
+        r"Natureza\s*(?:do\s*Processo)?\s*[:\-]\s*(.+)",
+        r"Classe\s*Processual\s*[:\-]\s*(.+)",
+    ]),
+    ("processo_externo", [
+        r"Proc(?:esso)?\.?\s*Externo\s*[:\-]\s*(.+)",
+        r"Processo\s*Externo\s*[:\-]\s*(.+)",
+        r"Externo\s*[:\-]\s*(.+)",
+    ]),
+    ("relator", [
+        r"Conselheiro\s*Relator\s*[:\-]\s*(.+)",
+        r"Relator\s*[:\-]\s*(.+)",
+    ]),
+    ("instancia", [
+        r"Inst[âa]ncia\s*[:\-]\s*(.+)",
+        r"Instancia\s*[:\-]\s*(.+)",
+    ]),
+]
+
+_WS = re.compile(r"\s+")
+# caracteres que o IGNORECASE equipara a letras ASCII mas que lower() nao converte
+_FOLD_SPECIAL = frozenset("ıſ")
+
+
+def _clean(value: str) -> str:
+    return _WS.sub(" ", value.strip())
+
+
+class FieldScanner:
+    def __init__(self, table: list[tuple[str, list[str]]]):
+        self.fields = [name for name, _ in table]
+        self._lower: list[list[re.Pattern]] = []
+        self._ignorecase: list[list[re.Pattern]] = []
+        for name, pats in table:
+            for p in pats:
+                if re.search(r"\\[A-Z]", p):
+                    raise ValueError(f"padrao do campo {name} usa escape maiusculo: {p}")
+            self._lower.append([re.compile(p.lower(), re.MULTILINE) for p in pats])
+            self._ignorecase.append([re.compile(p, FLAGS) for p in pats])
+
+    def scan(self, text: str) -> dict[str, str]:
+        """{campo: valor} dos campos encontrados, respeitando a prioridade dos padroes."""
+        if not text:
+            return {}
+        low = text.lower()
+        if len(low) == len(text) and not _FOLD_SPECIAL.intersection(low):
+            compiled, haystack = self._lower, low
+        else:
+            compiled, haystack = self._ignorecase, text
+        out: dict[str, str] = {}
+        for name, pats in zip(self.fields, compiled):
+            for pat in pats:
+                m = pat.search(haystack)
+                if m:
+                    out[name] = _clean(text[m.start(1):m.end(1)])
+                    break
+        return out
+
+
+_SCANNER: Optional[FieldScanner] = None
+
+
+def scan_fields(text: str) -> dict[str, str]:
+    global _SCANNER
+    if _SCANNER is None:
+        _SCANNER = FieldScanner(FIELD_TABLE)
+    return _SCANNER.scan(text)
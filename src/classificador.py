@@ -0,0 +1,233 @@
+"""Classificacao de tipo de modelo e secretaria por regras de palavras-chave.
+
+As regras ficam num arquivo YAML (padrao `docs/regras_classificacao.yaml`, ou o caminho
+em CLASSIFICACAO_REGRAS): cada uma tem um termo, o alvo (`tipo` ou `secretaria`), o valor
+atribuido, a prioridade e o escopo (`peca`, `pdf`, `capa`). Todos os termos viram um unico
+automato Aho-Corasick, e cada texto e percorrido uma vez, qualquer que seja o numero de
+regras. Todos os acertos sao devolvidos com a posicao, para explicar a decisao; vence, por
+alvo, a regra de maior prioridade com algum acerto.
+
+Os termos e os textos sao comparados na forma normalizada (`NormalizedDocument`). Com
+`espaco_flexivel`, um espaco no termo casa com qualquer sequencia de espacos/quebras de
+linha; com `palavra_inteira`, o termo nao pode estar colado a letras ou digitos.
+"""
+import bisect
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from documento import NormalizedDocument
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parents[1] / "docs" / "regras_classificacao.yaml"
+ALVOS = ("tipo", "secretaria")
+FONTES = ("peca", "pdf", "capa")
+
+_WS_RUN = re.compile(r"\s+")
+
+
+class AhoCorasick:
+    """Automato de multiplos padroes; `iter_matches` gera (inicio, fim, indice do padrao)."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        for idx, pat in enumerate(self.patterns):
+            if not pat:
+                raise ValueError("padrao vazio")
+            state = 0
+            for ch in pat:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state] += (idx,)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int, int]]:
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if out[state]:
+                end = i + 1
+                for idx in out[state]:
+                    yield end - len(patterns[idx]), end, idx
+
+
+@dataclass(frozen=True)
+class Regra:
+    termo: str
+    alvo: str
+    valor: str
+    prioridade: int = 0
+    escopo: tuple[str, ...] = ("pdf", "capa")
+    palavra_inteira: bool = False
+    espaco_flexivel: bool = False
+
+
+@dataclass(frozen=True)
+class Acerto:
+    termo: str
+    alvo: str
+    valor: str
+    prioridade: int
+    fonte: str
+    inicio: int
+    fim: int
+    trecho: str
+    regra: int  # indice da regra no arquivo (desempate)
+
+
+@dataclass(frozen=True)
+class Classificacao:
+    tipo: str
+    secretaria: str
+    acertos: tuple[Acerto, ...]
+
+    def motivo(self, alvo: str) -> Optional[Acerto]:
+        """Acerto que decidiu o alvo (None quando caiu no padrao)."""
+        valor = self.tipo if alvo == "tipo" else self.secretaria
+        melhores = [a for a in self.acertos if a.alvo == alvo and a.valor == valor]
+        return min(melhores, key=_rank) if melhores else None
+
+
+def _rank(a: Acerto) -> tuple[int, int, int]:
+    return -a.prioridade, a.regra, a.inicio
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _collapse(norm: str) -> tuple[str, list[int], list[int]]:
+    """Texto com cada sequencia de espacos trocada por ' ' e tabelas para voltar as posicoes."""
+    starts: list[int] = []  # posicao (no texto colapsado) de cada sequencia alterada
+    shifts: list[int] = []  # deslocamento acumulado apos essa sequencia
+    parts: list[str] = []
+    last = shift = 0
+    for m in _WS_RUN.finditer(norm):
+        if m.group() == " ":
+            continue
+        parts.append(norm[last:m.start()])
+        parts.append(" ")
+        starts.append(m.start() - shift)
+        shift += len(m.group()) - 1
+        shifts.append(shift)
+        last = m.end()
+    if not starts:
+        return norm, starts, shifts
+    parts.append(norm[last:])
+    return "".join(parts), starts, shifts
+
+
+def _to_raw(pos: int, starts: list[int], shifts: list[int]) -> int:
+    k = bisect.bisect_right(starts, pos - 1)
+    return pos + (shifts[k - 1] if k else 0)
+
+
+class Classificador:
+    def __init__(self, regras: Iterable[Regra], padrao: Optional[dict[str, str]] = None):
+        self.regras = list(regras)
+        self.padrao = {"tipo": "UTAP", "secretaria": "Geral", **(padrao or {})}
+        for r in self.regras:
+            if r.alvo not in ALVOS:
+                raise ValueError(f"alvo invalido na regra '{r.termo}': {r.alvo}")
+            if set(r.escopo) - set(FONTES):
+                raise ValueError(f"escopo invalido na regra '{r.termo}': {r.escopo}")
+        # termos normalizados como o texto; espacos internos viram um unico ' '
+        self._termos = [" ".join(NormalizedDocument.from_text(r.termo).norm.split()) for r in self.regras]
+        self._automato = AhoCorasick(self._termos)
+
+    def acertos(self, doc: NormalizedDocument, fonte: str) -> list[Acerto]:
+        norm = doc.norm
+        text, starts, shifts = _collapse(norm)
+        found: list[Acerto] = []
+        for ini, fim, idx in self._automato.iter_matches(text):
+            regra = self.regras[idx]
+            if fonte not in regra.escopo:
+                continue
+            a, b = _to_raw(ini, starts, shifts), _to_raw(fim - 1, starts, shifts) + 1
+            if not regra.espaco_flexivel and norm[a:b] != self._termos[idx]:
+                continue
+            if regra.palavra_inteira and (
+                (a > 0 and _is_word(norm[a - 1])) or (b < len(norm) and _is_word(norm[b]))
+            ):
+                continue
+            found.append(Acerto(regra.termo, regra.alvo, regra.valor, regra.prioridade, fonte, a, b, doc.original(a, b), idx))
+        return found
+
+    def classificar(
+        self,
+        pdf: Optional[NormalizedDocument] = None,
+        capa: Optional[NormalizedDocument] = None,
+        peca: Optional[NormalizedDocument] = None,
+    ) -> Classificacao:
+        acertos: list[Acerto] = []
+        for fonte, doc in (("peca", peca), ("pdf", pdf), ("capa", capa)):
+            if doc is not None and doc.norm:
+                acertos.extend(self.acertos(doc, fonte))
+        decisao = dict(self.padrao)
+        for alvo in ALVOS:
+            candidatos = [a for a in acertos if a.alvo == alvo]
+            if candidatos:
+                decisao[alvo] = min(candidatos, key=_rank).valor
+        return Classificacao(decisao["tipo"], decisao["secretaria"], tuple(acertos))
+
+
+def load_rules(path: Optional[Path] = None) -> Classificador:
+    """Le o arquivo de regras (YAML com `padrao` e `regras`)."""
+    import yaml
+
+    p = Path(path or os.getenv("CLASSIFICACAO_REGRAS") or DEFAULT_RULES_PATH)
+    data = yaml.safe_load(p.read_text(encoding="utf-8")) or {}
+    regras = []
+    for item in data.get("regras") or []:
+        escopo = item.get("escopo") or ["pdf", "capa"]
+        if isinstance(escopo, str):
+            escopo = [escopo]
+        regras.append(Regra(
+            termo=str(item["termo"]),
+            alvo=str(item["alvo"]),
+            valor=str(item["valor"]),
+            prioridade=int(item.get("prioridade", 0)),
+            escopo=tuple(escopo),
+            palavra_inteira=bool(item.get("palavra_inteira", False)),
+            espaco_flexivel=bool(item.get("espaco_flexivel", False)),
+        ))
+    return Classificador(regras, data.get("padrao"))
+
+
+_CLASSIFICADOR: Optional[Classificador] = None
+
+
+def get_classificador() -> Classificador:
+    global _CLASSIFICADOR
+    if _CLASSIFICADOR is None:
+        _CLASSIFICADOR = load_rules()
+    return _CLASSIFICADOR
@@ -0,0 +1,59 @@
+"""Utilitarios sem dependencias usados pelos modulos do fluxo (ambiente, nomes, datas)."""
+import os
+import re
+import unicodedata
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    v = os.getenv(name, str(default))
+    return str(v).strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def safe_filename(name: str) -> str:
+    """Return a filesystem-safe slug for filenames based on a label like o número do processo."""
+    if not name:
+        return "arquivo"
+    # Replace path separators and illegal chars
+    s = re.sub(r"[\\/]+", "_", str(name))
+    s = re.sub(r"[^\w\-. ]+", "_", s, flags=re.UNICODE)
+    s = s.strip().strip("._")
+    return s or "arquivo"
+
+
+def normalize(s: str) -> str:
+    if s is None:
+        return ""
+    s = str(s)
+    s = s.replace("º", "o").replace("°", "o").replace("ª", "a")
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join([c for c in s if not unicodedata.combining(c)])
+    return s
+
+
+def _pt_data_extenso_from_ddmmyyyy(s: str) -> str:
+    """Converte 'dd/mm/yyyy' ou 'd/m/yyyy' para 'd de <mês> de yyyy' em PT-BR.
+    Se não conseguir converter, retorna a string original.
+    """
+    try:
+        parts = re.split(r"[/-]", s.strip())
+        if len(parts) != 3:
+            return s
+        d = int(parts[0])
+        m = int(parts[1])
+        y = int(parts[2])
+        meses = [
+            "janeiro", "fevereiro", "março", "abril", "maio", "junho",
+            "julho", "agosto", "setembro", "outubro", "novembro", "dezembro",
+        ]
+        if 1 <= m <= 12:
+            return f"{d} de {meses[m-1]} de {y}"
+        return s
+    except Exception:
+        return s
+
+
+def _env_int(name: str, default: int = 0) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
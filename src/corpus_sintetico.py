@@ -0,0 +1,353 @@
+"""Corpus sintetico de pecas de processos APO-PEN, com gabarito, para testes e benchmarks.
+
+Cada documento combina um dos 12 modelos da pasta `modelos_*` (tipo x secretaria, lidos
+direto do XML do .docx/.dotx) com um cabecalho de campos em formatos variados, um
+despacho com as palavras-chave do tipo e, opcionalmente, uma data de decadencia. As
+variacoes imitam o texto que sai dos PDFs: caixa alta, rotulos com ':' ou '-' e "(a)",
+celulas de tabela juntadas numa linha, quebras de linha no meio de expressoes, espacos
+duplos e datas por extenso. A geracao e
+deterministica para a mesma semente.
+
+Para testes de carga (`tools/gerar_corpus.py`), os documentos tambem podem ser gravados
+como PDFs no layout do fluxo principal (`<processo>-ultimo-ato.pdf`, `-primeiro-ato.pdf`,
+`-pecas.json`) e como planilhas de exportacao APO-PEN (.xlsx e .xls).
+"""
+import json
+import random
+import re
+import textwrap
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PASTAS_TIPO = {
+    "modelos_utap": "UTAP",
+    "modelos_dilacao": "DILACAO",
+    "modelos_reiteracao": "REITERACAO",
+    "modelos_juizo": "JUIZO",
+}
+SECRETARIAS = ("Educação", "Saúde", "Geral")
+
+# campos do gabarito comparados no benchmark (chaves de parse_fields_from_pdf_text)
+CAMPOS = (
+    "{{NUM_PROCESSO}}",
+    "{{INTERESSADO}}",
+    "{{ASSUNTO}}",
+    "{{CPF}}",
+    "{{MATRICULA}}",
+    "@@nome_relator",
+    "@@instancia",
+)
+
+NOMES = (
+    "Maria Aparecida Lima", "José Carlos Pereira", "Ana Paula Rocha", "João Batista Nunes",
+    "Luiza Helena Prado", "Antônio Marcos Vieira", "Francisca Oliveira Dias", "Paulo Roberto Alves",
+    "Márcia Regina Teixeira", "Sebastião Ferreira Costa", "Conceição de Jesus Melo", "Raimundo Nonato Silva",
+)
+RELATORES = ("Roberto Braguim", "Domingos Dissei", "Eduardo Tuma", "Ricardo Torres", "João Antonio")
+ASSUNTOS = (
+    "Aposentadoria voluntária", "Aposentadoria por invalidez", "Pensão por morte",
+    "Revisão de aposentadoria", "Aposentadoria especial de professor",
+)
+INSTANCIAS = ("1ª Instância", "2ª Instância", "Pleno")
+ORGAOS_GERAIS = (
+    "Secretaria Municipal de Habitação", "Secretaria Municipal da Fazenda",
+    "Secretaria Municipal de Gestão", "Subprefeitura da Lapa",
+)
+MESES = (
+    "janeiro", "fevereiro", "marco", "abril", "maio", "junho",
+    "julho", "agosto", "setembro", "outubro", "novembro", "dezembro",
+)
+
+DESPACHOS = {
+    "UTAP": (
+        "Ressaltamos que o processo retorna para as providências apontadas pela UTAP.",
+        "Conforme o entendimento da Auditoria, devolvam-se os autos para providências.",
+    ),
+    "DILACAO": (
+        "Autorizo a dilação de prazo por 60 (sessenta) dias, conforme solicitado.",
+        "AUTORIZO A PRORROGAÇÃO do prazo pelo período requerido.",
+        "Autorizo a solicitação de dilação de prazo formulada pela Origem.",
+    ),
+    "REITERACAO": (
+        "Reitere-se o ofício anteriormente encaminhado.",
+        "Considerando o tempo decorrido sem resposta, reitere-se a solicitação.",
+        "Por se tratar de providências já solicitadas, oficiar a Chefia de Gabinete.",
+    ),
+    "JUIZO": (
+        "DECISÃO DE JUÍZO SINGULAR\nJulgo legal o ato de aposentadoria.",
+        "Em Juízo\nSingular, julgo regular o ato concessório.",
+    ),
+}
+PROSA = (
+    "Trata o presente de análise do ato concessório de benefício previdenciário.",
+    "A Auditoria manifestou-se pela regularidade do cálculo dos proventos.",
+    "O processo foi instruído com a documentação funcional do servidor.",
+    "Encaminhem-se os autos à Subsecretaria-Geral para as providências cabíveis.",
+    "Os documentos juntados atendem ao disposto na legislação vigente.",
+    "Publique-se e, após, arquive-se.",
+)
+
+
+def _docx_paragraphs(path: Path) -> list[str]:
+    with zipfile.ZipFile(path) as z:
+        xml = z.read("word/document.xml").decode("utf-8")
+    paras = (re.sub(r"<[^>]+>", "", p) for p in re.findall(r"<w:p[ >].*?</w:p>", xml, flags=re.S))
+    return [p.strip() for p in paras if p.strip()]
+
+
+def carregar_modelos(root: Path = ROOT) -> list[dict]:
+    """Os modelos de oficio com tipo, secretaria e paragrafos do corpo."""
+    modelos = []
+    for pasta, tipo in PASTAS_TIPO.items():
+        arquivos = sorted(p for p in (root / pasta).glob("*") if p.suffix.lower() in (".docx", ".dotx"))
+        for arq in arquivos:
+            sec = next((s for s in SECRETARIAS if arq.stem.endswith(s)), "Geral")
+            try:
+                paras = _docx_paragraphs(arq)
+            except Exception:
+                paras = []
+            modelos.append({"tipo": tipo, "secretaria": sec, "arquivo": arq.name, "paragrafos": paras})
+    return modelos
+
+
+def _cpf(rnd: random.Random) -> str:
+    d = [rnd.randint(0, 9) for _ in range(11)]
+    return f"{d[0]}{d[1]}{d[2]}.{d[3]}{d[4]}{d[5]}.{d[6]}{d[7]}{d[8]}-{d[9]}{d[10]}"
+
+
+def _rotulo(rnd: random.Random, nome: str, valor: str) -> str:
+    nome = nome.upper() if rnd.random() < 0.3 else nome
+    sep = rnd.choice((": ", " - ", ":  ", " : "))
+    return f"{nome}{sep}{valor}"
+
+
+def _data_extenso(d: date) -> str:
+    return f"{d.day} de {MESES[d.month - 1]} de {d.year}"
+
+
+def _quebra(rnd: random.Random, texto: str) -> str:
+    """Simula a quebra de linha/espacamento irregular de PDFs numa frase."""
+    if rnd.random() < 0.2 and " " in texto:
+        i = rnd.choice([m.start() for m in re.finditer(" ", texto)])
+        return texto[:i] + rnd.choice(("\n", "  ", " \n")) + texto[i + 1:]
+    return texto
+
+
+def _preencher(paragrafo: str, valores: dict[str, str]) -> str:
+    return re.sub(r"@@\w+", lambda m: valores.get(m.group(0), ""), paragrafo)
+
+
+def gerar_documento(rnd: random.Random, modelo: dict, seq: int, paginas_prosa: int = 1) -> dict:
+    """Um documento (texto do ultimo PDF, capa, nome da peca) e o gabarito."""
+    tipo, secretaria = modelo["tipo"], modelo["secretaria"]
+    ano = rnd.randint(2015, 2025)
+    processo = f"TC/{seq + 1:06d}/{ano}"  # unico por documento, mesmo com 100k linhas
+    interessado = rnd.choice(NOMES)
+    assunto = rnd.choice(ASSUNTOS)
+    relator = rnd.choice(RELATORES)
+    instancia = rnd.choice(INSTANCIAS)
+    cpf = _cpf(rnd)
+    matricula = f"{rnd.randint(100, 999)}.{rnd.randint(100, 999)}-{rnd.randint(0, 9)}"
+    data_doc = date(ano, 1, 1) + timedelta(days=rnd.randint(0, 360))
+
+    header = [
+        f"Processo nº {processo.split('/', 1)[1]}" if rnd.random() < 0.5 else f"PROCESSO Nº: {processo.split('/', 1)[1]}",
+        _rotulo(rnd, "Interessado(a)" if rnd.random() < 0.1 else "Interessado", interessado),
+        _rotulo(rnd, "Assunto", assunto),
+        _rotulo(rnd, "CPF", cpf) if rnd.random() < 0.8 else f"servidor(a) inscrito(a) no CPF sob o nº {cpf}",
+        _rotulo(rnd, "Matrícula", matricula),
+        _rotulo(rnd, "Conselheiro Relator" if rnd.random() < 0.8 else "Relator", relator),
+        _rotulo(rnd, "Instância", instancia),
+    ]
+    rnd.shuffle(header)
+    if rnd.random() < 0.1:
+        # celulas de tabela que o extrator junta numa linha so
+        i = rnd.randrange(len(header) - 1)
+        header[i:i + 2] = [f"{header[i]}   {header[i + 1]}"]
+    data_txt = _data_extenso(data_doc) if rnd.random() < 0.3 else data_doc.strftime("%d/%m/%Y")
+
+    valores = {
+        "@@processo": processo, "@@Nome_interessado": interessado, "@@nome_relator": relator,
+        "@@instancia": instancia, "@@Tipo_Processo": assunto, "@@data_extenso": _data_extenso(data_doc),
+    }
+    corpo = [_preencher(p, valores) for p in modelo["paragrafos"] if not p.startswith("@@")]
+    corpo = [p for p in corpo if not re.match(r"(Processo|Assunto|Conselheiro|Inst[aâ]ncia|Proc\.)", p)]
+    if secretaria == "Geral":
+        orgao = rnd.choice(ORGAOS_GERAIS)
+        corpo = [p.replace("{ÓRGÃO}", orgao).replace("{NOME}", rnd.choice(NOMES)) for p in corpo]
+        corpo = [p for p in corpo if "{" not in p]
+
+    decadencia: Optional[date] = None
+    linhas_decad = []
+    if rnd.random() < 0.7:
+        decadencia = data_doc + timedelta(days=rnd.randint(30, 1800))
+        fmt = decadencia.strftime("%d/%m/%Y")
+        linhas_decad.append(rnd.choice((
+            f"Prazo de decadência: {fmt}",
+            f"Data limite: {fmt}",
+            f"O ato decai em {fmt}.",
+        )))
+
+    prosa = [rnd.choice(PROSA) for _ in range(8 * max(0, paginas_prosa))]
+    despacho = _quebra(rnd, rnd.choice(DESPACHOS[tipo]))
+    texto = "\n".join(["TRIBUNAL DE CONTAS DO MUNICÍPIO DE SÃO PAULO", *header, f"São Paulo, {data_txt}",
+                       *prosa, despacho, *linhas_decad, *corpo])
+
+    capa_orgao = {
+        "Educação": "Secretaria Municipal de Educação - SME",
+        "Saúde": "Secretaria Municipal da Saúde - SMS",
+        "Geral": rnd.choice(ORGAOS_GERAIS),
+    }[secretaria]
+    capa = "\n".join(["CAPA DO PROCESSO", f"Processo {processo}", f"Órgão de origem: {capa_orgao}"])
+    peca = {
+        "JUIZO": "Decisão de Juízo Singular",
+        "UTAP": rnd.choice(("Despacho", "MANUTAP-OF 123/2024")),
+    }.get(tipo, rnd.choice(("Despacho", "Despacho do Relator", "Informação")))
+
+    return {
+        "id": f"doc-{seq:06d}",
+        "processo": processo,
+        "modelo": modelo["arquivo"],
+        "texto": texto,
+        "capa": capa,
+        "peca": peca,
+        "verdade": {
+            "tipo": tipo,
+            "secretaria": secretaria,
+            "data_decadencia": decadencia.strftime("%d/%m/%Y") if decadencia else "",
+            "{{NUM_PROCESSO}}": processo.split("/", 1)[1],
+            "{{INTERESSADO}}": interessado,
+            "{{ASSUNTO}}": assunto,
+            "{{CPF}}": cpf,
+            "{{MATRICULA}}": matricula,
+            "@@nome_relator": relator,
+            "@@instancia": instancia,
+        },
+    }
+
+
+def gerar_corpus(n: int, seed: int = 1234, paginas_prosa: int = 1, root: Path = ROOT) -> Iterator[dict]:
+    """Gera `n` documentos percorrendo os 12 modelos em rodizio."""
+    modelos = carregar_modelos(root)
+    if not modelos:
+        raise FileNotFoundError(f"nenhum modelo encontrado em {root}/modelos_*")
+    rnd = random.Random(seed)
+    for i in range(n):
+        yield gerar_documento(rnd, modelos[i % len(modelos)], i, paginas_prosa)
+
+
+# --- PDFs ---------------------------------------------------------------------------
+
+_PDF_LINHAS_POR_PAGINA = 52
+_PDF_COLUNAS = 95
+
+
+def _pdf_str(linha: str) -> bytes:
+    raw = linha.encode("cp1252", "replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def escrever_pdf(path: Path, texto: str) -> None:
+    """PDF minimo (Helvetica, WinAnsi) com uma linha de texto por linha do documento."""
+    linhas: list[str] = []
+    for par in texto.split("\n"):
+        linhas.extend(textwrap.wrap(par, _PDF_COLUNAS) or [""])
+    paginas = [linhas[i:i + _PDF_LINHAS_POR_PAGINA] for i in range(0, len(linhas), _PDF_LINHAS_POR_PAGINA)] or [[]]
+
+    objs: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Pages, preenchido abaixo
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for pag in paginas:
+        stream = b"BT /F1 10 Tf 14 TL 50 800 Td " + b" T* ".join(_pdf_str(l) + b" Tj" for l in pag) + b" ET"
+        objs.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objs.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objs))
+        )
+        kids.append(len(objs))
+    objs[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    Path(path).write_bytes(bytes(out))
+
+
+def _slug(processo: str) -> str:
+    """Mesmo slug de `comum.safe_filename`."""
+    s = re.sub(r"[\\/]+", "_", str(processo))
+    s = re.sub(r"[^\w\-. ]+", "_", s, flags=re.UNICODE)
+    return s.strip().strip("._") or "arquivo"
+
+
+def escrever_pdfs(doc: dict, pasta: Path) -> None:
+    """Grava os PDFs e o -pecas.json de um documento no layout lido por offline_regen."""
+    slug = _slug(doc["processo"])
+    escrever_pdf(pasta / f"{slug}-ultimo-ato.pdf", doc["texto"])
+    escrever_pdf(pasta / f"{slug}-primeiro-ato.pdf", doc["capa"])
+    meta = {"processo": doc["processo"], "ultimo_titulo": doc["peca"]}
+    (pasta / f"{slug}-pecas.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+
+# --- planilhas de exportacao APO-PEN --------------------------------------------------
+
+COLUNAS_APO_PEN = (
+    "Nº Processo", "Interessado", "Assunto", "Relator", "Órgão", "Tipo", "Data Autuação", "Situação",
+)
+XLS_MAX_LINHAS = 65535  # limite do formato .xls (65536 linhas com o cabecalho)
+
+
+def linha_planilha(doc: dict) -> list[str]:
+    v = doc["verdade"]
+    return [
+        doc["processo"], v["{{INTERESSADO}}"], v["{{ASSUNTO}}"], v["@@nome_relator"],
+        v["secretaria"], v["tipo"], doc["processo"].rsplit("/", 1)[-1], "Em confecção APO-PEN",
+    ]
+
+
+def escrever_xlsx(path: Path, linhas: Iterable[list[str]]) -> int:
+    """Grava em modo write_only (memoria constante); retorna o numero de linhas de dados."""
+    from openpyxl import Workbook  # type: ignore
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("APO-PEN")
+    ws.append(list(COLUNAS_APO_PEN))
+    n = 0
+    for linha in linhas:
+        ws.append(linha)
+        n += 1
+    wb.save(str(path))
+    return n
+
+
+def escrever_xls(path: Path, linhas: Iterable[list[str]]) -> int:
+    """Grava .xls (xlwt); acima de XLS_MAX_LINHAS o restante e descartado com aviso."""
+    import xlwt  # type: ignore
+
+    wb = xlwt.Workbook(encoding="utf-8")
+    ws = wb.add_sheet("APO-PEN")
+    for c, nome in enumerate(COLUNAS_APO_PEN):
+        ws.write(0, c, nome)
+    n = 0
+    for linha in linhas:
+        if n >= XLS_MAX_LINHAS:
+            print(f"Aviso: .xls limitado a {XLS_MAX_LINHAS} linhas; demais linhas ficam so no .xlsx.")
+            break
+        n += 1
+        for c, valor in enumerate(linha):
+            ws.write(n, c, valor)
+    wb.save(str(path))
+    return n
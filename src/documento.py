@@ -0,0 +1,108 @@
+"""Texto de documento normalizado uma unica vez para todos os detectores.
+
+`NormalizedDocument` guarda o texto original, a forma normalizada (mesma regra de
+`comum.normalize`: o/a ordinais, NFKD sem acentos) em minusculas e, para cada caractere
+normalizado, o offset do caractere original que o gerou. Assim classificacao, secretaria
+e decadencia trabalham sobre a mesma string e qualquer achado pode ser mapeado de volta
+ao trecho original.
+
+`analisar_documento` roda todos os detectores de uma vez sobre os textos ja normalizados
+(tipo e secretaria pelas regras de `classificador`) e devolve um `AnaliseDocumento`
+imutavel com tipo, secretaria, data de decadencia e os acertos que explicam a decisao.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional
+
+_ORDINAIS = {"º": "o", "°": "o", "ª": "a"}
+
+
+def _norm_char(c: str) -> str:
+    c = _ORDINAIS.get(c, c)
+    d = unicodedata.normalize("NFKD", c)
+    return "".join(ch for ch in d if not unicodedata.combining(ch)).lower()
+
+
+@dataclass(frozen=True)
+class NormalizedDocument:
+    text: str
+    norm: str = field(repr=False)
+    offsets: tuple[int, ...] = field(repr=False)
+
+    @classmethod
+    def from_text(cls, text: str) -> "NormalizedDocument":
+        text = text or ""
+        parts: list[str] = []
+        offsets: list[int] = []
+        cache: dict[str, str] = {}
+        for i, c in enumerate(text):
+            n = cache.get(c)
+            if n is None:
+                n = cache[c] = c.lower() if c.isascii() else _norm_char(c)
+            if n:
+                parts.append(n)
+                offsets.extend([i] * len(n))
+        return cls(text=text, norm="".join(parts), offsets=tuple(offsets))
+
+    def original_span(self, start: int, end: int) -> tuple[int, int]:
+        """Converte um intervalo de `norm` no intervalo correspondente de `text`."""
+        if start >= end or not self.offsets:
+            pos = self.offsets[start] if start < len(self.offsets) else len(self.text)
+            return pos, pos
+        return self.offsets[start], self.offsets[end - 1] + 1
+
+    def original(self, start: int, end: int) -> str:
+        a, b = self.original_span(start, end)
+        return self.text[a:b]
+
+
+DECADENCIA_PATTERNS = tuple(re.compile(p, re.IGNORECASE | re.MULTILINE) for p in (
+    r"decadencia[^0-9]{0,20}(\d{1,2}/\d{1,2}/\d{2,4})",
+    r"decai[^0-9]{0,20}(\d{1,2}/\d{1,2}/\d{2,4})",
+    r"data\s*limite[^0-9]{0,15}(\d{1,2}/\d{1,2}/\d{2,4})",
+))
+
+
+def decadencia_from_norm(norm: str) -> Optional[date]:
+    for pat in DECADENCIA_PATTERNS:
+        m = pat.search(norm)
+        if not m:
+            continue
+        ds = m.group(1)
+        for fmt in ("%d/%m/%Y", "%d/%m/%y"):
+            try:
+                return datetime.strptime(ds, fmt).date()
+            except Exception:
+                continue
+    return None
+
+
+@dataclass(frozen=True)
+class AnaliseDocumento:
+    tipo: str
+    secretaria: str
+    data_decadencia: Optional[date]
+    acertos: tuple = ()  # classificador.Acerto que embasaram tipo/secretaria
+
+
+def analisar_documento(
+    pdf_text: str,
+    piece_title: Optional[str] = None,
+    cover_text: Optional[str] = None,
+    classificador=None,
+) -> AnaliseDocumento:
+    """Normaliza PDF, capa e nome da peca uma unica vez e roda todos os detectores."""
+    from classificador import get_classificador
+
+    pdf = NormalizedDocument.from_text(pdf_text)
+    cover = NormalizedDocument.from_text(cover_text) if cover_text else None
+    piece = NormalizedDocument.from_text(piece_title)
+    c = (classificador or get_classificador()).classificar(pdf=pdf, capa=cover, peca=piece)
+    return AnaliseDocumento(
+        tipo=c.tipo,
+        secretaria=c.secretaria,
+        data_decadencia=decadencia_from_norm(pdf.norm),
+        acertos=c.acertos,
+    )
@@ -0,0 +1,145 @@
+"""Gerenciador de downloads de PDFs em streaming.
+
+Cada documento e gravado em blocos num arquivo `.part`, com SHA-256 calculado durante a
+escrita; a assinatura `%PDF` e conferida ja no primeiro bloco (HTML de erro/login e
+descartado sem baixar o resto). Transferencias interrompidas sao retomadas com `Range`
+quando o servidor aceita, senao recomecam do zero. Varios downloads correm em paralelo
+num pool limitado de threads; a memoria fica em um bloco por download.
+"""
+import hashlib
+import http.client
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+PDF_MAGIC = b"%PDF"
+
+
+class NotPdfError(Exception):
+    """O servidor respondeu com algo que nao e PDF."""
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    path: Path
+    sha256: str
+    size: int
+    etag: str = ""
+    content_length: Optional[int] = None  # tamanho total anunciado pelo servidor (Content-Length/Content-Range)
+
+
+def _total_length(headers: dict) -> Optional[int]:
+    """Tamanho total do recurso: o total do Content-Range (206) ou o Content-Length (200)."""
+    total = (headers.get("content-range") or "").rpartition("/")[2].strip()
+    if not total.isdigit():
+        total = (headers.get("content-length") or "").strip()
+    return int(total) if total.isdigit() else None
+
+
+class DownloadManager:
+    def __init__(self, max_workers: int = 4, chunk_size: int = 256 * 1024, retries: int = 3, timeout_s: float = 60.0):
+        self.max_workers = max(1, int(max_workers))
+        self.chunk_size = max(4096, int(chunk_size))
+        self.retries = max(0, int(retries))
+        self.timeout_s = timeout_s
+
+    def _stream(self, url: str, part: Path, headers: dict[str, str], hasher, offset: int) -> tuple[int, bool, dict, object]:
+        """Baixa a partir de `offset`; retorna (bytes no arquivo, completo?, cabecalhos, hasher)."""
+        req_headers = dict(headers)
+        if offset:
+            req_headers["Range"] = f"bytes={offset}-"
+        req = urllib.request.Request(url, headers=req_headers)
+        with urllib.request.urlopen(req, timeout=self.timeout_s) as resp:
+            resp_headers = {k.lower(): v for k, v in resp.headers.items()}
+            if offset and resp.status != 206:
+                # Servidor ignorou o Range: recomeca do inicio
+                offset = 0
+                hasher = hashlib.sha256()
+            ct = resp_headers.get("content-type", "")
+            expected = None
+            if resp_headers.get("content-length"):
+                try:
+                    expected = offset + int(resp_headers["content-length"])
+                except ValueError:
+                    expected = None
+            written = offset
+            with open(part, "r+b" if offset else "wb") as f:
+                f.seek(offset)
+                f.truncate()
+                first = not offset
+                while True:
+                    chunk = resp.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    if first:
+                        if PDF_MAGIC not in chunk[:8] and "application/pdf" not in ct.lower():
+                            raise NotPdfError(f"conteudo nao-PDF ({ct or 'sem content-type'})")
+                        first = False
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    written += len(chunk)
+        complete = expected is None or written >= expected
+        return written, complete, resp_headers, hasher
+
+    def _resume_point(self, part: Path):
+        """Tamanho ja gravado em `part` e hash correspondente (para retomar com Range)."""
+        hasher = hashlib.sha256()
+        if not part.exists():
+            return 0, hasher
+        size = 0
+        with open(part, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                hasher.update(chunk)
+                size += len(chunk)
+        return size, hasher
+
+    def download(self, url: str, dest: Path, headers: Optional[dict[str, str]] = None) -> Optional[DownloadResult]:
+        """Baixa `url` para `dest`; None se nao for PDF ou se esgotar as tentativas."""
+        dest = Path(dest)
+        part = dest.with_name(dest.name + ".part")
+        hasher = hashlib.sha256()
+        offset = 0
+        resp_headers: dict = {}
+        for attempt in range(self.retries + 1):
+            try:
+                offset, complete, hdrs, hasher = self._stream(url, part, headers or {}, hasher, offset)
+                resp_headers = resp_headers or hdrs
+                if complete:
+                    os.replace(part, dest)
+                    return DownloadResult(
+                        url=url,
+                        path=dest,
+                        sha256=hasher.hexdigest(),
+                        size=offset,
+                        etag=resp_headers.get("etag", ""),
+                        content_length=_total_length(resp_headers),
+                    )
+                print(f"Aviso: download parcial de {dest.name} ({offset} bytes); retomando.")
+            except NotPdfError:
+                part.unlink(missing_ok=True)
+                return None
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                if isinstance(e, urllib.error.HTTPError) and e.code < 500 and e.code != 416:
+                    part.unlink(missing_ok=True)
+                    return None
+                if isinstance(e, urllib.error.HTTPError) and e.code == 416:
+                    part.unlink(missing_ok=True)
+                offset, hasher = self._resume_point(part)
+                if attempt < self.retries:
+                    time.sleep(min(8.0, 0.5 * (2 ** attempt)))
+        part.unlink(missing_ok=True)
+        return None
+
+    def download_many(self, jobs: list[tuple[str, Path, dict[str, str]]]) -> list[Optional[DownloadResult]]:
+        """Executa varios (url, destino, cabecalhos) em paralelo; resultados na mesma ordem."""
+        if len(jobs) <= 1 or self.max_workers == 1:
+            return [self.download(url, dest, headers) for url, dest, headers in jobs]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+            futs = [pool.submit(self.download, url, dest, headers) for url, dest, headers in jobs]
+            return [f.result() for f in futs]
@@ -1,14 +1,17 @@
+from __future__ import annotations
+
 import os
 import re
 import time
 import unicodedata
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import TYPE_CHECKING, List, Optional, Union
 from urllib.parse import urljoin
 
-import pandas as pd
-from dotenv import load_dotenv
-from playwright.sync_api import Page, sync_playwright
+from planilhas import PlanilhaExportada, iter_processos
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
 
 # Configuracoes padrao (ajuste facilmente aqui)
 ETCM_URL = "https://homologacao-etcm.tcm.sp.gov.br/paginas/login.aspx"
@@ -281,10 +284,8 @@ def _abrir_fila_apopen(page: Page, timeout: int = 20000) -> Union[Page, "Frame"]
     raise RuntimeError("Grid da fila Em confeccao APO-PEN nao ficou visivel.")
 
 
-def exportar_planilha_apopen(page: Page) -> Path:
+def exportar_planilha_apopen(page: Page) -> PlanilhaExportada:
     container = _abrir_fila_apopen(page)
-    tmp_dir = Path("tmp")
-    tmp_dir.mkdir(parents=True, exist_ok=True)
 
     export_selectors = [
         "#gvProcesso_Title_btnExport_I",
@@ -293,7 +294,7 @@ def exportar_planilha_apopen(page: Page) -> Path:
         "button:has-text('Exportar')",
         "a:has-text('Exportar')",
     ]
-    download_path: Optional[Path] = None
+    planilha: Optional[PlanilhaExportada] = None
     log("Disparando exportacao da planilha APO-PEN...")
     for sel in export_selectors:
         loc = container.locator(sel).first
@@ -302,41 +303,25 @@ def exportar_planilha_apopen(page: Page) -> Path:
         try:
             with page.expect_download(timeout=60000) as dl_info:
                 loc.click()
-            download = dl_info.value
-            suggested = download.suggested_filename or "apopen.xlsx"
-            download_path = tmp_dir / suggested
-            download.save_as(str(download_path))
+            planilha = PlanilhaExportada.de_download(dl_info.value, "apopen.xlsx")
             break
         except Exception:
             continue
-    if not download_path:
+    if not planilha:
         raise RuntimeError("Nao foi possivel disparar o download da planilha (botao Exportar).")
-    log(f"Planilha exportada: {download_path.resolve()}")
-    return download_path
-
-
-def _coluna_processo(df: pd.DataFrame) -> Optional[str]:
-    for col in df.columns:
-        norm = _normalize(str(col))
-        if "processo" in norm:
-            return col
-        if "n" in norm and "proc" in norm:
-            return col
-    return df.columns[0] if len(df.columns) else None
-
-
-def carregar_processos(caminho_arquivo_excel: Path) -> List[str]:
-    if not caminho_arquivo_excel.exists():
-        raise FileNotFoundError(f"Planilha nao encontrada: {caminho_arquivo_excel}")
-    df = pd.read_excel(caminho_arquivo_excel)
-    if df.empty:
-        return []
-    coluna = _coluna_processo(df)
-    if not coluna:
-        return []
-    series = df[coluna].dropna().astype(str).str.strip()
-    series = series[series != ""]
-    processos = list(dict.fromkeys(series.tolist()))
+    if env_bool("EXPORT_PERSIST", True):
+        destino = planilha.persistir(Path("tmp") / Path(planilha.name).name)
+        log(f"Planilha exportada: {planilha.name} (copia em {destino.resolve()})")
+    else:
+        log(f"Planilha exportada: {planilha.name} (so em memoria)")
+    return planilha
+
+
+def carregar_processos(planilha: Union[Path, PlanilhaExportada]) -> List[str]:
+    if isinstance(planilha, Path) and not planilha.exists():
+        raise FileNotFoundError(f"Planilha nao encontrada: {planilha}")
+    # sem cabecalho "processo" vale a primeira coluna, como na leitura antiga
+    processos = list(iter_processos(planilha, unique=True, coluna_padrao=0))
     log(f"Processos carregados da planilha: {len(processos)} encontrado(s).")
     return processos
 
@@ -476,6 +461,9 @@ def anexar_atos(page: Page, dados_processo: dict) -> None:
 
 
 def main() -> None:
+    from dotenv import load_dotenv
+    from playwright.sync_api import sync_playwright
+
     load_dotenv()
     url = os.getenv("ETCM_URL", ETCM_URL)
     username = os.getenv("ETCM_LOGIN") or os.getenv("ETCM_USERNAME")
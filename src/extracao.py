@@ -0,0 +1,346 @@
+"""Extracao do texto dos PDFs (backends, cache de texto, OCR) e dos campos do oficio."""
+import os
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from campos import scan_fields
+from classificador import get_classificador
+from comum import _env_int, _pt_data_extenso_from_ddmmyyyy, env_bool
+from documento import NormalizedDocument, decadencia_from_norm
+from pdf_backends import BACKENDS, PdfTextBackend, PypdfBackend, get_backend
+from pdf_cache import sha256_file
+from text_cache import TextCache
+
+
+def parse_page_range(spec: str) -> list[int] | None:
+    """Converte '1-3,7' (paginas 1-based) em indices 0-based; vazio/'all' -> None (todas)."""
+    spec = (spec or "").strip().lower()
+    if not spec or spec in ("all", "todas", "0"):
+        return None
+    pages: list[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            start = int(a) if a.strip() else 1
+            end = int(b) if b.strip() else start
+            pages.extend(range(start - 1, end))
+        else:
+            pages.append(int(part) - 1)
+    return sorted({p for p in pages if p >= 0})
+
+
+_TEXT_CACHE: Optional[TextCache] = None
+_TEXT_CACHE_PID = 0
+_PDF_BACKEND_NAME = ""
+_PDF_BACKENDS = threading.local()
+_STOP_TAIL = 2000  # caracteres do fim da pagina anterior reanalisados com a seguinte (PDF_STOP_FIELDS)
+
+
+def _pdf_backend() -> PdfTextBackend:
+    """Backend de texto configurado (resolvido uma vez por processo; uma instancia por thread)."""
+    global _PDF_BACKEND_NAME
+    if not _PDF_BACKEND_NAME:
+        _PDF_BACKEND_NAME = get_backend().name
+    backend = getattr(_PDF_BACKENDS, "backend", None)
+    if backend is None or backend.name != _PDF_BACKEND_NAME:
+        backend = _PDF_BACKENDS.backend = BACKENDS[_PDF_BACKEND_NAME]()
+    return backend
+
+
+def _get_text_cache() -> Optional[TextCache]:
+    """Cache de texto do processo atual (TEXT_CACHE=false desativa)."""
+    global _TEXT_CACHE, _TEXT_CACHE_PID
+    if not env_bool("TEXT_CACHE", True):
+        return None
+    if _TEXT_CACHE is None or _TEXT_CACHE_PID != os.getpid():
+        try:
+            _TEXT_CACHE = TextCache(Path(os.getenv("TEXT_CACHE_PATH", "cache/text.sqlite")))
+            _TEXT_CACHE_PID = os.getpid()
+        except Exception as e:
+            print(f"Aviso: cache de texto indisponivel: {e}")
+            return None
+    return _TEXT_CACHE
+
+
+def iter_pdf_pages(pdf_path: Path, pages=None, backend: Optional[PdfTextBackend] = None):
+    """Gera (indice, texto) pagina a pagina, sem montar o documento inteiro na memoria.
+
+    `pages` e um iteravel de indices 0-based (fora do intervalo sao ignorados); None = todas.
+    Paginas que falham na extracao rendem texto vazio e ficam fora do cache (a proxima
+    leitura tenta de novo); paginas sem texto sao gravadas. O texto vem do cache persistente
+    quando o mesmo conteudo ja foi lido pela mesma versao do extrator; o PDF so e
+    aberto se faltar alguma pagina. `backend` padrao: PDF_TEXT_BACKEND (ver pdf_backends).
+    """
+    backend = backend or _pdf_backend()
+    cache = _get_text_cache()
+    version = backend.version()
+    digest = sha256_file(pdf_path) if cache else ""
+    total = cache.page_count(digest, version) if cache else None
+    if total is None:
+        total = backend.page_count(pdf_path)
+    indices = list(range(total)) if pages is None else [i for i in pages if 0 <= i < total]
+    cached = cache.get_pages(digest, version, indices) if cache else {}
+    missing = [i for i in indices if i not in cached]
+    extracted = backend.extract_pages(pdf_path, missing) if missing else iter(())
+    fresh: dict[int, str] = {}
+    try:
+        for i in indices:
+            if i in cached:
+                yield i, cached[i]
+                continue
+            _, txt = next(extracted)
+            if txt is None:
+                yield i, ""
+                continue
+            fresh[i] = txt
+            yield i, txt
+    finally:
+        if cache and (fresh or not cached):
+            try:
+                cache.put(digest, version, total, fresh)
+            except Exception as e:
+                print(f"Aviso: nao foi possivel gravar o cache de texto: {e}")
+
+
+def extract_text_from_pdf(pdf_path: Path, pages=None, stop_when=None, max_pages: int = 0) -> str:
+    """Extract plain text from a PDF (pypdf or the configured backend). Returns "" on failure.
+
+    - `pages`: indices 0-based a extrair (None = todas; ver `parse_page_range`).
+    - `max_pages`: limite de paginas lidas (0 = sem limite).
+    - `stop_when(texto_da_pagina) -> bool`: chamado com o texto de cada pagina nova (nao
+      vazia); True encerra a leitura. O callback guarda o que precisar das paginas
+      anteriores (ver `stop_when_fields_found`).
+
+    Paginas lidas sem camada de texto passam pelo OCR (ver `_ocr_blank_pages`).
+    """
+    if not PypdfBackend().available() and _pdf_backend().name == "pypdf":
+        print("Aviso: biblioteca pypdf nao instalada. Nao foi possivel ler o PDF.")
+        return ""
+
+    try:
+        from contextlib import closing
+
+        read: list[tuple[int, str]] = []
+        chunks: list[str] = []
+        with closing(iter_pdf_pages(pdf_path, pages)) as page_iter:
+            for n, (i, txt) in enumerate(page_iter, start=1):
+                read.append((i, txt))
+                if txt:
+                    chunks.append(txt)
+                if max_pages and n >= max_pages:
+                    break
+                if stop_when is not None and txt and stop_when(txt):
+                    break
+        blank = [i for i, txt in read if not txt.strip()]
+        if blank:
+            ocr = _ocr_blank_pages(pdf_path, blank)
+            if ocr:
+                chunks = [t for t in (ocr.get(i, txt) for i, txt in read) if t]
+        return "\n".join(chunks)
+    except Exception as e:
+        print(f"Aviso: falha ao extrair texto do PDF '{pdf_path.name}': {e}")
+        return ""
+
+
+def _ocr_blank_pages(pdf_path: Path, indices: list[int]) -> dict[int, str]:
+    """OCR das paginas sem texto (OCR_FALLBACK=false desliga; sem Tesseract nao faz nada)."""
+    if not env_bool("OCR_FALLBACK", True):
+        return {}
+    from pdf_ocr import ocr_available, ocr_pages
+
+    if not ocr_available():
+        return {}
+    print(f"OCR de {len(indices)} pagina(s) sem texto em {pdf_path.name}...")
+    cache_path = Path(os.getenv("TEXT_CACHE_PATH", "cache/text.sqlite")) if env_bool("TEXT_CACHE", True) else None
+    try:
+        return ocr_pages(
+            pdf_path,
+            indices,
+            lang=os.getenv("OCR_LANG", "por") or "por",
+            workers=_env_int("OCR_WORKERS", 0),
+            max_pages=_env_int("OCR_MAX_PAGES", 10),
+            cache_path=cache_path,
+        )
+    except Exception as e:
+        print(f"Aviso: OCR indisponivel para {pdf_path.name}: {e}")
+        return {}
+
+
+def stop_when_fields_found(required: list[str], processo: Optional[str] = None):
+    """Callback de parada para `extract_text_from_pdf`: True quando todos os campos existem.
+
+    `required` usa as chaves de `parse_fields_from_pdf_text` (ex.: '@@nome_relator').
+    Os campos encontrados sao os mesmos da leitura completa (primeira ocorrencia), mas
+    classificacao/secretaria passam a ver so as paginas lidas.
+
+    Cada pagina e analisada uma vez, junto com o fim da anterior (`_STOP_TAIL` caracteres,
+    para campos que atravessam a quebra de pagina); campos ja achados nao sao procurados
+    de novo e, com todos achados, o resultado fica fixo em True.
+    """
+    missing = {k for k in required if k}
+    tail = ""
+
+    def _done(page_text: str) -> bool:
+        nonlocal tail
+        if not missing:
+            return True
+        window = f"{tail}\n{page_text}" if tail else page_text
+        fields = parse_fields_from_pdf_text(window, processo)
+        missing.difference_update([k for k in missing if fields.get(k)])
+        tail = _text_tail(window, _STOP_TAIL)
+        return not missing
+
+    return _done
+
+
+def _text_tail(text: str, size: int) -> str:
+    """Ultimos `size` caracteres de `text`, comecando num espaco (sem palavra cortada)."""
+    if len(text) <= size:
+        return text
+    tail = text[-size:]
+    m = re.search(r"\s", tail)
+    return tail[m.start():] if m else tail
+
+
+def _pdf_text_options(processo: Optional[str] = None) -> dict:
+    """Opcoes de leitura parcial vindas do ambiente (PDF_PAGES, PDF_MAX_PAGES, PDF_STOP_FIELDS)."""
+    opts: dict = {}
+    try:
+        opts["pages"] = parse_page_range(os.getenv("PDF_PAGES", ""))
+    except ValueError:
+        print("Aviso: PDF_PAGES invalido; lendo todas as paginas.")
+    opts["max_pages"] = _env_int("PDF_MAX_PAGES", 0)
+    stop_fields = [f.strip() for f in os.getenv("PDF_STOP_FIELDS", "").split(",") if f.strip()]
+    if stop_fields:
+        opts["stop_when"] = stop_when_fields_found(stop_fields, processo)
+    return opts
+
+
+def parse_fields_from_pdf_text(text: str, processo: Optional[str] = None) -> dict[str, str]:
+    """Parse common fields from PDF text and return mapping for template placeholders.
+
+    Placeholders populated (quando encontrados):
+    - {{NUM_PROCESSO}}
+    - {{ASSUNTO}}
+    - {{INTERESSADO}}
+    - {{REQUERENTE}}
+    - {{DATA_DOCUMENTO}}
+    - {{DATA}} (kept as today's date; DATA_DOCUMENTO is the date found in PDF)
+    - {{EXTRATO}} (first 400 chars as summary)
+    - {{CPF}}, {{MATRICULA}}, {{CARGO}}, {{NASCIMENTO}}
+    """
+    if not text:
+        return {"{{NUM_PROCESSO}}": processo or ""}
+
+    found = scan_fields(text)
+    out: dict[str, str] = {}
+
+    # Processo number
+    proc = found.get("processo") or (processo or "")
+    out["{{NUM_PROCESSO}}"] = proc
+
+    # Interested party / requerente
+    interessado = found.get("interessado")
+    if interessado:
+        out["{{INTERESSADO}}"] = interessado
+        out["{{REQUERENTE}}"] = interessado
+
+    # Campos diretos (padroes em campos.FIELD_TABLE)
+    for key, placeholder in (
+        ("assunto", "{{ASSUNTO}}"),
+        ("data_documento", "{{DATA_DOCUMENTO}}"),
+        ("cpf", "{{CPF}}"),
+        ("matricula", "{{MATRICULA}}"),
+        ("cargo", "{{CARGO}}"),
+        ("nascimento", "{{NASCIMENTO}}"),
+    ):
+        if found.get(key):
+            out[placeholder] = found[key]
+
+    # Short summary
+    snippet = re.sub(r"\s+", " ", text).strip()
+    if snippet:
+        out["{{EXTRATO}}"] = snippet[:400]
+
+    # Additional fields for @@ placeholders
+    for key, placeholder in (
+        ("tipo_processo", "@@Tipo_Processo"),
+        ("natureza", "@@natureza_processo"),
+        ("processo_externo", "@@processoexterno"),
+        ("relator", "@@nome_relator"),
+        ("instancia", "@@instancia"),
+    ):
+        if found.get(key):
+            out[placeholder] = found[key]
+
+    # Interessado → Nome_interessado
+    if interessado:
+        out["@@Nome_interessado"] = interessado
+
+    # Processo → @@processo
+    out["@@processo"] = proc
+
+    # Número do ofício: opcional via env; não costuma vir no PDF
+    num_of = os.getenv("NUMERO_OFICIO", "").strip()
+    out["@@numero_oficio"] = num_of if num_of else "s/n"
+
+    # Data por extenso
+    data_src = out.get("{{DATA_DOCUMENTO}}")
+    if data_src:
+        # Se já estiver por extenso, mantém; caso contrário, converte dd/mm/yyyy
+        if re.match(r"\d{1,2}/\d{1,2}/\d{4}", data_src):
+            out["@@data_extenso"] = _pt_data_extenso_from_ddmmyyyy(data_src)
+        else:
+            out["@@data_extenso"] = data_src
+    else:
+        out["@@data_extenso"] = _pt_data_extenso_from_ddmmyyyy(date.today().strftime("%d/%m/%Y"))
+
+    return out
+
+
+def _detect_secretaria_from_text(text: str) -> str:
+    """Heurística para identificar a secretaria pelo conteúdo do PDF.
+
+    Retorna uma das opções: 'Educação', 'Saúde' ou 'Geral'.
+    """
+    return get_classificador().classificar(pdf=NormalizedDocument.from_text(text)).secretaria
+
+
+def extract_data_decadencia(pdf_text: str) -> date | None:
+    """Busca uma data de decadencia no texto do PDF (padrao dd/mm/aaaa)."""
+    if not pdf_text:
+        return None
+    return decadencia_from_norm(NormalizedDocument.from_text(pdf_text).norm)
+
+
+def calcular_prazo_res_22_21(data_decadencia: date | None, hoje: date) -> int:
+    """Calcula o prazo (15/30/60) conforme Res. 22/21, com fallback de 30 dias."""
+    if not data_decadencia:
+        print("Aviso: data de decadencia nao encontrada; usando prazo padrao de 30 dias.")
+        return 30
+    dias = (data_decadencia - hoje).days
+    if dias <= 60:
+        return 15
+    if dias <= 120:
+        return 30
+    return 60
+
+
+def _classify_tipo_from_text_and_piece(text: str, last_piece_name: Optional[str], cover_text: Optional[str] = None) -> str:
+    """Classifica o tipo de modelo: UTAP, REITERACAO, DILACAO, JUIZO.
+
+    Palavras-chave e prioridades vêm de docs/regras_classificacao.yaml (nome da última
+    peça primeiro, depois o texto do último PDF e o da capa/primeiro PDF).
+    Para classificar e detectar secretaria/decadência juntos, use `analisar_documento`.
+    """
+    return get_classificador().classificar(
+        pdf=NormalizedDocument.from_text(text),
+        capa=NormalizedDocument.from_text(cover_text) if cover_text else None,
+        peca=NormalizedDocument.from_text(last_piece_name),
+    ).tipo
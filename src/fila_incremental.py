@@ -0,0 +1,167 @@
+"""Processamento incremental da fila Em confeccao APO-PEN.
+
+Mantem um snapshot (JSON) da ultima planilha exportada com o numero de processo
+canonicalizado e uma impressao digital de cada linha. A cada execucao so entram na
+fila os processos novos, alterados, ainda nao concluidos ou vencidos para rechecagem.
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+SNAPSHOT_VERSION = 1
+
+_PROC_RE = re.compile(r"^([A-Z]{1,5})?\s*[/\-.]?\s*(\d{1,7})\s*[/\-.]\s*(\d{2}|\d{4})$")
+
+
+def _norm_header(h: str) -> str:
+    s = unicodedata.normalize("NFKD", str(h or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", s).strip().lower()
+
+
+def canonicalize_processo(value: str) -> str:
+    """Normaliza o numero do processo para comparacao entre execucoes.
+
+    Exemplos: ' tc 11724/2020 ', 'TC-011724-2020' e 'TC/011724/2020' viram 'TC/011724/2020'.
+    Ano com dois digitos vira 20xx ate o ano corrente e 19xx acima dele ('TC 123/98' -> 'TC/000123/1998').
+    Valores fora do padrao sao apenas aparados, em maiusculas e com espacos colapsados.
+    """
+    s = re.sub(r"\s+", " ", str(value or "")).strip().upper()
+    if s.endswith(".0"):
+        s = s[:-2]
+    m = _PROC_RE.match(s)
+    if not m:
+        return s
+    prefixo, numero, ano = m.group(1) or "", m.group(2), m.group(3)
+    if len(ano) == 2:
+        ano = f"19{ano}" if int(ano) > date.today().year % 100 else f"20{ano}"
+    base = f"{int(numero):06d}/{ano}"
+    return f"{prefixo}/{base}" if prefixo else base
+
+
+def row_fingerprint(row: dict[str, str], ignore_columns: Iterable[str] = ()) -> str:
+    """SHA-1 dos valores da linha (cabecalhos normalizados, colunas ignoradas removidas)."""
+    ignored = {_norm_header(c) for c in ignore_columns if c}
+    items = []
+    for k, v in row.items():
+        hk = _norm_header(k)
+        if not hk or hk in ignored:
+            continue
+        items.append((hk, re.sub(r"\s+", " ", str(v or "")).strip()))
+    items.sort()
+    payload = "\x1f".join(f"{k}\x1e{v}" for k, v in items)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class FilaIncremental:
+    """Snapshot persistido da fila APO-PEN e decisao de quais linhas reprocessar."""
+
+    def __init__(
+        self,
+        state_path: Path,
+        recheck_after_days: int = 0,
+        ignore_columns: Iterable[str] = (),
+        today: Optional[date] = None,
+    ):
+        self.state_path = Path(state_path)
+        self.recheck_after_days = max(0, int(recheck_after_days or 0))
+        self.ignore_columns = [c for c in ignore_columns if c]
+        self.today = today or date.today()
+        self.rows: dict[str, dict] = self._load()
+        self._pending: dict[str, str] = {}
+
+    def _load(self) -> dict[str, dict]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"Aviso: snapshot incremental ilegivel ({e}); tratando a fila inteira como nova.")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            return {}
+        rows = data.get("rows") or {}
+        return rows if isinstance(rows, dict) else {}
+
+    def save(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "rows": self.rows,
+        }
+        tmp = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    def _is_stale(self, processed_at: str) -> bool:
+        if not self.recheck_after_days or not processed_at:
+            return False
+        try:
+            last = date.fromisoformat(processed_at)
+        except ValueError:
+            return True
+        return (self.today - last).days >= self.recheck_after_days
+
+    def plan(self, rows: Iterable[tuple[str, dict[str, str]]]) -> list[str]:
+        """Compara a planilha atual com o snapshot e retorna os processos a tratar.
+
+        `rows` contem (numero do processo como exibido, {cabecalho: valor}). Os processos saem
+        canonicalizados, na mesma forma da leitura direta da planilha e de PROCESSOS_LIST. A
+        ordem da planilha e preservada; duplicatas (apos canonicalizacao) sao ignoradas.
+        Processos que sairam da fila sao removidos do snapshot.
+        """
+        hoje = self.today.isoformat()
+        current: dict[str, dict] = {}
+        selected: list[str] = []
+        stats = {"novos": 0, "alterados": 0, "pendentes": 0, "rechecagem": 0, "inalterados": 0}
+        for display, row in rows:
+            canon = canonicalize_processo(display)
+            if not canon or canon in current:
+                continue
+            fp = row_fingerprint(row, self.ignore_columns)
+            prev = self.rows.get(canon)
+            entry = {
+                "fingerprint": fp,
+                "first_seen": (prev or {}).get("first_seen") or hoje,
+                "last_seen": hoje,
+                "processed_at": (prev or {}).get("processed_at", ""),
+                "processed_fingerprint": (prev or {}).get("processed_fingerprint", ""),
+            }
+            current[canon] = entry
+            if prev is None:
+                reason = "novos"
+            elif not entry["processed_at"]:
+                reason = "pendentes"
+            elif entry["processed_fingerprint"] != fp:
+                reason = "alterados"
+            elif self._is_stale(entry["processed_at"]):
+                reason = "rechecagem"
+            else:
+                stats["inalterados"] += 1
+                continue
+            stats[reason] += 1
+            self._pending[canon] = fp
+            selected.append(canon)
+        removidos = len(set(self.rows) - set(current))
+        self.rows = current
+        print(
+            "Fila incremental: "
+            + ", ".join(f"{k}={v}" for k, v in stats.items())
+            + f", removidos={removidos} -> {len(selected)} a processar."
+        )
+        return selected
+
+    def mark_processed(self, processo: str) -> None:
+        """Registra o processo como concluido com a impressao digital da linha planejada."""
+        canon = canonicalize_processo(processo)
+        entry = self.rows.get(canon)
+        if entry is None:
+            return
+        entry["processed_at"] = self.today.isoformat()
+        entry["processed_fingerprint"] = self._pending.pop(canon, entry.get("fingerprint", ""))
@@ -0,0 +1,409 @@
+"""Mesa de trabalho: pasta Em confeccao APO-PEN, exportacao da planilha e abertura do processo."""
+import re
+import time
+from pathlib import Path
+
+from comum import env_bool
+from pecas import VIEWER_TREE_SELECTOR
+from planilhas import PlanilhaExportada, iter_linhas, iter_processos, primeiro_processo
+from sessao import find_frame_with_selector
+
+COLUNA_PROCESSO_PADRAO = 4  # coluna E da exportacao APO-PEN, quando nao ha cabecalho "processo"
+
+
+def find_latest_export_file(directory: Path) -> Path | None:
+    candidates = []
+    for ext in ("*.xlsx", "*.xls"):
+        candidates.extend(directory.glob(ext))
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+def extract_processo_from_excel(path: Path | PlanilhaExportada) -> str | None:
+    try:
+        return primeiro_processo(path, coluna_padrao=COLUNA_PROCESSO_PADRAO)
+    except Exception as e:
+        print(f"Aviso: falha ao ler planilha {path.name}: {e}")
+        return None
+
+
+def extract_processo_rows_from_excel(path: Path | PlanilhaExportada) -> list[tuple[str, dict[str, str]]]:
+    """Extrai (numero do processo, {cabecalho: valor}) de cada linha com processo preenchido.
+
+    Usa a mesma deteccao de coluna de `extract_processos_from_excel`; a linha completa
+    permite detectar alteracoes entre execucoes (fila incremental).
+    """
+    rows: list[tuple[str, dict[str, str]]] = []
+    try:
+        for row in iter_linhas(path, coluna_padrao=COLUNA_PROCESSO_PADRAO):
+            rows.append(row)
+    except Exception as e:
+        print(f"Aviso: falha ao ler planilha {path.name}: {e}")
+    return rows
+
+
+def extract_processos_from_excel(path: Path | PlanilhaExportada) -> list[str]:
+    """Extrai todos os números de processo da planilha, na mesma coluna detectada.
+
+    Retorna os valores não-vazios (canonicalizados) da coluna identificada como "Processo";
+    so essa coluna e lida (`planilhas.iter_processos`).
+    """
+    processos: list[str] = []
+    try:
+        for processo in iter_processos(path, coluna_padrao=COLUNA_PROCESSO_PADRAO):
+            processos.append(processo)
+    except Exception as e:
+        print(f"Aviso: falha ao ler planilha {path.name}: {e}")
+    return processos
+
+
+def read_processos_from_excel(path: Path | PlanilhaExportada) -> list[str]:
+    """Wrapper amigavel para extrair processos de uma planilha usando heuristica existente."""
+    return extract_processos_from_excel(path)
+
+
+def _ensure_apo_pen_grid_visible(page, timeout_ms: int = 20000) -> bool:
+    """Garante que a grid de processos esteja carregada (Em confeccao APO-PEN)."""
+    deadline = time.time() + timeout_ms / 1000.0
+    selectors = [
+        "#sptMesaTrabalho_gvProcesso",
+        "#gvProcesso",
+        "table[id*='gvProcesso']",
+    ]
+    containers = [page] + list(page.frames)
+    while time.time() < deadline:
+        for container in containers:
+            for root_sel in selectors:
+                try:
+                    root = container.locator(root_sel).first
+                    if root.count() == 0:
+                        continue
+                    display = root.evaluate("el => getComputedStyle(el).display")  # type: ignore[call-arg]
+                    if display and display.lower() != "none":
+                        return True
+                except Exception:
+                    continue
+        time.sleep(0.3)
+    return False
+
+
+def open_apo_pen_menu(page) -> bool:
+    """Abre Processos -> UNIDADE TECNICA DE OFICIOS -> Em confeccao APO-PEN."""
+    containers = [page] + list(page.frames)
+
+    def try_click(container):
+        clicked_any = False
+        try:
+            container.get_by_text("Processos", exact=False).first.click()
+            clicked_any = True
+        except Exception:
+            pass
+        try:
+            container.get_by_text(re.compile(r"UNIDADE\s+T[EÉ]CNICA\s+DE\s+OF[ÍI]CIOS", re.I)).first.click()
+            clicked_any = True
+        except Exception:
+            try:
+                container.locator("a#016_PROCESSO, a[id*='UNIDADE']").first.click()
+                clicked_any = True
+            except Exception:
+                pass
+        try:
+            container.get_by_text(re.compile(r"Em\s*confe[cç][aã]o\s*APO", re.I)).first.click()
+            clicked_any = True
+        except Exception:
+            try:
+                container.locator("a#confappen_16_PROCESSO, a[id*='confappen']").first.click()
+                clicked_any = True
+            except Exception:
+                try:
+                    container.locator("a:has-text('Em confecção APO-PEN'), a:has-text('Em confecao APO-PEN')").first.click()
+                    clicked_any = True
+                except Exception:
+                    pass
+        return clicked_any
+
+    for attempt in range(4):
+        for c in containers:
+            try_click(c)
+        try:
+            page.wait_for_load_state("networkidle", timeout=8000)
+        except Exception:
+            pass
+        if _ensure_apo_pen_grid_visible(page, timeout_ms=8000):
+            return True
+        time.sleep(1.0)
+    return False
+
+
+
+def open_apo_pen_and_export_excel(context, page, output_dir: Path | None = None) -> PlanilhaExportada | None:
+    """Abre Em confeccao APO-PEN e exporta a planilha via botao Exportar.
+
+    A planilha volta em memoria, pronta para a leitura dos processos; a copia em
+    `output_dir` (EXPORT_PERSIST, padrao ligado) e gravada em segundo plano.
+    """
+    output_dir = output_dir or Path("output")
+    output_dir.mkdir(exist_ok=True)
+
+    ok = open_apo_pen_menu(page)
+    if not ok:
+        print("Aviso: nao foi possivel abrir a pasta 'Em confeccao APO-PEN'.")
+        return None
+
+    if not _ensure_apo_pen_grid_visible(page, timeout_ms=20000):
+        print("Aviso: grid gvProcesso nao ficou visivel apos abrir o menu.")
+        return None
+
+    export_selectors = [
+        "#sptMesaTrabalho_gvProcesso_Title_btnExport, #sptMesaTrabalho_gvProcesso_Title_btnExport_I",
+        "#gvProcesso_Title_btnExport, #gvProcesso_Title_btnExport_I",
+        "#sptMesaTrabalho_gvDocumentos_Title_btnExport, #sptMesaTrabalho_gvDocumentos_Title_btnExport_I",
+        "a:has-text('Exportar'), button:has-text('Exportar')",
+    ]
+    for sel in export_selectors:
+        try:
+            loc = page.locator(sel).first
+            if loc.count() == 0:
+                continue
+            try:
+                loc.wait_for(state="visible", timeout=12000)
+            except Exception:
+                pass
+            with page.expect_download(timeout=60000) as dl_info:
+                loc.click()
+            planilha = PlanilhaExportada.de_download(dl_info.value, f"export_{int(time.time())}.xlsx")
+            if env_bool("EXPORT_PERSIST", True):
+                dest_path = planilha.persistir(output_dir / Path(planilha.name).name)
+                print(f"Planilha exportada: {planilha.name} ({len(planilha.dados)} bytes; copia em {dest_path.resolve()})")
+            else:
+                print(f"Planilha exportada: {planilha.name} ({len(planilha.dados)} bytes, so em memoria)")
+            return planilha
+        except Exception:
+            continue
+    print("Aviso: botao 'Exportar' nao encontrado na grid APO-PEN.")
+    return None
+
+
+def search_processo_and_open_viewer(context, page, processo: str):
+    search_frame = None
+    try:
+        search_frame = find_frame_with_selector(page, "#cbbProcesso_I", timeout_ms=15000)
+    except Exception:
+        if page.locator("#cbbProcesso_I").count() == 0:
+            raise
+
+    target = search_frame if search_frame else page
+    target.locator("#cbbProcesso_I").fill(processo)
+    clicked = False
+    pages_before = list(context.pages)
+    try:
+        btn = target.locator("button[onclick='BuscaProcesso();']").first
+        if btn.count() > 0:
+            btn.click()
+            clicked = True
+    except Exception:
+        pass
+    if not clicked:
+        try:
+            target.locator("#cbbProcesso_I").press("Enter")
+            clicked = True
+        except Exception:
+            pass
+    # If viewer loads in same page, its frame should appear
+    try:
+        find_frame_with_selector(page, "#splLeitorDocumentos_pgcPecas_trePecas", timeout_ms=60000)
+        return page
+    except Exception:
+        pass
+
+    # Otherwise try to detect a newly opened page
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        pages_now = list(context.pages)
+        if len(pages_now) > len(pages_before):
+            newp = pages_now[-1]
+            try:
+                newp.wait_for_load_state("domcontentloaded", timeout=5000)
+            except Exception:
+                pass
+            return newp
+        time.sleep(0.3)
+    return page
+
+
+def open_processo_from_grid(context, page, processo: str):
+    """Filter the grid by 'N° Processo' and open the viewer (lupa icon).
+
+    Targets the Mesa de Trabalho grid with id prefix 'sptMesaTrabalho_gvProcesso'.
+    """
+    # Fill filter for 'N° Processo'
+    input_sel = (
+        "input[id$='_DXFREditorcol17_I'], "
+        "input[name$='$DXFREditorcol17']"
+    )
+    try:
+        inp = page.locator(", ".join(input_sel)).first
+        inp.wait_for(state="visible", timeout=10000)
+        try:
+            inp.fill("")
+        except Exception:
+            pass
+        inp.fill(processo)
+        try:
+            inp.press("Enter")
+        except Exception:
+            pass
+    except Exception:
+        return
+
+    # Wait for first data row to appear
+    row = None
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            r = page.locator("#sptMesaTrabalho_gvProcesso_DXMainTable tr[id*='DXDataRow']").first
+            if r.count() > 0:
+                row = r
+                break
+        except Exception:
+            pass
+        time.sleep(0.2)
+    if row is None:
+        return None
+
+    # Click the lupa/search icon (first actionable element in row)
+    clicked = False
+    selectors = [
+        "img[src*='img_busca' i]",
+        "a[onclick*='VisualizarProtocolo' i]",
+        "td:nth-child(2) a, td:nth-child(2) img",
+        "a:has(img)",
+        "a",
+    ]
+    for sel in selectors:
+        try:
+            loc = row.locator(sel).first
+            if loc.count() > 0:
+                try:
+                    # Try to capture popup if it opens a new window
+                    with page.expect_popup(timeout=3000) as pop_info:
+                        loc.click()
+                    try:
+                        pop_info.value.wait_for_load_state("domcontentloaded", timeout=5000)
+                    except Exception:
+                        pass
+                    return pop_info.value
+                except Exception:
+                    loc.click()
+                clicked = True
+                break
+        except Exception:
+            continue
+    if not clicked:
+        # As a last resort, click any button in the first columns
+        try:
+            row.locator("td:nth-child(2) button, td:nth-child(2) input[type='button']").first.click()
+        except Exception:
+            pass
+    # If we clicked in the same page (no popup), return current page
+    return page
+
+
+def filter_and_open_processo(context, page, processo: str):
+    """Versão robusta: localiza o filtro 'N° Processo' pela célula de cabeçalho,
+    digita o número, pressiona Enter e clica na lupa da primeira linha.
+
+    Retorna a nova página (popup) quando abrir em janela separada, ou a página atual.
+    """
+    # Tenta descobrir o índice da coluna 'N° Processo' pelo header
+    try:
+        header = page.locator("#sptMesaTrabalho_gvProcesso_DXHeadersRow0 td").filter(
+            has_text=re.compile(r"N\s*°?\s*Processo|N\s*o\.?\s*Processo", re.I)
+        ).first
+        if header.count() > 0:
+            hid = header.get_attribute("id") or ""
+            m = re.search(r"col(\d+)$", hid)
+            if m:
+                col_idx = m.group(1)
+                inp = page.locator(f"#sptMesaTrabalho_gvProcesso_DXFREditorcol{col_idx}_I").first
+                inp.wait_for(state="visible", timeout=10000)
+                try:
+                    inp.fill("")
+                except Exception:
+                    pass
+                inp.fill(processo)
+                try:
+                    inp.press("Enter")
+                except Exception:
+                    pass
+        else:
+            # Fallback: caixa superior
+            topInp = page.locator("input[placeholder*='Processo' i], #cbbProcesso_I").first
+            topInp.wait_for(state="visible", timeout=8000)
+            topInp.fill(processo)
+            try:
+                page.locator("button[onclick='BuscaProcesso();']").first.click()
+            except Exception:
+                topInp.press("Enter")
+    except Exception:
+        pass
+
+    # Aguarda a primeira linha
+    row = None
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            r = page.locator("#sptMesaTrabalho_gvProcesso_DXMainTable tr[id*='DXDataRow']").first
+            if r.count() > 0:
+                row = r
+                break
+        except Exception:
+            pass
+        time.sleep(0.2)
+    if row is None:
+        return None
+
+    # Clica na lupa
+    selectors = [
+        "a[href*='VisualizarDocsProtocolo.aspx' i]",
+        "a[onclick*='VisualizarProtocolo' i]",
+        "img[src*='img_busca' i]",
+        "img[src*='lupa' i]",
+        "img[src*='search' i]",
+        "img[alt*='busca' i], img[title*='busca' i]",
+        "td a:has(img)",
+    ]
+    for sel in selectors:
+        try:
+            loc = row.locator(sel).first
+            if loc.count() == 0:
+                continue
+            try:
+                with page.expect_popup(timeout=10000) as pop_info:
+                    loc.click()
+                try:
+                    pop_info.value.wait_for_load_state("domcontentloaded", timeout=10000)
+                except Exception:
+                    pass
+                return pop_info.value
+            except Exception:
+                loc.click()
+                return page
+        except Exception:
+            continue
+    return page
+
+
+def _open_processo_viewer(context, main_page, processo_num: str):
+    """Abre o visualizador do processo a partir da mesa (grid) ou da busca; retorna a pagina."""
+    maybe_page = filter_and_open_processo(context, main_page, processo_num)
+    active_page = maybe_page or main_page
+    try:
+        find_frame_with_selector(active_page, VIEWER_TREE_SELECTOR, timeout_ms=15000)
+    except Exception:
+        try:
+            active_page.locator(f"#cod_processo[value*='{processo_num}']").first.wait_for(state="attached", timeout=8000)
+        except Exception:
+            active_page = search_processo_and_open_viewer(context, main_page, processo_num)
+    return active_page
@@ -0,0 +1,426 @@
+"""Cache em memoria dos modelos de oficio (.dotx/.docx) ja convertidos e carregados.
+
+Cada modelo e lido uma unica vez por processo: o pacote .dotx tem o content-type
+principal trocado para o de documento (.docx) em memoria, e o resultado e carregado com
+python-docx. Cada renderizacao recebe uma copia profunda do documento carregado, entao
+nenhuma substituicao altera o modelo guardado. A entrada e refeita quando o mtime ou o
+tamanho do arquivo mudam (um modelo editado durante a execucao passa a valer no proximo
+oficio).
+
+Na compilacao tambem e montado um indice dos placeholders (`@@nome` e `{{NOME}}`): em
+que paragrafo de qual parte (corpo, tabelas, cabecalhos, rodapes) cada um aparece,
+inclusive quando o Word o dividiu em varios runs. A renderizacao so visita esses
+paragrafos e faz uma unica passada de substituicao em cada um.
+
+`CatalogoModelos` lista uma vez as pastas `modelos_*` (e OFICIO_TEMPLATES_DIR) e responde
+qual arquivo usar para cada (tipo, secretaria) sem voltar ao disco.
+"""
+import copy
+import functools
+import hashlib
+import io
+import re
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+CT_TEMPLATE = "application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml"
+CT_DOCUMENT = "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+
+CT_HEADER = "application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"
+CT_FOOTER = "application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml"
+
+PLACEHOLDER_RE = re.compile(r"@@\w+|\{\{[^{}]*\}\}")
+
+
+def dotx_to_docx_bytes(path) -> bytes:
+    """Bytes de um .docx equivalente ao pacote em `path` (caminho ou arquivo aberto; so o
+    content-type muda)."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(path, "r") as zin, zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zout:
+        for info in zin.infolist():
+            data = zin.read(info.filename)
+            if info.filename == "[Content_Types].xml":
+                try:
+                    xml = data.decode("utf-8")
+                except Exception:
+                    xml = data.decode("utf-8", errors="ignore")
+                data = xml.replace(CT_TEMPLATE, CT_DOCUMENT).encode("utf-8")
+            zout.writestr(info, data)
+    return out.getvalue()
+
+
+@dataclass(frozen=True)
+class Local:
+    parte: int  # indice em `partes_texto` (0 = corpo do documento)
+    paragrafo: int  # posicao do w:p na ordem do XML da parte
+    texto: str  # texto dos runs do paragrafo, ja juntos
+
+
+@dataclass(frozen=True)
+class IndicePlaceholders:
+    locais: tuple[Local, ...]  # todos os paragrafos com texto
+    por_placeholder: dict[str, tuple[int, ...]]  # placeholder -> indices em `locais`
+
+    def locais_para(self, chaves: Iterable[str]) -> dict[int, list[str]]:
+        """Indice do local -> chaves do mapeamento que aparecem nele.
+
+        Chaves que sao placeholders do modelo saem direto do indice; as demais (texto
+        livre, ou prefixo de outro placeholder) sao procuradas no texto guardado.
+        """
+        alvo: dict[int, list[str]] = {}
+        for k in chaves:
+            if not k:
+                continue
+            pos = self.por_placeholder.get(k)
+            if pos is None or any(t != k and t.startswith(k) for t in self.por_placeholder):
+                pos = [i for i, loc in enumerate(self.locais) if k in loc.texto]
+            for i in pos:
+                alvo.setdefault(i, []).append(k)
+        return alvo
+
+
+def partes_texto(doc) -> list:
+    """Partes XML com texto substituivel: o corpo e depois cabecalhos e rodapes."""
+    extras = [
+        p for p in doc.part.package.iter_parts()
+        if p.content_type in (CT_HEADER, CT_FOOTER) and p is not doc.part
+    ]
+    return [doc.part, *extras]
+
+
+def _paragrafos(parte) -> list:
+    from docx.oxml.ns import qn  # type: ignore
+
+    return list(parte.element.iter(qn("w:p")))
+
+
+def indexar(doc) -> IndicePlaceholders:
+    """Percorre o documento uma vez e registra onde esta cada placeholder."""
+    locais: list[Local] = []
+    por_placeholder: dict[str, list[int]] = {}
+    for ip, parte in enumerate(partes_texto(doc)):
+        for jp, p in enumerate(_paragrafos(parte)):
+            texto = "".join(r.text for r in p.r_lst)
+            if not texto:
+                continue
+            for m in PLACEHOLDER_RE.finditer(texto):
+                ocorr = por_placeholder.setdefault(m.group(), [])
+                if not ocorr or ocorr[-1] != len(locais):
+                    ocorr.append(len(locais))
+            locais.append(Local(ip, jp, texto))
+    return IndicePlaceholders(tuple(locais), {k: tuple(v) for k, v in por_placeholder.items()})
+
+
+@functools.lru_cache(maxsize=256)
+def _padrao(chaves: tuple[str, ...]) -> re.Pattern:
+    # mais longas primeiro: '@@processoexterno' vence '@@processo' na mesma posicao
+    return re.compile("|".join(re.escape(k) for k in sorted(chaves, key=len, reverse=True)))
+
+
+def _redistribuir(textos: list[str], trocas: list[tuple[int, int, str]]) -> list[str]:
+    """Novos textos dos runs: cada valor fica no run onde o placeholder comecava e o
+    restante do placeholder some dos runs seguintes (que mantem a propria formatacao)."""
+    texto = "".join(textos)
+    novos = []
+    pos = 0
+    for t in textos:
+        a, b = pos, pos + len(t)
+        pos = b
+        partes = []
+        cur = a
+        for s, e, v in trocas:
+            if e <= a or s >= b:
+                continue
+            if s >= a:
+                partes.append(texto[cur:s])
+                partes.append(v)
+            cur = max(cur, min(e, b))
+        partes.append(texto[cur:b])
+        novos.append("".join(partes))
+    return novos
+
+
+def substituir(doc, indice: IndicePlaceholders, mapping: dict[str, str]) -> int:
+    """Aplica `mapping` nos locais do indice; devolve quantos paragrafos mudaram."""
+    alvo = indice.locais_para(mapping)
+    if not alvo:
+        return 0
+    partes = partes_texto(doc)
+    paragrafos: dict[int, list] = {}
+    alterados = 0
+    for i in sorted(alvo):
+        loc = indice.locais[i]
+        if loc.parte not in paragrafos:
+            paragrafos[loc.parte] = _paragrafos(partes[loc.parte])
+        runs = paragrafos[loc.parte][loc.paragrafo].r_lst
+        textos = [r.text for r in runs]
+        texto = "".join(textos)
+        trocas = [(m.start(), m.end(), str(mapping[m.group()])) for m in _padrao(tuple(alvo[i])).finditer(texto)]
+        if not trocas:
+            continue
+        for r, antigo, novo in zip(runs, textos, _redistribuir(textos, trocas)):
+            if novo != antigo:
+                r.text = novo
+        alterados += 1
+    return alterados
+
+
+@dataclass
+class ModeloCompilado:
+    path: Path
+    mtime_ns: int
+    size: int
+    sha256: str  # do arquivo do modelo, como esta no disco
+    docx_bytes: bytes  # pacote ja com content-type de documento
+    _documento: object = field(default=None, repr=False)
+    _indice: Optional[IndicePlaceholders] = field(default=None, repr=False)
+    _ooxml: object = field(default=None, repr=False)  # ModeloOoxml, ou False se nao suportado
+
+    def _carregado(self):
+        # Documento nunca entregue a ninguem: proxies do python-docx (paragrafos, corpo)
+        # guardam subelementos lxml, que o deepcopy copiaria como arvores separadas.
+        if self._documento is None:
+            from docx import Document  # type: ignore
+
+            self._documento = Document(io.BytesIO(self.docx_bytes))
+        return self._documento
+
+    def novo_documento(self):
+        """Copia independente do documento (python-docx), pronta para substituicoes e `save`."""
+        return copy.deepcopy(self._carregado())
+
+    @property
+    def indice(self) -> IndicePlaceholders:
+        if self._indice is None:
+            self._indice = indexar(self._carregado())
+        return self._indice
+
+    def campos_usados(self, mapping: dict[str, str]) -> dict[str, str]:
+        """Parte de `mapping` cujas chaves aparecem no modelo (as demais nao mudam o oficio)."""
+        usados = {k for ks in self.indice.locais_para(mapping).values() for k in ks}
+        return {k: v for k, v in mapping.items() if k in usados}
+
+    def renderizar(self, mapping: dict[str, str]):
+        """Copia do documento com os placeholders de `mapping` substituidos."""
+        doc = self.novo_documento()
+        substituir(doc, self.indice, mapping)
+        return doc
+
+    @property
+    def ooxml(self):
+        """Renderizador direto no pacote (`ooxml.ModeloOoxml`), ou None se o modelo nao permite."""
+        if self._ooxml is None:
+            from ooxml import ModeloOoxml
+
+            try:
+                self._ooxml = ModeloOoxml(self)
+            except Exception as e:
+                print(f"Aviso: modelo '{self.path.name}' sera renderizado via python-docx ({e}).")
+                self._ooxml = False
+        return self._ooxml or None
+
+    def salvar(self, mapping: dict[str, str], out_path: Path, renderer: str = "ooxml") -> str:
+        """Renderiza `mapping` em `out_path`; devolve o renderizador usado.
+
+        Com `renderer="ooxml"` usa o renderizador direto no pacote quando o modelo e o
+        mapeamento permitem; senao (ou com "python-docx"), o python-docx.
+        """
+        if renderer == "ooxml":
+            r = self.ooxml
+            if r is not None and r.aceita(mapping):
+                Path(out_path).write_bytes(r.renderizar(mapping))
+                return "ooxml"
+        self.renderizar(mapping).save(str(out_path))
+        return "python-docx"
+
+
+class CacheModelos:
+    """Modelos compilados por caminho, revalidados por mtime/tamanho. Seguro entre threads."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._itens: dict[Path, ModeloCompilado] = {}
+        self.compilacoes = 0
+
+    def get(self, path: Path) -> ModeloCompilado:
+        p = Path(path).resolve()
+        st = p.stat()
+        with self._lock:
+            item = self._itens.get(p)
+            if item is not None and item.mtime_ns == st.st_mtime_ns and item.size == st.st_size:
+                return item
+            raw = p.read_bytes()
+            data = dotx_to_docx_bytes(io.BytesIO(raw)) if p.suffix.lower() == ".dotx" else raw
+            item = ModeloCompilado(p, st.st_mtime_ns, st.st_size, hashlib.sha256(raw).hexdigest(), data)
+            item.indice
+            self._itens[p] = item
+            self.compilacoes += 1
+            return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+
+PASTAS_POR_TIPO = {
+    "UTAP": "modelos_utap",
+    "REITERACAO": "modelos_reiteracao",
+    "DILACAO": "modelos_dilacao",
+    "JUIZO": "modelos_juizo",
+}
+
+
+def _preferencia(p: Path) -> int:
+    return {".docx": 3, ".dotx": 2, ".doc": 1}.get(p.suffix.lower(), 0)
+
+
+def _norm_nome(s: str) -> str:
+    from documento import NormalizedDocument
+
+    return NormalizedDocument.from_text(s or "").norm
+
+
+class CatalogoModelos:
+    """Modelos das pastas por tipo e o modelo padrao do oficio, listados uma vez.
+
+    `modelo_para(tipo, secretaria)` escolhe, na pasta do tipo, o arquivo cujo nome contem a
+    secretaria (sem acentos/caixa), preferindo .docx > .dotx > .doc; sem nenhum, o da
+    `secretaria_padrao` e, por fim, o primeiro da pasta em ordem alfabetica. As escolhas ficam num dicionario (as secretarias conhecidas ja na montagem).
+    Com `watch_seconds` > 0, as pastas sao reconferidas (mtime) no maximo a cada tantos
+    segundos e o catalogo e remontado quando um arquivo entra, sai ou e renomeado.
+    """
+
+    def __init__(
+        self,
+        base: Path = Path("."),
+        pastas: Optional[dict[str, str]] = None,
+        secretarias: Iterable[str] = (),
+        secretaria_padrao: str = "Geral",
+        template: str = "",
+        templates_dir: str = "",
+        watch_seconds: float = 0.0,
+    ):
+        self.base = Path(base)
+        self.pastas = dict(pastas or PASTAS_POR_TIPO)
+        self.secretarias = tuple(dict.fromkeys(secretarias))
+        self.secretaria_padrao = _norm_nome(secretaria_padrao)
+        self.template = template
+        self.templates_dir = templates_dir
+        self.watch_seconds = max(0.0, float(watch_seconds))
+        self._lock = threading.RLock()
+        self.montagens = 0
+        self._montar()
+
+    def _vigiados(self) -> list[Path]:
+        paths = [self.base / pasta for pasta in self.pastas.values()]
+        if self.templates_dir:
+            paths.append(Path(self.templates_dir))
+        return paths
+
+    def _assinatura(self) -> tuple:
+        sig = []
+        for d in self._vigiados():
+            try:
+                sig.append(d.stat().st_mtime_ns)
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _montar(self) -> None:
+        with self._lock:
+            self._assinatura_atual = self._assinatura()
+            self._conferido = time.monotonic()
+            self._arquivos: dict[str, list[tuple[Path, str]]] = {}
+            for tipo, pasta in self.pastas.items():
+                d = self.base / pasta
+                files = [p for p in d.iterdir() if p.is_file() and not p.name.startswith("~$")] if d.is_dir() else []
+                files.sort(key=lambda p: (-_preferencia(p), p.name))
+                self._arquivos[tipo] = [(p, _norm_nome(p.name)) for p in files]
+            self._escolhas: dict[tuple[str, str], Optional[Path]] = {}
+            for tipo in self.pastas:
+                for sec in self.secretarias:
+                    self._escolher(tipo, _norm_nome(sec))
+            self._padrao = self._resolver_padrao()
+            self.montagens += 1
+
+    def _escolher(self, tipo: str, sec_norm: str) -> Optional[Path]:
+        chave = (tipo, sec_norm)
+        if chave not in self._escolhas:
+            files = self._arquivos.get(tipo) or []
+            combinam = [p for p, nome in files if sec_norm in nome] if sec_norm else []
+            padrao = [p for p, nome in files if self.secretaria_padrao in nome]
+            escolhidos = combinam or padrao or [p for p, _ in files]
+            self._escolhas[chave] = escolhidos[0] if escolhidos else None
+        return self._escolhas[chave]
+
+    def _resolver_padrao(self) -> Optional[Path]:
+        if self.template:
+            p = Path(self.template)
+            if p.is_file():
+                return p
+            if self.templates_dir and (Path(self.templates_dir) / self.template).is_file():
+                return Path(self.templates_dir) / self.template
+        if self.templates_dir:
+            d = Path(self.templates_dir)
+            if d.is_dir():
+                for ext in ("*.docx", "*.dotx"):
+                    found = sorted(d.glob(ext))
+                    if found:
+                        return found[0]
+        default_p = Path("templates/oficio_modelo.docx")
+        return default_p if default_p.exists() else None
+
+    def _conferir(self) -> None:
+        if not self.watch_seconds or time.monotonic() - self._conferido < self.watch_seconds:
+            return
+        with self._lock:
+            self._conferido = time.monotonic()
+            if self._assinatura() != self._assinatura_atual:
+                print("Pastas de modelos alteradas; recarregando o catalogo.")
+                self._montar()
+
+    def modelo_para(self, tipo: str, secretaria: str) -> Optional[Path]:
+        self._conferir()
+        tipo = (tipo or "").upper()
+        if tipo not in self.pastas:
+            return None
+        with self._lock:
+            return self._escolher(tipo, _norm_nome(secretaria))
+
+    def padrao(self) -> Optional[Path]:
+        """Modelo do oficio configurado por OFICIO_TEMPLATE/OFICIO_TEMPLATES_DIR (ou o padrao)."""
+        self._conferir()
+        return self._padrao
+
+    def modelos(self) -> list[Path]:
+        return [p for files in self._arquivos.values() for p, _ in files]
+
+    def validar(self) -> list[str]:
+        """Problemas do catalogo: tipos sem modelo e secretarias sem modelo proprio."""
+        problemas = []
+        for tipo, pasta in self.pastas.items():
+            files = self._arquivos.get(tipo) or []
+            if not files:
+                problemas.append(f"tipo {tipo}: nenhum modelo em '{self.base / pasta}'")
+                continue
+            for sec in self.secretarias:
+                if not any(_norm_nome(sec) in nome for _, nome in files):
+                    usado = self._escolhas.get((tipo, _norm_nome(sec)))
+                    problemas.append(
+                        f"tipo {tipo}, secretaria {sec}: sem modelo proprio; usando '{usado.name if usado else '-'}'"
+                    )
+        return problemas
+
+
+_CACHE_MODELOS: Optional[CacheModelos] = None
+
+
+def get_cache_modelos() -> CacheModelos:
+    global _CACHE_MODELOS
+    if _CACHE_MODELOS is None:
+        _CACHE_MODELOS = CacheModelos()
+    return _CACHE_MODELOS
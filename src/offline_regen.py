@@ -0,0 +1,175 @@
+"""Regeneracao offline de oficios a partir de PDFs ja baixados (sem navegador).
+
+Le os pares `<processo>-ultimo-ato.pdf` / `<processo>-primeiro-ato.pdf` gravados pelo
+fluxo principal e refaz extracao, classificacao, prazo e geracao do DOCX em um pool
+de processos. Util para validar ajustes de regex/classificacao sem trafego no portal.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+ULTIMO_SUFFIX = "-ultimo-ato.pdf"
+PRIMEIRO_SUFFIX = "-primeiro-ato.pdf"
+PECAS_SUFFIX = "-pecas.json"
+
+
+def find_pdf_pairs(input_dir: Path) -> list[dict]:
+    """Agrupa os PDFs baixados por processo.
+
+    Cada item contem `slug`, `ultimo` (obrigatorio), `primeiro` (opcional) e `pecas`
+    (metadados gravados pelo fluxo principal, quando existirem).
+    """
+    jobs: list[dict] = []
+    for ultimo in sorted(input_dir.glob(f"*{ULTIMO_SUFFIX}")):
+        slug = ultimo.name[: -len(ULTIMO_SUFFIX)]
+        primeiro = input_dir / f"{slug}{PRIMEIRO_SUFFIX}"
+        pecas = input_dir / f"{slug}{PECAS_SUFFIX}"
+        jobs.append({
+            "slug": slug,
+            "ultimo": str(ultimo),
+            "primeiro": str(primeiro) if primeiro.exists() else "",
+            "pecas": str(pecas) if pecas.exists() else "",
+        })
+    return jobs
+
+
+def _load_pecas_meta(path: str) -> dict:
+    if not path:
+        return {}
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8")) or {}
+    except Exception:
+        return {}
+
+
+def regenerar_processo(job: dict) -> dict:
+    """Executa extracao -> classificacao -> prazo -> DOCX para um processo (roda no worker)."""
+    # import tardio: cada worker carrega extracao e oficios uma unica vez (sem o navegador)
+    from comum import _env_int
+    from documento import analisar_documento
+    from extracao import _pdf_text_options, calcular_prazo_res_22_21, extract_text_from_pdf, parse_fields_from_pdf_text
+    from oficios import classify_and_select_template_path, generate_oficio_from_template
+
+    started = time.perf_counter()
+    meta = _load_pecas_meta(job.get("pecas", ""))
+    processo = meta.get("processo") or job["slug"]
+    piece_title = meta.get("ultimo_titulo") or None
+    result = {"processo": processo, "slug": job["slug"], "ok": False}
+    try:
+        output_dir = Path(job["output_dir"])
+        pdf_text = extract_text_from_pdf(Path(job["ultimo"]), **_pdf_text_options(processo))
+        cover_max = _env_int("COVER_MAX_PAGES", 0)
+        cover_text = extract_text_from_pdf(Path(job["primeiro"]), max_pages=cover_max) if job.get("primeiro") else ""
+        fields = parse_fields_from_pdf_text(pdf_text, processo)
+        analise = analisar_documento(pdf_text, piece_title, cover_text)
+        tipo, secretaria, data_decadencia = analise.tipo, analise.secretaria, analise.data_decadencia
+        prazo = calcular_prazo_res_22_21(data_decadencia, date.today())
+        tpl_path = classify_and_select_template_path(pdf_text, piece_title, cover_text=cover_text, analise=analise)
+        docx_path = generate_oficio_from_template(processo, output_dir, extra=fields, template_path=tpl_path)
+        result.update({
+            "tipo": tipo,
+            "secretaria": secretaria,
+            "prazo": prazo,
+            "data_decadencia": data_decadencia.strftime("%d/%m/%Y") if data_decadencia else "",
+            "modelo": tpl_path.name if tpl_path else "",
+            "docx": str(docx_path) if docx_path else "",
+            "ok": bool(docx_path),
+        })
+    except Exception as e:
+        result["erro"] = str(e)
+    result["segundos"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def regenerar_todos(input_dir: Path, output_dir: Path, workers: int = 0) -> list[dict]:
+    """Regenera todos os oficios encontrados em `input_dir`, em paralelo quando workers > 1."""
+    jobs = find_pdf_pairs(input_dir)
+    if not jobs:
+        return []
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for job in jobs:
+        job["output_dir"] = str(output_dir)
+
+    workers = workers or (os.cpu_count() or 1)
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        return [regenerar_processo(job) for job in jobs]
+
+    results: list[dict] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(regenerar_processo, job): job for job in jobs}
+        for fut in as_completed(futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                job = futures[fut]
+                results.append({"processo": job["slug"], "slug": job["slug"], "ok": False, "erro": str(e)})
+    results.sort(key=lambda r: r.get("slug", ""))
+    return results
+
+
+def resumir(results: list[dict], elapsed: float) -> dict:
+    por_tipo: dict[str, int] = {}
+    por_secretaria: dict[str, int] = {}
+    for r in results:
+        if not r.get("ok"):
+            continue
+        por_tipo[r.get("tipo", "")] = por_tipo.get(r.get("tipo", ""), 0) + 1
+        por_secretaria[r.get("secretaria", "")] = por_secretaria.get(r.get("secretaria", ""), 0) + 1
+    return {
+        "total": len(results),
+        "gerados": sum(1 for r in results if r.get("ok")),
+        "falhas": sum(1 for r in results if not r.get("ok")),
+        "segundos": round(elapsed, 3),
+        "por_tipo": por_tipo,
+        "por_secretaria": por_secretaria,
+        "processos": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Regenera oficios a partir de PDFs ja baixados, sem navegador.")
+    parser.add_argument("--input", default="output", help="Pasta com os PDFs *-ultimo-ato.pdf / *-primeiro-ato.pdf.")
+    parser.add_argument("--output", default="output/offline", help="Pasta de saida dos DOCX regenerados.")
+    parser.add_argument("--workers", type=int, default=0, help="Processos paralelos (0 = numero de CPUs).")
+    parser.add_argument("--summary", default="", help="Arquivo JSON do resumo (padrao: <output>/resumo_offline.json).")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input)
+    output_dir = Path(args.output)
+    if not input_dir.exists():
+        print(f"ERRO: pasta de entrada nao encontrada: {input_dir}")
+        return 2
+
+    from oficios import validar_catalogo_modelos
+
+    validar_catalogo_modelos()
+    started = time.perf_counter()
+    results = regenerar_todos(input_dir, output_dir, workers=args.workers)
+    if not results:
+        print(f"Aviso: nenhum PDF '*{ULTIMO_SUFFIX}' encontrado em {input_dir}.")
+        return 1
+    summary = resumir(results, time.perf_counter() - started)
+
+    summary_path = Path(args.summary) if args.summary else output_dir / "resumo_offline.json"
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for r in results:
+        status = "OK " if r.get("ok") else "ERR"
+        detalhe = r.get("modelo") or r.get("erro") or ""
+        print(f"[{status}] {r.get('processo')}: tipo={r.get('tipo', '-')} secretaria={r.get('secretaria', '-')} prazo={r.get('prazo', '-')} {detalhe}")
+    print(
+        f"Regenerados {summary['gerados']}/{summary['total']} oficios em {summary['segundos']}s "
+        f"(falhas: {summary['falhas']}). Resumo: {summary_path.resolve()}"
+    )
+    return 0 if summary["falhas"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Cache em disco de oficios renderizados, enderecado pelas entradas da renderizacao.
+
+A chave e o SHA-256 do conteudo do modelo, o hash canonico dos campos que o modelo usa
+(chaves e valores como texto, ordenados) e o renderizador. Em uma reexecucao, o mesmo
+processo com os mesmos campos reaproveita o .docx ja gerado: o arquivo e ligado por
+hardlink (ou copiado, se o sistema de arquivos nao permitir) no lugar de ser renderizado
+de novo. O `manifest.json` registra, por chave, o modelo, os hashes de entrada, o
+renderizador, o hash do .docx e a ultima saida gerada a partir dele. O conteudo e
+conferido antes de cada reaproveitamento, e o tamanho total e limitado com descarte LRU.
+
+Varios processos (ex.: os workers do `offline_regen`) podem gravar no mesmo cache: cada
+`save` rele o manifesto sob um lock de arquivo (`manifest.lock`) e aplica por cima so as
+entradas alteradas neste processo.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from pdf_cache import sha256_file
+
+MANIFEST_VERSION = 1
+# mude quando a saida dos renderizadores mudar para as mesmas entradas
+RENDER_VERSION = "1"
+
+
+@contextlib.contextmanager
+def _lock_arquivo(path: Path):
+    """Lock exclusivo entre processos (fcntl no POSIX, msvcrt no Windows)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+
+            fh.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK desiste apos ~10s; continua esperando
+                    pass
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def campos_sha256(mapping: dict) -> str:
+    """Hash canonico do mapeamento (independe da ordem e do tipo dos valores)."""
+    canon = json.dumps(
+        {str(k): str(v) for k, v in mapping.items()}, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+def render_key(modelo_sha256: str, mapping: dict, renderer: str) -> str:
+    raw = f"{RENDER_VERSION}\n{renderer}\n{modelo_sha256}\n{campos_sha256(mapping)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheOficios:
+    """Cache LRU de oficios limitado por `max_bytes`. Seguro para uso entre threads."""
+
+    def __init__(self, root: Path, max_bytes: int = 512 * 1024 ** 2):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self.manifest_path = self.root / "manifest.json"
+        self._lock = threading.RLock()
+        self.entries: dict[str, dict] = {}
+        # alteracoes deste processo ainda nao gravadas (None = entrada removida)
+        self._pendentes: dict[str, Optional[dict]] = {}
+        self._lido_ns = 0
+        self._load()
+
+    def _ler_manifesto(self) -> dict[str, dict]:
+        try:
+            self._lido_ns = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"Aviso: manifesto do cache de oficios ilegivel ({e}); recriando.")
+            return {}
+        if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+            return dict(data.get("entries") or {})
+        return {}
+
+    def _aplicar_pendentes(self, entries: dict[str, dict]) -> dict[str, dict]:
+        for key, entry in self._pendentes.items():
+            if entry is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = entry
+        return entries
+
+    def _load(self) -> None:
+        self.entries = self._aplicar_pendentes(self._ler_manifesto())
+
+    def _recarregar_se_mudou(self) -> None:
+        """Ve entradas gravadas por outros processos desde a ultima leitura."""
+        try:
+            mudou = self.manifest_path.stat().st_mtime_ns != self._lido_ns
+        except FileNotFoundError:
+            mudou = False
+        if mudou:
+            self._load()
+
+    def save(self, keep: str = "") -> None:
+        """Grava o manifesto: rele o do disco sob lock, aplica as alteracoes deste processo e o LRU."""
+        with self._lock, _lock_arquivo(self.root / "manifest.lock"):
+            self._load()
+            self._evict(keep=keep)
+            data = {"version": MANIFEST_VERSION, "entries": self.entries}
+            tmp = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False, sort_keys=True, indent=1), encoding="utf-8")
+            os.replace(tmp, self.manifest_path)
+            self._lido_ns = self.manifest_path.stat().st_mtime_ns
+            self._pendentes.clear()
+
+    def object_path(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / f"{key}.docx"
+
+    def _drop(self, key: str) -> None:
+        self.entries.pop(key, None)
+        self._pendentes[key] = None
+        try:
+            self.object_path(key).unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    def total_bytes(self) -> int:
+        return sum(int(e.get("size") or 0) for e in self.entries.values())
+
+    def materialize(self, key: str, dest: Path) -> Optional[Path]:
+        """Coloca o oficio em cache em `dest` (hardlink ou copia); None se ausente.
+
+        O acesso so e gravado no manifesto no proximo `put` (acertos nao reescrevem o JSON).
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry:
+                self._recarregar_se_mudou()
+                entry = self.entries.get(key)
+            if not entry:
+                return None
+            obj = self.object_path(key)
+            if not obj.exists() or sha256_file(obj) != entry.get("sha256"):
+                print("Aviso: entrada corrompida no cache de oficios; descartando.")
+                self._drop(key)
+                self.save()
+                return None
+            dest = Path(dest)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.unlink(missing_ok=True)
+            try:
+                try:
+                    os.link(obj, dest)
+                except OSError:
+                    shutil.copyfile(obj, dest)
+            except OSError:  # descartado por outro processo entre a conferencia e a copia
+                return None
+            entry["atime"] = time.time()
+            entry["saida"] = str(dest)
+            self._pendentes[key] = entry
+            return dest
+
+    def put_file(self, key: str, path: Path, **meta) -> None:
+        """Guarda o .docx gerado em `path` sob `key`, com os metadados no manifesto."""
+        path = Path(path)
+        with self._lock:
+            obj = self.object_path(key)
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, obj)
+            self.entries[key] = self._pendentes[key] = {
+                **meta,
+                "sha256": sha256_file(obj),
+                "size": obj.stat().st_size,
+                "atime": time.time(),
+                "saida": str(path),
+            }
+            self.save(keep=key)
+
+    def _evict(self, keep: str = "") -> None:
+        if not self.max_bytes:
+            return
+        total = self.total_bytes()
+        for key, _ in sorted(self.entries.items(), key=lambda kv: kv[1].get("atime") or 0):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= int(self.entries[key].get("size") or 0)
+            self._drop(key)
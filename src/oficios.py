@@ -0,0 +1,399 @@
+"""Geracao do oficio: catalogo de modelos, renderizacao (ooxml/python-docx/Word) e cache."""
+import os
+import re
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from classificador import get_classificador
+from comum import _pt_data_extenso_from_ddmmyyyy, env_bool, safe_filename
+from documento import AnaliseDocumento, analisar_documento
+from modelos import (
+    CatalogoModelos,
+    get_cache_modelos,
+    indexar as indexar_placeholders,
+    substituir as substituir_placeholders,
+)
+from oficio_cache import CacheOficios, campos_sha256, render_key
+
+
+def _docx_replace_all(doc, mapping: dict[str, str]) -> int:
+    """Substitui os placeholders de `mapping` no corpo, tabelas, cabecalhos e rodapes.
+
+    Placeholders divididos em varios runs tambem sao trocados. Para modelos do cache,
+    prefira `get_cache_modelos().get(path).renderizar(mapping)`, que reaproveita o indice.
+    """
+    return substituir_placeholders(doc, indexar_placeholders(doc), mapping)
+
+
+_CATALOGO_MODELOS: Optional[CatalogoModelos] = None
+
+
+def _get_catalogo_modelos() -> CatalogoModelos:
+    """Catalogo das pastas de modelos, montado uma vez (MODELOS_WATCH_SECONDS > 0 reconfere
+    as pastas periodicamente)."""
+    global _CATALOGO_MODELOS
+    if _CATALOGO_MODELOS is None:
+        classificador = get_classificador()
+        secretarias = [r.valor for r in classificador.regras if r.alvo == "secretaria"]
+        try:
+            watch = float(os.getenv("MODELOS_WATCH_SECONDS", "0") or 0)
+        except ValueError:
+            watch = 0.0
+        _CATALOGO_MODELOS = CatalogoModelos(
+            secretarias=[classificador.padrao["secretaria"], *secretarias],
+            secretaria_padrao=classificador.padrao["secretaria"],
+            template=os.getenv("OFICIO_TEMPLATE", ""),
+            templates_dir=os.getenv("OFICIO_TEMPLATES_DIR", ""),
+            watch_seconds=watch,
+        )
+    return _CATALOGO_MODELOS
+
+
+def validar_catalogo_modelos() -> bool:
+    """Avisa (uma vez, no inicio) sobre combinacoes tipo x secretaria sem modelo proprio."""
+    problemas = _get_catalogo_modelos().validar()
+    for p in problemas:
+        print(f"Aviso: modelos: {p}")
+    return not problemas
+
+
+def _resolve_oficio_template() -> Optional[Path]:
+    """Resolve template path from env vars (resolvido uma vez no catalogo de modelos).
+
+    Regras:
+    - Se OFICIO_TEMPLATE apontar para um arquivo (.docx ou .dotx) existente, usa.
+    - Se OFICIO_TEMPLATE for apenas nome de arquivo e OFICIO_TEMPLATES_DIR existir, usa o arquivo dentro da pasta.
+    - Caso contrário, se OFICIO_TEMPLATES_DIR existir, escolhe o primeiro .docx; se não houver .docx, escolhe .dotx.
+    - Senão, tenta templates/oficio_modelo.docx
+    """
+    return _get_catalogo_modelos().padrao()
+
+
+def _word_generate_from_dotx(template_path: Path, out_path: Path, mapping: dict[str, str]) -> bool:
+    """Gera DOCX a partir de um .dotx usando Microsoft Word (COM automation).
+
+    Requisitos: MS Word instalado; pywin32 disponível. Retorna True em sucesso.
+    """
+    try:
+        import win32com.client  # type: ignore
+        from win32com.client import constants  # type: ignore
+    except Exception as e:
+        print(f"Aviso: pywin32/Word indisponivel ({e}).")
+        return False
+
+    word = None
+    doc = None
+    try:
+        word = win32com.client.DispatchEx("Word.Application")
+        word.Visible = False
+        doc = word.Documents.Add(Template=str(template_path))
+        # Find/Replace para cada placeholder
+        for k, v in mapping.items():
+            find = word.Selection.Find
+            find.ClearFormatting()
+            find.Replacement.ClearFormatting()
+            find.Text = k
+            find.Replacement.Text = v
+            find.Forward = True
+            find.Wrap = 1  # wdFindContinue
+            find.Format = False
+            find.MatchCase = False
+            find.MatchWholeWord = False
+            find.MatchByte = False
+            find.MatchWildcards = False
+            find.MatchSoundsLike = False
+            find.MatchAllWordForms = False
+            find.Execute(Replace=2)  # wdReplaceAll
+        # Salva como DOCX
+        doc.SaveAs2(str(out_path), FileFormat=constants.wdFormatXMLDocument)
+        return True
+    except Exception as e:
+        print(f"Aviso: falha no Word ao gerar a partir do DOTX: {e}")
+        return False
+    finally:
+        try:
+            if doc is not None:
+                doc.Close(SaveChanges=False)
+        except Exception:
+            pass
+        try:
+            if word is not None:
+                word.Quit()
+        except Exception:
+            pass
+
+
+def _oficio_renderer() -> str:
+    """OFICIO_RENDERER: `ooxml` (padrao; direto no pacote, cai no python-docx quando
+    o modelo ou os valores nao permitem) ou `python-docx`."""
+    r = (os.getenv("OFICIO_RENDERER") or "ooxml").strip().lower()
+    return r if r in ("ooxml", "python-docx") else "ooxml"
+
+
+_OFICIO_CACHE: Optional[CacheOficios] = None
+
+
+def _get_oficio_cache() -> Optional[CacheOficios]:
+    """Cache de oficios renderizados (OFICIO_CACHE=false desativa)."""
+    global _OFICIO_CACHE
+    if _OFICIO_CACHE is None and env_bool("OFICIO_CACHE", True):
+        try:
+            max_mb = float(os.getenv("OFICIO_CACHE_MAX_MB", "512") or 0)
+        except ValueError:
+            max_mb = 512
+        _OFICIO_CACHE = CacheOficios(Path(os.getenv("OFICIO_CACHE_DIR", "cache/oficios")), max_bytes=int(max_mb * 1024 * 1024))
+    return _OFICIO_CACHE
+
+
+def _salvar_oficio(modelo, mapping: dict[str, str], out_path: Path) -> str:
+    """Renderiza o modelo em `out_path`, reaproveitando o oficio em cache se as entradas
+    (conteudo do modelo, campos usados pelo modelo e renderizador) forem as mesmas.
+    Campos que o modelo nao usa (ex.: {{DATA}} em modelos com @@data_extenso) ficam fora
+    da chave. Devolve a origem."""
+    renderer = _oficio_renderer()
+    # o arquivo anterior pode ser hardlink de um objeto do cache: nunca reescrever no lugar
+    out_path.unlink(missing_ok=True)
+    cache = _get_oficio_cache()
+    usados = modelo.campos_usados(mapping) if cache else {}
+    key = render_key(modelo.sha256, usados, renderer) if cache else ""
+    if cache and cache.materialize(key, out_path):
+        return "cache"
+    usado = modelo.salvar(mapping, out_path, renderer=renderer)
+    if cache:
+        try:
+            cache.put_file(
+                key, out_path, modelo=str(modelo.path), modelo_sha256=modelo.sha256,
+                campos_sha256=campos_sha256(usados), renderer=usado,
+            )
+        except Exception as e:
+            print(f"Aviso: nao foi possivel gravar o oficio no cache: {e}")
+    return usado
+
+
+def _python_generate_from_dotx(template_path: Path, out_path: Path, mapping: dict[str, str]) -> bool:
+    """Gera DOCX a partir de um .dotx executando substituicoes sem MS Word.
+
+    A conversao DOTX -> DOCX e o parse ficam no cache de modelos (`modelos.py`); o
+    renderizador segue OFICIO_RENDERER e oficios ja gerados com as mesmas entradas vem do
+    cache de oficios (`oficio_cache.py`). Retorna True em sucesso.
+    """
+    try:
+        _salvar_oficio(get_cache_modelos().get(template_path), mapping, out_path)
+        return True
+    except Exception as e:
+        print(f"Aviso: falha ao gerar DOCX a partir do DOTX: {e}")
+        return False
+
+
+def _python_convert_dotx_only(template_path: Path, out_path: Path) -> bool:
+    """Converte .dotx em .docx SEM alterar o conteúdo (apenas ajusta o content-type OOXML).
+
+    Não requer MS Word. Evita reserialização do documento para garantir que nenhum
+    conteúdo/formatacao seja modificado.
+    """
+    try:
+        out_path.write_bytes(get_cache_modelos().get(template_path).docx_bytes)
+        return True
+    except Exception as e:
+        print(f"Aviso: conversão DOTX->DOCX sem alterações falhou: {e}")
+        return False
+
+
+def generate_oficio_from_template(processo: str, output_dir: Path, extra: dict | None = None, template_path: Optional[Path] = None) -> Path | None:
+    """Generate a DOCX response using a template when available; fallback to a simple layout.
+
+    Preferred placeholders in templates: {{NUM_PROCESSO}}, {{DATA}}, plus any provided in `extra`.
+    If no .docx template is found (or .dotx is provided), falls back to creating a minimal DOCX.
+    """
+    try:
+        from docx import Document  # type: ignore
+    except Exception as e:
+        print(f"Aviso: python-docx nao instalado ({e}). Pulei geracao do oficio.")
+        return None
+
+    mapping = {"{{NUM_PROCESSO}}": processo, "{{DATA}}": date.today().strftime("%d/%m/%Y")}
+    if extra:
+        mapping.update({str(k): str(v) for k, v in extra.items()})
+
+    # Alias uteis para modelos que usam nomes diferentes
+    nome = mapping.get("{{INTERESSADO}}") or mapping.get("{{REQUERENTE}}")
+    if nome:
+        mapping.setdefault("{{NOME}}", nome)
+        mapping.setdefault("{{NOME_COMPLETO}}", nome)
+
+    # Garantir placeholders @@ usados no DOTX
+    proc_val = mapping.get("{{NUM_PROCESSO}}", processo) or processo or ""
+    mapping.setdefault("@@processo", proc_val)
+    # Data por extenso, baseada na data do documento (se houver)
+    data_doc = mapping.get("{{DATA_DOCUMENTO}}")
+    if data_doc and re.match(r"\d{1,2}/\d{1,2}/\d{4}", str(data_doc)):
+        mapping.setdefault("@@data_extenso", _pt_data_extenso_from_ddmmyyyy(str(data_doc)))
+    elif data_doc:
+        mapping.setdefault("@@data_extenso", str(data_doc))
+    else:
+        mapping.setdefault("@@data_extenso", _pt_data_extenso_from_ddmmyyyy(date.today().strftime("%d/%m/%Y")))
+
+    # Numero do ofício (env ou s/n)
+    mapping.setdefault("@@numero_oficio", os.getenv("NUMERO_OFICIO", "s/n"))
+
+    # Nome do interessado para @@Nome_interessado
+    if nome:
+        mapping.setdefault("@@Nome_interessado", nome)
+
+    # Demais chaves @@ com valor padrão vazio para evitar lixos no DOCX
+    for key in (
+        "@@natureza_processo",
+        "@@Tipo_Processo",
+        "@@processoexterno",
+        "@@nome_relator",
+        "@@instancia",
+    ):
+        mapping.setdefault(key, "")
+
+    doc: Optional["Document"] = None
+    # Allow override via argument; otherwise resolve from env
+    template_path = template_path or _resolve_oficio_template()
+    if template_path and template_path.exists():
+        if template_path.suffix.lower() == ".dotx":
+            out_path = output_dir / f"oficio_{safe_filename(processo)}.docx"
+            convert_only = env_bool("OFICIO_CONVERT_ONLY", False)
+            if convert_only:
+                # Apenas converter DOTX -> DOCX, sem substituir placeholders
+                ok = _python_convert_dotx_only(template_path, out_path)
+                if ok:
+                    print(f"Oficio convertido de DOTX para DOCX (sem alterações): {out_path.resolve()}")
+                    return out_path
+                # Fallback com Word (sem replace)
+                ok2 = _word_generate_from_dotx(template_path, out_path, mapping={})
+                if ok2:
+                    print(f"Oficio convertido via Word (sem alterações): {out_path.resolve()}")
+                    return out_path
+                print("Aviso: conversão DOTX->DOCX (sem alterações) falhou; usando modelo simples.")
+            else:
+                # 1) Tenta gerar sem Word (OOXML direto ou python-docx) a partir do modelo em cache
+                ok = _python_generate_from_dotx(template_path, out_path, mapping)
+                if ok:
+                    print(f"Oficio gerado (DOTX) em: {out_path.resolve()}")
+                    return out_path
+                # 2) Fallback: tenta MS Word via COM
+                ok2 = _word_generate_from_dotx(template_path, out_path, mapping)
+                if ok2:
+                    print(f"Oficio gerado (Word/DOTX) em: {out_path.resolve()}")
+                    return out_path
+                else:
+                    print("Aviso: conversao DOTX->DOCX falhou; usando modelo simples.")
+        else:
+            modelo = None
+            try:
+                modelo = get_cache_modelos().get(template_path)
+            except Exception as e:
+                print(f"Aviso: nao foi possivel abrir o template '{template_path.name}' ({e}). Usando modelo simples.")
+            if modelo is not None:
+                out_path = output_dir / f"oficio_{safe_filename(processo)}.docx"
+                try:
+                    origem = _salvar_oficio(modelo, mapping, out_path)
+                    print(f"Oficio gerado em: {out_path.resolve()}" + (" (reaproveitado do cache)" if origem == "cache" else ""))
+                    return out_path
+                except Exception as e:
+                    print(f"Aviso: falha ao salvar oficio: {e}")
+                    return None
+
+    if doc is None:
+        # Fallback: cria um documento basico com campos comuns
+        doc = Document()
+        doc.add_heading(f"Oficio – Processo {processo}", level=1)
+        doc.add_paragraph(f"Data: {mapping.get('{{DATA}}','')}")
+        if extra:
+            # Inclui alguns campos relevantes quando existirem
+            for k in ("{{ASSUNTO}}", "{{INTERESSADO}}", "{{REQUERENTE}}", "{{DATA_DOCUMENTO}}"):
+                v = mapping.get(k)
+                if v:
+                    label = k.strip("{} ")
+                    doc.add_paragraph(f"{label}: {v}")
+        doc.add_paragraph("")
+        corpo = mapping.get("{{EXTRATO}}") or ""
+        if corpo:
+            doc.add_paragraph(corpo)
+        else:
+            doc.add_paragraph("Em atendimento, encaminhamos resposta referente ao processo informado.")
+
+    out_path = output_dir / f"oficio_{safe_filename(processo)}.docx"
+    try:
+        doc.save(str(out_path))
+        print(f"Oficio gerado em: {out_path.resolve()}")
+        return out_path
+    except Exception as e:
+        print(f"Aviso: falha ao salvar oficio: {e}")
+        return None
+
+
+def _select_template_for(tipo: str, secretaria: str) -> Optional[Path]:
+    """Seleciona o arquivo de modelo correto com base no tipo e secretaria.
+
+    Consulta o catalogo das pastas locais mapeadas (`modelos.CatalogoModelos`, listado
+    uma vez): o arquivo cujo nome contem a secretaria, preferindo .docx; se não houver,
+    .dotx.
+    """
+    return _get_catalogo_modelos().modelo_para(tipo, secretaria)
+
+
+def _ensure_docx_if_doc(template_path: Path) -> Path:
+    """Se o template for .doc, tenta converter para .docx usando MS Word (COM).
+
+    Retorna o .docx correspondente quando convertido; caso contrário, retorna o caminho original.
+    """
+    suf = template_path.suffix.lower()
+    if suf != ".doc":
+        return template_path
+    out_path = template_path.with_suffix(".docx")
+    if out_path.exists():
+        return out_path
+    try:
+        import win32com.client  # type: ignore
+        from win32com.client import constants  # type: ignore
+    except Exception:
+        print("Aviso: pywin32/Word indisponivel para converter .doc -> .docx. Usando modelo original .doc.")
+        return template_path
+    try:
+        word = win32com.client.DispatchEx("Word.Application")
+        word.Visible = False
+        doc = word.Documents.Open(str(template_path))
+        doc.SaveAs2(str(out_path), FileFormat=constants.wdFormatXMLDocument)
+        doc.Close(SaveChanges=False)
+        word.Quit()
+        return out_path if out_path.exists() else template_path
+    except Exception as e:
+        print(f"Aviso: falha ao converter .doc para .docx ({e}). Usando modelo original .doc.")
+        try:
+            word.Quit()
+        except Exception:
+            pass
+        return template_path
+
+
+def classify_and_select_template_path(
+    pdf_text: str,
+    last_piece_name: Optional[str],
+    cover_text: Optional[str] = None,
+    analise: Optional[AnaliseDocumento] = None,
+) -> Optional[Path]:
+    """Aplica a classificação e retorna o Path do modelo selecionado, se encontrado.
+
+    Usa o PDF da capa (cover_text) para identificar melhor a secretaria quando disponível
+    e também para avaliar as palavras-chave de escolha do modelo. Quem ja tem o
+    `AnaliseDocumento` do processo o repassa em `analise` e o texto nao e reanalisado.
+    """
+    if analise is None:
+        analise = analisar_documento(pdf_text or "", last_piece_name, cover_text)
+    tipo, secretaria = analise.tipo, analise.secretaria
+    p = _select_template_for(tipo, secretaria)
+    if not p:
+        print(f"Aviso: nenhum modelo encontrado para tipo={tipo} secretaria={secretaria}. Usando configuração padrão se existir.")
+        return None
+    p2 = _ensure_docx_if_doc(p)
+    try:
+        print(f"Modelo selecionado: tipo={tipo}, secretaria={secretaria}, arquivo={p2.name}")
+    except Exception:
+        pass
+    return p2
@@ -0,0 +1,232 @@
+"""Renderizacao de oficios direto no pacote OOXML, sem o modelo de objetos do python-docx.
+
+Na compilacao (uma vez por modelo), cada placeholder dividido em varios runs e juntado no
+run onde comeca, exatamente como a substituicao do python-docx faria (`modelos.substituir`),
+e cada run com placeholder vira uma marca no XML serializado. O XML de cada parte com
+placeholders fica guardado como uma lista de trechos fixos e marcas. Renderizar e so juntar
+os trechos com o conteudo dos runs (texto escapado, tabs e quebras como o python-docx
+escreve), comprimir essas partes e montar o zip copiando os bytes ja comprimidos das
+demais partes.
+
+O texto de cada paragrafo sai igual ao do caminho python-docx e, quando todos os
+placeholders do modelo recebem valor, o XML das partes com placeholders e identico byte a
+byte; as demais partes sao copiadas do modelo como estao (o python-docx as reserializa).
+Modelos com runs que misturam placeholder e outro conteudo (imagem, campo), e mapeamentos
+com chaves que nao sao placeholders mas aparecem no texto, nao sao aceitos; nesses casos
+quem chama usa o python-docx.
+"""
+import io
+import re
+import struct
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from modelos import PLACEHOLDER_RE, ModeloCompilado, _paragrafos, _redistribuir, partes_texto
+
+# marcas em caracteres de uso privado: nao aparecem em modelos reais e sao XML validos
+_RUN_INI, _RUN_FIM = "\ue000", "\ue001"
+_PH_INI, _PH_FIM = "\ue002", "\ue003"
+_RUN_MARCA = re.compile(rb"<w:t>\xee\x80\x80(\d+)\xee\x80\x81</w:t>")
+_PH_MARCA = re.compile(_PH_INI + r"(\d+)" + _PH_FIM)
+_XML_INVALIDO = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+_CONTROLE = re.compile(r"([\t\r\n])")
+_TEXTO_RUN = {"rPr", "t", "tab", "br", "cr", "noBreakHyphen", "ptab"}
+
+_LOCAL_HEADER = "<4s2B4HL2L2H"
+_CENTRAL_DIR = "<4s4B4HL2L5H2L"
+_END_ARCHIVE = "<4s4H2LH"
+
+
+class OoxmlNaoSuportado(ValueError):
+    pass
+
+
+def _escape(texto: str) -> str:
+    return texto.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def conteudo_run(texto: str) -> str:
+    """XML do conteudo de um run com `texto`, igual ao que `Run.text = texto` gera."""
+    out = []
+    for pedaco in _CONTROLE.split(texto):
+        if not pedaco:
+            continue
+        if pedaco == "\t":
+            out.append("<w:tab/>")
+        elif pedaco in "\r\n":
+            out.append("<w:br/>")
+        elif len(pedaco.strip()) < len(pedaco):
+            out.append(f'<w:t xml:space="preserve">{_escape(pedaco)}</w:t>')
+        else:
+            out.append(f"<w:t>{_escape(pedaco)}</w:t>")
+    return "".join(out)
+
+
+@dataclass(frozen=True)
+class _Membro:
+    nome: bytes
+    flags: int
+    metodo: int
+    hora: int
+    data: int
+    crc: int
+    tamanho: int
+    dados: bytes  # ja comprimidos com `metodo`
+
+
+def _membros(pacote: bytes) -> list[tuple[zipfile.ZipInfo, _Membro]]:
+    """Membros do zip com os bytes comprimidos originais (sem descomprimir)."""
+    out = []
+    with zipfile.ZipFile(io.BytesIO(pacote)) as z:
+        for info in z.infolist():
+            if info.flag_bits & 0x1 or info.file_size >= 0xFFFFFFFF or info.compress_size >= 0xFFFFFFFF:
+                raise OoxmlNaoSuportado(f"membro '{info.filename}' criptografado ou zip64")
+            cab = struct.unpack(_LOCAL_HEADER, pacote[info.header_offset:info.header_offset + 30])
+            ini = info.header_offset + 30 + cab[10] + cab[11]  # nome + campo extra
+            nome = info.filename.encode("utf-8")
+            hora = (info.date_time[3] << 11) | (info.date_time[4] << 5) | (info.date_time[5] // 2)
+            data = ((info.date_time[0] - 1980) << 9) | (info.date_time[1] << 5) | info.date_time[2]
+            membro = _Membro(
+                nome, 0x800 if not nome.isascii() else 0, info.compress_type, hora, data,
+                info.CRC, info.file_size, pacote[ini:ini + info.compress_size],
+            )
+            out.append((info, membro))
+    return out
+
+
+def _deflate(data: bytes) -> bytes:
+    c = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return c.compress(data) + c.flush()
+
+
+def montar_zip(membros: list[_Membro]) -> bytes:
+    partes: list[bytes] = []
+    central: list[bytes] = []
+    pos = 0
+    for m in membros:
+        cab = struct.pack(
+            _LOCAL_HEADER, b"PK\x03\x04", 20, 0, m.flags, m.metodo, m.hora, m.data,
+            m.crc, len(m.dados), m.tamanho, len(m.nome), 0,
+        )
+        central.append(struct.pack(
+            _CENTRAL_DIR, b"PK\x01\x02", 20, 0, 20, 0, m.flags, m.metodo, m.hora, m.data,
+            m.crc, len(m.dados), m.tamanho, len(m.nome), 0, 0, 0, 0, 0, pos,
+        ) + m.nome)
+        partes += (cab, m.nome, m.dados)
+        pos += len(cab) + len(m.nome) + len(m.dados)
+    cd = b"".join(central)
+    fim = struct.pack(_END_ARCHIVE, b"PK\x05\x06", 0, 0, len(membros), len(membros), len(cd), pos, 0)
+    return b"".join(partes) + cd + fim
+
+
+# Run com placeholder: trechos fixos (str) e indices em `ModeloOoxml.placeholders` (int)
+_ModeloRun = tuple[Union[str, int], ...]
+
+
+@dataclass(frozen=True)
+class _ParteDinamica:
+    membro: int  # posicao na lista de membros do zip
+    trechos: tuple[bytes, ...]  # XML fixo; entre dois trechos vai o run `runs[i]`
+    runs: tuple[_ModeloRun, ...]
+
+
+class ModeloOoxml:
+    """Modelo pre-compilado para substituicao direta nos bytes do pacote."""
+
+    def __init__(self, modelo: ModeloCompilado):
+        doc = modelo.novo_documento()
+        indice = modelo.indice
+        self.placeholders: list[str] = []
+        partes = partes_texto(doc)
+        nomes = [str(p.partname).lstrip("/") for p in partes]
+        runs: list[_ModeloRun] = []
+        paragrafos: dict[int, list] = {}
+        for loc in indice.locais:
+            if not PLACEHOLDER_RE.search(loc.texto):
+                continue
+            if loc.parte not in paragrafos:
+                paragrafos[loc.parte] = _paragrafos(partes[loc.parte])
+            r_lst = paragrafos[loc.parte][loc.paragrafo].r_lst
+            textos = [r.text for r in r_lst]
+            texto = "".join(textos)
+            trocas = []
+            for m in PLACEHOLDER_RE.finditer(texto):
+                trocas.append((m.start(), m.end(), f"{_PH_INI}{len(self.placeholders)}{_PH_FIM}"))
+                self.placeholders.append(m.group())
+            for r, antigo, novo in zip(r_lst, textos, _redistribuir(textos, trocas)):
+                if _PH_INI in novo:
+                    if any(c.tag.rpartition("}")[2] not in _TEXTO_RUN for c in r):
+                        raise OoxmlNaoSuportado("run com placeholder e conteudo que nao e texto")
+                    r.text = f"{_RUN_INI}{len(runs)}{_RUN_FIM}"
+                    runs.append(tuple(
+                        int(p) if i % 2 else p for i, p in enumerate(_PH_MARCA.split(novo)) if i % 2 or p
+                    ))
+                elif novo != antigo:
+                    r.text = novo
+
+        from docx.opc.oxml import serialize_part_xml  # type: ignore
+
+        membros = _membros(modelo.docx_bytes)
+        pos_membro = {info.filename: i for i, (info, _) in enumerate(membros)}
+        self._membros = [m for _, m in membros]
+        self._dinamicas: list[_ParteDinamica] = []
+        vistos = 0
+        for parte, nome in zip(partes, nomes):
+            xml = serialize_part_xml(parte.element)
+            pedacos = _RUN_MARCA.split(xml)
+            if len(pedacos) == 1:
+                continue
+            if nome not in pos_membro:
+                raise OoxmlNaoSuportado(f"parte '{nome}' fora do pacote")
+            ids = [int(x) for x in pedacos[1::2]]
+            vistos += len(ids)
+            self._dinamicas.append(_ParteDinamica(
+                pos_membro[nome], tuple(pedacos[0::2]), tuple(runs[i] for i in ids)
+            ))
+        if vistos != len(runs):
+            raise OoxmlNaoSuportado("marcas de run nao encontradas no XML serializado")
+        self._textos = [loc.texto for loc in indice.locais]
+        self._tokens = set(self.placeholders)
+
+    def aceita(self, mapping: dict[str, str]) -> bool:
+        """False quando o resultado poderia divergir do caminho python-docx."""
+        for k, v in mapping.items():
+            if not k:
+                continue
+            if k in self._tokens or PLACEHOLDER_RE.fullmatch(k):
+                if _XML_INVALIDO.search(str(v)):
+                    return False
+            elif any(k in t for t in self._textos):
+                return False
+        return True
+
+    def _valor(self, ph: str, mapping: dict[str, str]) -> str:
+        if ph in mapping:
+            return str(mapping[ph])
+        # como a passada de regex do python-docx: a chave mais longa que e prefixo vence
+        melhor: Optional[str] = None
+        if ph.startswith("@@"):
+            for k in mapping:
+                if k and ph.startswith(k) and PLACEHOLDER_RE.fullmatch(k) and (melhor is None or len(k) > len(melhor)):
+                    melhor = k
+        return ph if melhor is None else str(mapping[melhor]) + ph[len(melhor):]
+
+    def renderizar(self, mapping: dict[str, str]) -> bytes:
+        """Bytes do .docx com `mapping` aplicado (use `aceita` antes)."""
+        valores = [self._valor(ph, mapping) for ph in self.placeholders]
+        membros = list(self._membros)
+        for d in self._dinamicas:
+            saida = [d.trechos[0]]
+            for run, trecho in zip(d.runs, d.trechos[1:]):
+                texto = "".join(p if isinstance(p, str) else valores[p] for p in run)
+                saida.append(conteudo_run(texto).encode("utf-8"))
+                saida.append(trecho)
+            xml = b"".join(saida)
+            m = membros[d.membro]
+            membros[d.membro] = _Membro(
+                m.nome, m.flags, zipfile.ZIP_DEFLATED, m.hora, m.data,
+                zlib.crc32(xml), len(xml), _deflate(xml),
+            )
+        return montar_zip(membros)
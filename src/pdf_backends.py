@@ -0,0 +1,208 @@
+"""Backends de extracao de texto de PDF.
+
+Todos expoem a mesma interface (`available`, `version`, `page_count`, `extract_pages`) e
+sao registrados em BACKENDS. O backend usado pelo fluxo vem de PDF_TEXT_BACKEND:
+`pypdf` (padrao), `pdftotext` (poppler, via subprocesso; PDFTOTEXT_CMD aponta o
+executavel no Windows) ou `auto`, que usa a escolha gravada pelo benchmark
+(`tools/benchmark_pdf_backends.py`). Backend indisponivel cai para o pypdf com aviso.
+"""
+import functools
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_CHOICE_PATH = "cache/pdf_backend.json"
+
+
+def _file_key(pdf_path: Path) -> tuple:
+    """(caminho, tamanho, mtime): identifica o arquivo inalterado entre chamadas."""
+    st = os.stat(pdf_path)
+    return Path(pdf_path), st.st_size, st.st_mtime_ns
+
+
+class PdfTextBackend:
+    name = ""
+
+    def available(self) -> bool:
+        raise NotImplementedError
+
+    def version(self) -> str:
+        """Identifica o extrator (entra na chave do cache de texto)."""
+        raise NotImplementedError
+
+    def page_count(self, pdf_path: Path) -> int:
+        raise NotImplementedError
+
+    def extract_pages(self, pdf_path: Path, indices: Iterable[int]) -> Iterator[tuple[int, Optional[str]]]:
+        """Gera (indice 0-based, texto) na ordem pedida.
+
+        Pagina sem texto rende ''; falha na extracao (excecao, timeout, executavel ausente)
+        rende None, para que o chamador nao a grave no cache como pagina vazia.
+        """
+        raise NotImplementedError
+
+
+class PypdfBackend(PdfTextBackend):
+    name = "pypdf"
+
+    def __init__(self) -> None:
+        self._reader = None
+        self._reader_key: Optional[tuple] = None
+
+    def available(self) -> bool:
+        try:
+            import pypdf  # type: ignore  # noqa: F401
+        except Exception:
+            return False
+        return True
+
+    def version(self) -> str:
+        import pypdf  # type: ignore
+
+        return f"pypdf-extract_text-1/{pypdf.__version__}"
+
+    def _open(self, pdf_path: Path):
+        # a instancia e reaproveitada entre documentos: o leitor vale para o mesmo arquivo inalterado
+        key = _file_key(pdf_path)
+        if self._reader is None or self._reader_key != key:
+            from pypdf import PdfReader  # type: ignore
+
+            self._reader = PdfReader(str(pdf_path))
+            self._reader_key = key
+        return self._reader
+
+    def page_count(self, pdf_path: Path) -> int:
+        return len(self._open(pdf_path).pages)
+
+    def extract_pages(self, pdf_path: Path, indices: Iterable[int]) -> Iterator[tuple[int, Optional[str]]]:
+        reader = self._open(pdf_path)
+        for i in indices:
+            try:
+                txt: Optional[str] = reader.pages[i].extract_text() or ""
+            except Exception:
+                txt = None
+            yield i, txt
+
+
+@functools.lru_cache(maxsize=None)
+def _pdftotext_version(cmd: str) -> str:
+    """`pdftotext -v` uma unica vez por executavel."""
+    try:
+        out = subprocess.run([cmd, "-v"], capture_output=True, text=True, timeout=10)
+        m = re.search(r"(\d+\.\d+(?:\.\d+)?)", (out.stdout or "") + (out.stderr or ""))
+        return f"pdftotext-1/{m.group(1) if m else 'unknown'}"
+    except Exception:
+        return "pdftotext-1/unknown"
+
+
+class PdftotextBackend(PdfTextBackend):
+    """poppler-utils `pdftotext`; paginas contiguas saem numa unica chamada (separador \\f)."""
+
+    name = "pdftotext"
+
+    def __init__(self) -> None:
+        # texto completo do ultimo PDF, quando ele teve de ser extraido so para contar paginas
+        self._full: Optional[tuple[tuple, list[str]]] = None
+
+    def _cmd(self) -> Optional[str]:
+        return os.getenv("PDFTOTEXT_CMD") or shutil.which("pdftotext")
+
+    def available(self) -> bool:
+        return bool(self._cmd())
+
+    def version(self) -> str:
+        return _pdftotext_version(self._cmd() or "pdftotext")
+
+    def page_count(self, pdf_path: Path) -> int:
+        pdfinfo = os.getenv("PDFINFO_CMD") or shutil.which("pdfinfo")
+        if pdfinfo:
+            try:
+                out = subprocess.run([pdfinfo, str(pdf_path)], capture_output=True, text=True, timeout=60)
+                m = re.search(r"^Pages:\s+(\d+)", out.stdout or "", re.MULTILINE)
+                if m:
+                    return int(m.group(1))
+            except Exception:
+                pass
+        pypdf_backend = PypdfBackend()
+        if pypdf_backend.available():
+            try:
+                return pypdf_backend.page_count(pdf_path)
+            except Exception:
+                pass
+        self._full = (_file_key(pdf_path), self._run(pdf_path, 1, 0))
+        return len(self._full[1])
+
+    def _run(self, pdf_path: Path, first: int, last: int) -> list[str]:
+        """Paginas `first`..`last` (1-based; last=0 = ate o fim), uma string por pagina."""
+        args = [self._cmd(), "-enc", "UTF-8", "-f", str(first)]
+        if last:
+            args += ["-l", str(last)]
+        out = subprocess.run(args + [str(pdf_path), "-"], capture_output=True, timeout=300)
+        if out.returncode != 0:
+            raise RuntimeError((out.stderr or b"").decode("utf-8", "replace").strip() or "pdftotext falhou")
+        pages = out.stdout.decode("utf-8", "replace").split("\f")
+        if pages and not pages[-1].strip():
+            pages.pop()
+        return pages
+
+    def extract_pages(self, pdf_path: Path, indices: Iterable[int]) -> Iterator[tuple[int, Optional[str]]]:
+        if self._full and self._full[0] == _file_key(pdf_path):
+            # mesmo documento cuja contagem de paginas exigiu a extracao completa
+            texts = self._full[1]
+            for i in indices:
+                yield i, (texts[i] if i < len(texts) else "")
+            return
+        idx = list(indices)
+        pos = 0
+        while pos < len(idx):
+            # agrupa indices consecutivos numa unica chamada
+            end = pos
+            while end + 1 < len(idx) and idx[end + 1] == idx[end] + 1:
+                end += 1
+            try:
+                texts: Optional[list[str]] = self._run(pdf_path, idx[pos] + 1, idx[end] + 1)
+            except Exception:
+                texts = None
+            for k, i in enumerate(idx[pos:end + 1]):
+                if texts is None:
+                    yield i, None
+                else:
+                    yield i, (texts[k] if k < len(texts) else "")
+            pos = end + 1
+
+
+BACKENDS = {b.name: b for b in (PypdfBackend, PdftotextBackend)}
+
+
+def available_backends() -> list[str]:
+    return [name for name, cls in BACKENDS.items() if cls().available()]
+
+
+def load_choice(path: Optional[Path] = None) -> str:
+    """Backend escolhido pelo benchmark ('' se nao houver escolha gravada)."""
+    p = Path(path or os.getenv("PDF_BACKEND_CHOICE_PATH", DEFAULT_CHOICE_PATH))
+    try:
+        return str(json.loads(p.read_text(encoding="utf-8")).get("backend") or "")
+    except Exception:
+        return ""
+
+
+def get_backend(name: str = "") -> PdfTextBackend:
+    """Instancia o backend pedido (ou PDF_TEXT_BACKEND); cai para o pypdf se indisponivel."""
+    name = (name or os.getenv("PDF_TEXT_BACKEND", "pypdf") or "pypdf").strip().lower()
+    if name == "auto":
+        name = load_choice() or "pypdf"
+    cls = BACKENDS.get(name)
+    if cls is None:
+        print(f"Aviso: backend de PDF desconhecido '{name}'; usando pypdf.")
+        return PypdfBackend()
+    backend = cls()
+    if not backend.available():
+        if name != "pypdf":
+            print(f"Aviso: backend de PDF '{name}' indisponivel; usando pypdf.")
+        return PypdfBackend()
+    return backend
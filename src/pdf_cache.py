@@ -0,0 +1,168 @@
+"""Cache em disco de PDFs do portal, enderecado por conteudo.
+
+Os bytes ficam em `objects/<aa>/<sha256>.pdf` (um arquivo por conteudo distinto); um
+indice JSON associa chaves do portal (`cod:<cod_arquivo_digital_criptografado>` ou
+`url:<url>|<etag>|<content-length>`) ao SHA-256. A leitura confere o hash antes de
+entregar o arquivo e o tamanho total e limitado com descarte LRU. O cache fica fora
+de `output/`, portanto sobrevive ao `cleanup_output_dir` do inicio de cada execucao.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+INDEX_VERSION = 1
+
+
+def cod_key(cod: str) -> str:
+    return f"cod:{cod}" if cod else ""
+
+
+def url_key(url: str, etag: str = "", content_length: str = "") -> str:
+    """Chave por URL; so e estavel com ETag ou Content-Length, senao retorna ''."""
+    if not url or not (etag or content_length):
+        return ""
+    return f"url:{url}|{etag}|{content_length}"
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PdfCache:
+    """Cache LRU de PDFs limitado por `max_bytes`. Seguro para uso entre threads."""
+
+    def __init__(self, root: Path, max_bytes: int = 2 * 1024 ** 3):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self.index_path = self.root / "index.json"
+        self._lock = threading.RLock()
+        self.keys: dict[str, str] = {}
+        self.objects: dict[str, dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"Aviso: indice do cache de PDFs ilegivel ({e}); recriando.")
+            return
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return
+        self.keys = dict(data.get("keys") or {})
+        self.objects = dict(data.get("objects") or {})
+
+    def _save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = {"version": INDEX_VERSION, "keys": self.keys, "objects": self.objects}
+        tmp = self.index_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.pdf"
+
+    def _drop(self, digest: str) -> None:
+        self.objects.pop(digest, None)
+        for k in [k for k, v in self.keys.items() if v == digest]:
+            del self.keys[k]
+        try:
+            self.object_path(digest).unlink(missing_ok=True)
+        except Exception:
+            pass
+
+    def total_bytes(self) -> int:
+        return sum(int(o.get("size") or 0) for o in self.objects.values())
+
+    def get(self, *keys: str) -> Optional[Path]:
+        """Caminho do PDF em cache para a primeira chave conhecida (hash conferido)."""
+        with self._lock:
+            for key in keys:
+                digest = self.keys.get(key) if key else None
+                if not digest:
+                    continue
+                path = self.object_path(digest)
+                if not path.exists() or sha256_file(path) != digest:
+                    print(f"Aviso: entrada corrompida no cache de PDFs ({key}); descartando.")
+                    self._drop(digest)
+                    self._save()
+                    continue
+                self.objects.setdefault(digest, {"size": path.stat().st_size})["atime"] = time.time()
+                self._save()
+                return path
+        return None
+
+    def put(self, body: bytes, *keys: str) -> str:
+        """Armazena `body` e associa as chaves informadas; retorna o SHA-256."""
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            path = self.object_path(digest)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+                tmp.write_bytes(body)
+                os.replace(tmp, path)
+            self.objects[digest] = {"size": len(body), "atime": time.time()}
+            for key in keys:
+                if key:
+                    self.keys[key] = digest
+            self._evict(keep=digest)
+            self._save()
+        return digest
+
+    def put_file(self, path: Path, *keys: str, digest: str = "") -> str:
+        """Como `put`, mas copia de um arquivo em blocos (sem carregar o PDF na memoria).
+
+        `digest` pode vir do hash calculado durante o download; senao e recalculado.
+        """
+        path = Path(path)
+        digest = digest or sha256_file(path)
+        with self._lock:
+            obj = self.object_path(digest)
+            if not obj.exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                tmp = obj.with_suffix(f".{threading.get_ident()}.tmp")
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, obj)
+            self.objects[digest] = {"size": obj.stat().st_size, "atime": time.time()}
+            for key in keys:
+                if key:
+                    self.keys[key] = digest
+            self._evict(keep=digest)
+            self._save()
+        return digest
+
+    def _evict(self, keep: str = "") -> None:
+        if not self.max_bytes:
+            return
+        total = self.total_bytes()
+        for digest, _ in sorted(self.objects.items(), key=lambda kv: kv[1].get("atime") or 0):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            total -= int(self.objects[digest].get("size") or 0)
+            self._drop(digest)
+
+    def materialize(self, dest: Path, *keys: str) -> Optional[Path]:
+        """Copia o PDF em cache para `dest`; None se ausente.
+
+        Copia em vez de hardlink: os downloads regravam `dest` no lugar e corromperiam o objeto.
+        """
+        src = self.get(*keys)
+        if not src:
+            return None
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dest)
+        return dest
@@ -0,0 +1,170 @@
+"""OCR das paginas sem camada de texto (pecas digitalizadas).
+
+So as paginas que o extrator devolveu vazias sao rasterizadas e passadas ao Tesseract
+(idioma `por` por padrao), em paralelo num pool de processos; cada worker rasteriza,
+calcula o SHA-256 da imagem e consulta o cache de texto antes de rodar o OCR. Um limite
+de paginas por documento evita que um volume digitalizado segure o lote.
+
+Dependencias opcionais (o OCR fica desligado sem elas):
+- rasterizacao: `pypdfium2` (pip) ou `pdftoppm` do poppler (PDFTOPPM_CMD);
+- OCR: executavel `tesseract` no PATH ou em TESSERACT_CMD, com o idioma instalado.
+"""
+import functools
+import hashlib
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+DEFAULT_DPI = 200
+
+
+def _tesseract_cmd() -> Optional[str]:
+    return os.getenv("TESSERACT_CMD") or shutil.which("tesseract")
+
+
+def _pdftoppm_cmd() -> Optional[str]:
+    return os.getenv("PDFTOPPM_CMD") or shutil.which("pdftoppm")
+
+
+def _has_pdfium() -> bool:
+    try:
+        import pypdfium2  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def ocr_available() -> bool:
+    return bool(_tesseract_cmd()) and (_has_pdfium() or bool(_pdftoppm_cmd()))
+
+
+def tesseract_version() -> str:
+    return _tesseract_version(_tesseract_cmd() or "tesseract")
+
+
+@functools.lru_cache(maxsize=None)
+def _tesseract_version(cmd: str) -> str:
+    """`tesseract --version` uma unica vez por executavel."""
+    try:
+        out = subprocess.run([cmd, "--version"], capture_output=True, text=True, timeout=10)
+        first = ((out.stdout or out.stderr or "").splitlines() or ["?"])[0]
+        return first.strip().replace(" ", "-")
+    except Exception:
+        return "tesseract-unknown"
+
+
+def rasterize_page(pdf_path: Path, index: int, dpi: int = DEFAULT_DPI) -> bytes:
+    """PNG da pagina `index` (0-based)."""
+    if _has_pdfium():
+        import io
+
+        import pypdfium2 as pdfium  # type: ignore
+
+        doc = pdfium.PdfDocument(str(pdf_path))
+        try:
+            image = doc[index].render(scale=dpi / 72).to_pil()
+            buf = io.BytesIO()
+            image.save(buf, format="PNG")
+            return buf.getvalue()
+        finally:
+            doc.close()
+    cmd = _pdftoppm_cmd()
+    if not cmd:
+        raise RuntimeError("nenhum rasterizador disponivel (pypdfium2 ou pdftoppm)")
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = Path(tmp) / "p"
+        n = str(index + 1)
+        subprocess.run(
+            [cmd, "-f", n, "-l", n, "-r", str(dpi), "-png", "-singlefile", str(pdf_path), str(prefix)],
+            check=True, capture_output=True, timeout=300,
+        )
+        return prefix.with_suffix(".png").read_bytes()
+
+
+def ocr_png(png: bytes, lang: str = "por") -> str:
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "page.png"
+        img.write_bytes(png)
+        out = subprocess.run(
+            [_tesseract_cmd(), str(img), "stdout", "-l", lang],
+            capture_output=True, timeout=600,
+        )
+        if out.returncode != 0:
+            raise RuntimeError((out.stderr or b"").decode("utf-8", "replace").strip() or "tesseract falhou")
+        return out.stdout.decode("utf-8", "replace")
+
+
+def _ocr_job(job: tuple) -> tuple[int, str]:
+    """Worker: rasteriza, consulta o cache pelo hash da imagem e roda o OCR se preciso."""
+    pdf_path, index, lang, dpi, cache_path, version = job
+    try:
+        png = rasterize_page(Path(pdf_path), index, dpi)
+    except Exception as e:
+        print(f"Aviso: falha ao rasterizar pagina {index + 1} de {Path(pdf_path).name}: {e}")
+        return index, ""
+    digest = hashlib.sha256(png).hexdigest()
+    cache = None
+    if cache_path:
+        try:
+            from text_cache import TextCache
+
+            cache = TextCache(Path(cache_path))
+        except Exception:
+            cache = None
+    try:
+        if cache:
+            try:
+                hit = cache.get_pages(digest, version, [0])
+                if 0 in hit:
+                    return index, hit[0]
+            except Exception:
+                pass
+        try:
+            text = ocr_png(png, lang)
+        except Exception as e:
+            print(f"Aviso: OCR falhou na pagina {index + 1} de {Path(pdf_path).name}: {e}")
+            return index, ""
+        if cache:
+            try:
+                cache.put(digest, version, 1, {0: text})
+            except Exception:
+                pass
+        return index, text
+    finally:
+        if cache:
+            cache.close()
+
+
+def ocr_pages(
+    pdf_path: Path,
+    indices: Iterable[int],
+    lang: str = "por",
+    workers: int = 0,
+    max_pages: int = 10,
+    dpi: int = DEFAULT_DPI,
+    cache_path: Optional[Path] = None,
+) -> dict[int, str]:
+    """OCR das paginas indicadas (ate `max_pages`); retorna {indice: texto}.
+
+    Dentro de um worker de outro pool (ex.: `offline_regen`) roda em serie, sem abrir um pool aninhado.
+    """
+    idx = list(indices)
+    if max_pages and len(idx) > max_pages:
+        print(f"Aviso: {Path(pdf_path).name} tem {len(idx)} paginas sem texto; OCR limitado a {max_pages}.")
+        idx = idx[:max_pages]
+    if not idx:
+        return {}
+    version = f"ocr/{tesseract_version()}/{lang}/{dpi}"
+    jobs = [(str(pdf_path), i, lang, dpi, str(cache_path) if cache_path else "", version) for i in idx]
+    workers = max(1, min(workers or (os.cpu_count() or 1), len(jobs)))
+    if multiprocessing.parent_process() is not None:
+        workers = 1
+    if workers == 1:
+        return dict(_ocr_job(j) for j in jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(_ocr_job, jobs))
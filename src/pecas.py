@@ -0,0 +1,113 @@
+"""Registros da arvore de pecas do VisualizarDocsProtocolo.
+
+A arvore inteira e lida com um unico `evaluate` por frame (READ_PIECES_JS), em vez de
+varias idas e voltas CDP por peca. As funcoes daqui sao puras: transformam o retorno
+do navegador em registros e resolvem especificacoes de selecao ("first", "last-3",
+"re:parecer"...) sobre esses registros.
+"""
+import re
+import unicodedata
+
+VIEWER_TREE_SELECTOR = "#splLeitorDocumentos_pgcPecas_trePecas"
+
+# Seletores tentados em ordem; o primeiro que encontrar ancoras define a lista de pecas.
+PIECE_SELECTORS = (
+    "a[index_ato], a[cod_arquivo_digital_criptografado], a[index]",
+    f"{VIEWER_TREE_SELECTOR} a, a[cod_arquivo_digital_criptografado]",
+)
+
+READ_PIECES_JS = r"""
+(selectors) => {
+  const cssPath = (el) => {
+    const parts = [];
+    while (el && el.nodeType === 1) {
+      if (el.id) { parts.unshift('#' + CSS.escape(el.id)); break; }
+      let i = 1, sib = el;
+      while ((sib = sib.previousElementSibling)) { if (sib.tagName === el.tagName) i++; }
+      parts.unshift(el.tagName.toLowerCase() + ':nth-of-type(' + i + ')');
+      el = el.parentElement;
+    }
+    return parts.join(' > ');
+  };
+  for (const sel of selectors) {
+    const nodes = Array.from(document.querySelectorAll(sel));
+    if (!nodes.length) continue;
+    return {
+      selector: sel,
+      items: nodes.map((a) => ({
+        index_ato: a.getAttribute('index_ato') || '',
+        index: a.getAttribute('index') || '',
+        cod_arquivo_digital_criptografado: a.getAttribute('cod_arquivo_digital_criptografado') || '',
+        title: ((a.innerText || a.textContent || '') + '').trim(),
+        tooltip: a.getAttribute('title') || '',
+        path: cssPath(a),
+      })),
+    };
+  }
+  return { selector: '', items: [] };
+}
+"""
+
+_DATE_RE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+
+
+def _normalize(s: str) -> str:
+    s = unicodedata.normalize("NFKD", str(s or ""))
+    return "".join(c for c in s if not unicodedata.combining(c))
+
+
+def _piece_date(*texts: str) -> str:
+    """Primeira data dd/mm/aaaa encontrada no titulo ou tooltip da peca ('' se nenhuma)."""
+    for t in texts:
+        m = _DATE_RE.search(t or "")
+        if m:
+            d, mth, y = m.groups()
+            return f"{int(d):02d}/{int(mth):02d}/{y}"
+    return ""
+
+
+def piece_records(raw_items: list[dict]) -> list[dict]:
+    """Converte o retorno de READ_PIECES_JS em registros de peca.
+
+    Cada registro tem `n` (posicao no DOM), `order` (numero de index_ato/index, ou a
+    posicao quando ausente), os atributos do portal, `title`, `date` e `path` (CSS).
+    """
+    records: list[dict] = []
+    for i, item in enumerate(raw_items or []):
+        index_ato = str(item.get("index_ato") or "")
+        index = str(item.get("index") or "")
+        nums = re.findall(r"\d+", index_ato or index)
+        title = re.sub(r"\s+", " ", str(item.get("title") or "")).strip()
+        tooltip = str(item.get("tooltip") or "")
+        records.append({
+            "n": i,
+            "order": int(nums[0]) if nums else i,
+            "index_ato": index_ato,
+            "index": index,
+            "cod_arquivo_digital_criptografado": str(item.get("cod_arquivo_digital_criptografado") or ""),
+            "title": title,
+            "date": _piece_date(title, tooltip),
+            "path": str(item.get("path") or ""),
+        })
+    return records
+
+
+def select_pieces(records: list[dict], spec: str) -> list[dict]:
+    """Resolve uma especificacao para os registros correspondentes, em ordem de peca.
+
+    Aceita "first", "last", "first-N", "last-N" e "re:<regex>" (aplicada ao titulo sem
+    acentos, sem diferenciar maiusculas). Empates de `order` seguem a ordem do DOM.
+    """
+    spec_norm = (spec or "last").strip()
+    ordered = sorted(records, key=lambda p: (p["order"], p["n"]))
+    if not ordered:
+        return []
+    low = spec_norm.lower()
+    if low.startswith("re:"):
+        rx = re.compile(_normalize(spec_norm[3:]), re.I)
+        return [p for p in ordered if rx.search(_normalize(p["title"]))]
+    m = re.match(r"^(first|last)(?:-(\d+))?$", low)
+    if not m:
+        raise ValueError(f"Especificacao de peca invalida: {spec}")
+    n = int(m.group(2) or 1)
+    return ordered[:n] if m.group(1) == "first" else ordered[-n:]
@@ -0,0 +1,561 @@
+"""Leitura em fluxo da coluna de processos das planilhas exportadas (xlsx, xls e csv).
+
+A fonte pode ser um caminho, os bytes do arquivo, um arquivo aberto em modo binario ou a
+`PlanilhaExportada` recem-baixada do portal (lida da memoria; a copia em disco, se pedida,
+e gravada em segundo plano). O formato e reconhecido pelos primeiros bytes (zip = xlsx,
+OLE2 = xls, demais = csv). O cabecalho e procurado uma vez nas primeiras linhas
+(`find_processo_column_index`) e, dali em diante, so a coluna do processo e lida. Sem
+cabecalho "processo" nada e lido, salvo se quem chama indicar `coluna_padrao` (a mesa de
+trabalho usa a coluna E da exportacao APO-PEN):
+
+- xlsx: o XML da folha e descomprimido e analisado em blocos pelo expat, guardando apenas
+  as celulas da coluna (o openpyxl, mesmo em read_only e limitado a uma coluna, converte
+  todas as celulas da linha e fica ~6x mais lento em 100 mil linhas);
+- xls: xlrd com `on_demand` e `col_values`;
+- csv: modulo csv, com separador e codificacao detectados numa amostra.
+
+Os numeros saem um a um (canonicalizados por padrao), sem pandas e sem materializar a
+planilha. `iter_linhas` devolve tambem a linha completa, com os valores como texto do
+mesmo jeito que a leitura antiga (openpyxl/xlrd), para a impressao digital da fila
+incremental nao mudar.
+"""
+import codecs
+import csv
+import io
+import os
+import posixpath
+import tempfile
+import threading
+import unicodedata
+import xml.parsers.expat
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+from fila_incremental import canonicalize_processo
+
+Fonte = Union[str, Path, bytes, bytearray, BinaryIO, "PlanilhaExportada"]
+
+LINHAS_CABECALHO = 5  # linhas iniciais onde o cabecalho e procurado
+_BLOCO = 1 << 16
+_SEPARADORES = ";,\t|"
+
+
+def _norm(s) -> str:
+    s = "" if s is None else str(s)
+    s = s.replace("º", "o").replace("°", "o").replace("ª", "a")
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(c for c in s if not unicodedata.combining(c))
+
+
+def find_processo_column_index(headers: list[str], coluna_padrao: Optional[int] = None) -> Optional[int]:
+    """Coluna do processo pelo cabecalho; sem cabecalho "processo", `coluna_padrao` (se a linha a tiver)."""
+    best_idx = None
+    for i, h in enumerate(headers):
+        hl = _norm(h).strip().lower()
+        if not hl:
+            continue
+        if "processo" in hl and any(tag in hl for tag in ("n", "no", "n.", "n ", "numero")):
+            return i
+        if best_idx is None and "processo" in hl:
+            best_idx = i
+    if best_idx is not None:
+        return best_idx
+    if coluna_padrao is not None and len(headers) > coluna_padrao:
+        return coluna_padrao
+    return None
+
+
+# --- fonte e formato ------------------------------------------------------------------
+
+class PlanilhaExportada:
+    """Planilha recem-exportada, lida da memoria; a copia em disco e opcional e assincrona."""
+
+    def __init__(self, dados: bytes, name: str = "planilha.xlsx"):
+        self.dados = dados
+        self.name = name
+        self.path: Optional[Path] = None  # destino da copia em disco, se pedida
+        self._gravacao: Optional[threading.Thread] = None
+
+    @classmethod
+    def de_download(cls, download, nome_padrao: str = "planilha.xlsx") -> "PlanilhaExportada":
+        """Bytes de um download do Playwright, lidos do arquivo que o navegador ja gravou.
+
+        `download.path()` espera o fim da transferencia; nao ha `save_as` nem copia antes da
+        leitura. Com navegador remoto (sem arquivo local) o `save_as` e usado como antes.
+        """
+        nome = download.suggested_filename or nome_padrao
+        try:
+            local = download.path()
+        except Exception:
+            local = None
+        if local:
+            return cls(Path(local).read_bytes(), nome)
+        with tempfile.TemporaryDirectory() as tmp:
+            destino = Path(tmp) / Path(nome).name
+            download.save_as(str(destino))
+            return cls(destino.read_bytes(), nome)
+
+    def persistir(self, destino: Path, em_segundo_plano: bool = True) -> Path:
+        """Grava a copia em `destino` (tmp + replace); em segundo plano por padrao."""
+        destino = Path(destino)
+        self.path = destino
+
+        def gravar() -> None:
+            try:
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                tmp = destino.with_name(destino.name + ".part")
+                tmp.write_bytes(self.dados)
+                os.replace(tmp, destino)
+            except Exception as e:
+                print(f"Aviso: nao foi possivel gravar a planilha em {destino}: {e}")
+
+        if em_segundo_plano:
+            self._gravacao = threading.Thread(target=gravar, name="persistir-planilha")
+            self._gravacao.start()
+        else:
+            gravar()
+        return destino
+
+    def aguardar(self, timeout: Optional[float] = None) -> Optional[Path]:
+        """Espera a copia em disco terminar; devolve o caminho gravado (ou None)."""
+        if self._gravacao is not None:
+            self._gravacao.join(timeout)
+        return self.path if self.path is not None and self.path.exists() else None
+
+
+def _abrir(fonte: Fonte) -> tuple[str, Union[Path, BinaryIO]]:
+    """(formato, arquivo): caminho ou objeto binario posicionado no inicio."""
+    if isinstance(fonte, (str, Path)):
+        path = Path(fonte)
+        with path.open("rb") as f:
+            return _formato(f.read(8)), path
+    if isinstance(fonte, PlanilhaExportada):
+        fonte = fonte.dados
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        arquivo: BinaryIO = io.BytesIO(bytes(fonte))
+    elif not (hasattr(fonte, "seekable") and fonte.seekable()):
+        arquivo = io.BytesIO(fonte.read())
+    else:
+        arquivo = fonte
+    inicio = arquivo.tell()
+    formato = _formato(arquivo.read(8))
+    arquivo.seek(inicio)
+    return formato, arquivo
+
+
+def _formato(cabeca: bytes) -> str:
+    if cabeca.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if cabeca.startswith(b"\xd0\xcf\x11\xe0"):
+        return "xls"
+    return "csv"
+
+
+def detectar_formato(fonte: Fonte) -> str:
+    return _abrir(fonte)[0]
+
+
+# --- xlsx (expat sobre o XML da folha) ------------------------------------------------
+
+def _local(nome: str) -> str:
+    return nome.rpartition(":")[2]
+
+
+class _Locais(dict):
+    """Cache nome qualificado -> nome local (o handler roda uma vez por elemento)."""
+
+    def __missing__(self, nome: str) -> str:
+        self[nome] = local = _local(nome)
+        return local
+
+
+class _Colunas(dict):
+    """Cache letras da referencia -> indice da coluna."""
+
+    def __missing__(self, letras: str) -> int:
+        self[letras] = idx = _coluna_ref(letras)
+        return idx
+
+
+def _coluna_ref(ref: str) -> int:
+    n = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            n = n * 26 + ord(ch) - 64
+        elif "a" <= ch <= "z":
+            n = n * 26 + ord(ch) - 96
+        else:
+            break
+    return n - 1
+
+
+def _parse(dados: bytes, inicio=None, fim=None, texto=None) -> None:
+    p = xml.parsers.expat.ParserCreate()
+    p.StartElementHandler = inicio
+    p.EndElementHandler = fim
+    p.CharacterDataHandler = texto
+    p.buffer_text = True
+    p.Parse(dados, True)
+
+
+def _rels(z: zipfile.ZipFile, parte: str) -> dict[str, tuple[str, str]]:
+    """{Id: (tipo, parte alvo)} dos relacionamentos de `parte`."""
+    pasta, nome = posixpath.split(parte)
+    caminho = posixpath.join(pasta, "_rels", nome + ".rels")
+    out: dict[str, tuple[str, str]] = {}
+
+    def inicio(tag, attrs):
+        if _local(tag) == "Relationship" and attrs.get("TargetMode") != "External":
+            alvo = attrs.get("Target", "")
+            alvo = alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join(pasta, alvo))
+            out[attrs.get("Id", "")] = (attrs.get("Type", ""), alvo)
+
+    if caminho in z.NameToInfo:
+        _parse(z.read(caminho), inicio=inicio)
+    return out
+
+
+def _partes_xlsx(z: zipfile.ZipFile) -> tuple[str, Optional[str]]:
+    """(folha ativa, sharedStrings) a partir do workbook.xml e dos relacionamentos."""
+    livro = "xl/workbook.xml"
+    for tipo, alvo in _rels(z, "").values():
+        if tipo.endswith("/officeDocument"):
+            livro = alvo
+    folhas: list[str] = []
+    ativa = [0]
+
+    def inicio(tag, attrs):
+        tag = _local(tag)
+        if tag == "sheet":
+            rid = next((v for k, v in attrs.items() if _local(k) == "id"), "")
+            folhas.append(rid)
+        elif tag == "workbookView":
+            ativa[0] = int(attrs.get("activeTab", "0") or 0)
+
+    _parse(z.read(livro), inicio=inicio)
+    rels = _rels(z, livro)
+    if not folhas:
+        raise KeyError("workbook sem folhas")
+    folha = rels[folhas[ativa[0] if ativa[0] < len(folhas) else 0]][1]
+    compartilhadas = next((alvo for tipo, alvo in rels.values() if tipo.endswith("/sharedStrings")), None)
+    return folha, compartilhadas
+
+
+def _shared_strings(z: zipfile.ZipFile, parte: Optional[str]) -> list[str]:
+    out: list[str] = []
+    if not parte or parte not in z.NameToInfo:
+        return out
+    estado = {"si": None, "t": False, "rph": 0}
+
+    def inicio(tag, attrs):
+        tag = _local(tag)
+        if tag == "si":
+            estado["si"] = []
+        elif tag == "rPh":  # leitura fonetica (japones): nao faz parte do texto
+            estado["rph"] += 1
+        elif tag == "t" and not estado["rph"]:
+            estado["t"] = True
+
+    def fim(tag):
+        tag = _local(tag)
+        if tag == "si":
+            out.append("".join(estado["si"]))
+            estado["si"] = None
+        elif tag == "rPh":
+            estado["rph"] -= 1
+        elif tag == "t":
+            estado["t"] = False
+
+    def texto(dados):
+        if estado["t"] and estado["si"] is not None:
+            estado["si"].append(dados)
+
+    with z.open(parte) as f:
+        p = xml.parsers.expat.ParserCreate()
+        p.StartElementHandler, p.EndElementHandler, p.CharacterDataHandler = inicio, fim, texto
+        p.buffer_text = True
+        p.ParseFile(f)
+    return out
+
+
+class _FolhaXlsx:
+    """Linhas da folha como {coluna: texto}; com `coluna` definida, so essa e guardada."""
+
+    def __init__(self, z: zipfile.ZipFile):
+        self.z = z
+        self.folha, compartilhadas = _partes_xlsx(z)
+        self.sst = _shared_strings(z, compartilhadas)
+        self.coluna: Optional[int] = None
+        self.largura = 0  # colunas declaradas em <dimension>
+        self._prontas: list[tuple[int, dict[int, str]]] = []
+        self._linha = -1
+        self._col = -1
+        self._cels: dict[int, str] = {}
+        self._tipo = "n"
+        self._texto: Optional[list[str]] = None
+        self._capturando = False
+        self._rph = 0
+        self._nomes = _Locais()
+        self._colunas = _Colunas()
+
+    def _inicio(self, tag, attrs):
+        tag = self._nomes[tag]
+        if tag == "c":
+            ref = attrs.get("r")
+            self._col = self._colunas[ref.rstrip("0123456789")] if ref else self._col + 1
+            self._tipo = attrs.get("t", "n")
+            self._texto = [] if self.coluna is None or self._col == self.coluna else None
+        elif tag in ("v", "t"):
+            self._capturando = self._texto is not None and not self._rph
+        elif tag == "row":
+            ref = attrs.get("r")
+            self._linha = int(ref) - 1 if ref else self._linha + 1
+            self._col = -1
+            self._cels = {}
+        elif tag == "rPh":
+            self._rph += 1
+        elif tag == "dimension":
+            self.largura = _coluna_ref(attrs.get("ref", "").rpartition(":")[2]) + 1
+
+    def _fim(self, tag):
+        tag = self._nomes[tag]
+        if tag in ("v", "t"):
+            self._capturando = False
+        elif tag == "c":
+            if self._texto is not None:
+                self._cels[self._col] = self._valor("".join(self._texto))
+            self._texto = None
+        elif tag == "row":
+            self._prontas.append((self._linha, self._cels))
+        elif tag == "rPh":
+            self._rph -= 1
+
+    def _caracteres(self, dados):
+        if self._capturando:
+            self._texto.append(dados)
+
+    def _valor(self, bruto: str) -> str:
+        # como o openpyxl (read_only, data_only) converte e o str() da leitura antiga
+        t = self._tipo
+        if t == "s":
+            try:
+                return self.sst[int(bruto)]
+            except (ValueError, IndexError):
+                return ""
+        if t == "b":
+            return "True" if bruto.strip() == "1" else "False"
+        if t == "n" and bruto:
+            try:
+                return str(float(bruto)) if any(c in bruto for c in ".eE") else str(int(bruto))
+            except ValueError:
+                return bruto
+        return bruto
+
+    def linhas(self) -> Iterator[tuple[int, dict[int, str]]]:
+        p = xml.parsers.expat.ParserCreate()
+        p.StartElementHandler, p.EndElementHandler, p.CharacterDataHandler = self._inicio, self._fim, self._caracteres
+        p.buffer_text = True
+        with self.z.open(self.folha) as f:
+            while True:
+                bloco = f.read(_BLOCO)
+                p.Parse(bloco, not bloco)
+                prontas, self._prontas = self._prontas, []
+                yield from prontas
+                if not bloco:
+                    return
+
+
+def _lista(cels: dict[int, str], largura: int = 0) -> list[str]:
+    n = max(largura, max(cels) + 1 if cels else 0)
+    return [cels.get(i, "") for i in range(n)]
+
+
+def _processos_xlsx(arquivo, coluna_padrao: Optional[int]) -> Iterator[str]:
+    with zipfile.ZipFile(arquivo) as z:
+        try:
+            folha = _FolhaXlsx(z)
+        except (KeyError, ValueError, xml.parsers.expat.ExpatError):
+            # pacote fora do padrao usual: o openpyxl resolve
+            if hasattr(arquivo, "seek"):
+                arquivo.seek(0)
+            yield from _coluna(_linhas_openpyxl(arquivo), coluna_padrao)
+            return
+        idx = None
+        for n, cels in folha.linhas():
+            if idx is None:
+                if n >= LINHAS_CABECALHO:
+                    return
+                idx = find_processo_column_index(_lista(cels, folha.largura), coluna_padrao)
+                folha.coluna = idx
+                continue
+            val = cels.get(idx, "").strip()
+            if val:
+                yield val
+
+
+# --- leitores de linhas completas (openpyxl, xlrd, csv) -------------------------------
+
+def _linhas_openpyxl(arquivo) -> Iterator[list[str]]:
+    from openpyxl import load_workbook  # type: ignore
+
+    wb = load_workbook(filename=arquivo if not isinstance(arquivo, Path) else str(arquivo), read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield ["" if v is None else str(v) for v in row]
+    finally:
+        wb.close()
+
+
+def _abrir_xls(arquivo):
+    import xlrd  # type: ignore
+
+    if isinstance(arquivo, Path):
+        return xlrd.open_workbook(str(arquivo), on_demand=True)
+    return xlrd.open_workbook(file_contents=arquivo.read(), on_demand=True)
+
+
+def _linhas_xls(arquivo) -> Iterator[list[str]]:
+    book = _abrir_xls(arquivo)
+    try:
+        sheet = book.sheet_by_index(0)
+        for r in range(sheet.nrows):
+            yield [str(v) for v in sheet.row_values(r)]
+    finally:
+        book.release_resources()
+
+
+def _processos_xls(arquivo, coluna_padrao: Optional[int]) -> Iterator[str]:
+    book = _abrir_xls(arquivo)
+    try:
+        sheet = book.sheet_by_index(0)
+        primeiras = ([str(v) for v in sheet.row_values(r)] for r in range(min(LINHAS_CABECALHO, sheet.nrows)))
+        n, idx = _cabecalho(primeiras, coluna_padrao)
+        if idx is None or idx >= sheet.ncols:
+            return
+        for v in sheet.col_values(idx, start_rowx=n + 1):
+            txt = str(v).strip()
+            if txt:
+                yield txt
+    finally:
+        book.release_resources()
+
+
+def _linhas_csv(arquivo) -> Iterator[list[str]]:
+    binario = arquivo.open("rb") if isinstance(arquivo, Path) else arquivo
+    inicio = binario.tell()
+    amostra = binario.read(_BLOCO)
+    binario.seek(inicio)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(amostra, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1252"  # exportacao do Excel em portugues
+    texto = io.TextIOWrapper(binario, encoding=encoding, newline="")
+    try:
+        amostra_txt = amostra.decode(encoding, errors="ignore")
+        try:
+            dialeto = csv.Sniffer().sniff(amostra_txt, delimiters=_SEPARADORES)
+        except csv.Error:
+            primeira = amostra_txt.split("\n", 1)[0]
+            dialeto = csv.excel()
+            dialeto.delimiter = max(_SEPARADORES, key=primeira.count)
+        yield from csv.reader(texto, dialeto)
+    finally:
+        if isinstance(arquivo, Path):
+            texto.close()
+        else:
+            texto.detach()  # o arquivo recebido continua aberto para quem chamou
+
+
+def _linhas(formato: str, arquivo) -> Iterator[list[str]]:
+    if formato == "xlsx":
+        return _linhas_openpyxl(arquivo)
+    if formato == "xls":
+        return _linhas_xls(arquivo)
+    return _linhas_csv(arquivo)
+
+
+def _cabecalho(primeiras: Iterable[list[str]], coluna_padrao: Optional[int] = None) -> tuple[int, Optional[int]]:
+    """(linha do cabecalho, coluna do processo) nas primeiras LINHAS_CABECALHO linhas."""
+    for n, valores in enumerate(primeiras):
+        if n >= LINHAS_CABECALHO:
+            break
+        idx = find_processo_column_index(valores, coluna_padrao)
+        if idx is not None:
+            return n, idx
+    return -1, None
+
+
+def _com_cabecalho(
+    linhas: Iterator[list[str]], coluna_padrao: Optional[int] = None
+) -> Iterator[tuple[list[str], int, list[str]]]:
+    """(cabecalho, coluna, valores) de cada linha depois do cabecalho."""
+    for n, header in enumerate(linhas):
+        if n >= LINHAS_CABECALHO:
+            return
+        idx = find_processo_column_index(header, coluna_padrao)
+        if idx is not None:
+            break
+    else:
+        return
+    for valores in linhas:
+        yield header, idx, valores
+
+
+def _coluna(linhas: Iterator[list[str]], coluna_padrao: Optional[int] = None) -> Iterator[str]:
+    for _, idx, valores in _com_cabecalho(linhas, coluna_padrao):
+        if idx < len(valores):
+            val = valores[idx].strip()
+            if val:
+                yield val
+
+
+# --- API ------------------------------------------------------------------------------
+
+def iter_processos(
+    fonte: Fonte, canonical: bool = True, unique: bool = False, coluna_padrao: Optional[int] = None
+) -> Iterator[str]:
+    """Numeros de processo da planilha, na ordem, lidos sob demanda.
+
+    Sem cabecalho "processo" nada e lido, a menos que `coluna_padrao` indique a coluna a usar.
+    """
+    formato, arquivo = _abrir(fonte)
+    if formato == "xlsx":
+        brutos = _processos_xlsx(arquivo, coluna_padrao)
+    elif formato == "xls":
+        brutos = _processos_xls(arquivo, coluna_padrao)
+    else:
+        brutos = _coluna(_linhas_csv(arquivo), coluna_padrao)
+    vistos: set[str] = set()
+    for val in brutos:
+        if canonical:
+            val = canonicalize_processo(val)
+        if unique:
+            if val in vistos:
+                continue
+            vistos.add(val)
+        yield val
+
+
+def primeiro_processo(fonte: Fonte, canonical: bool = True, coluna_padrao: Optional[int] = None) -> Optional[str]:
+    """Primeiro processo da planilha (so le ate encontra-lo)."""
+    it = iter_processos(fonte, canonical=canonical, coluna_padrao=coluna_padrao)
+    try:
+        return next(it, None)
+    finally:
+        it.close()
+
+
+def iter_linhas(fonte: Fonte, coluna_padrao: Optional[int] = None) -> Iterator[tuple[str, dict[str, str]]]:
+    """(processo como na planilha, {cabecalho: valor}) de cada linha com processo preenchido.
+
+    A linha completa permite detectar alteracoes entre execucoes (fila incremental).
+    """
+    formato, arquivo = _abrir(fonte)
+    for header, idx, valores in _com_cabecalho(_linhas(formato, arquivo), coluna_padrao):
+        if idx >= len(valores):
+            continue
+        val = valores[idx].strip()
+        if val:
+            yield val, {(header[i] if i < len(header) and header[i] else f"col{i}"): v for i, v in enumerate(valores)}
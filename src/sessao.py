@@ -0,0 +1,268 @@
+"""Sessao no e-TCM: login (com espera de captcha/manual) e busca de frames.
+
+O Playwright so e importado quando um frame nao e encontrado (para o TimeoutError).
+"""
+import re
+import time
+from typing import Optional
+from urllib.parse import urljoin
+
+
+def _is_login_page(page) -> bool:
+    """Detecta se ainda estamos na tela de login do e-TCM."""
+    try:
+        user_loc = page.locator("#ctl00_cphMain_txtUsuario_I").first
+        pass_loc = page.locator("#ctl00_cphMain_txtSenha_I").first
+        if user_loc.count() > 0 and pass_loc.count() > 0:
+            # Em algumas transicoes o formulario pode ficar no DOM porem oculto
+            if user_loc.is_visible() or pass_loc.is_visible():
+                return True
+    except Exception:
+        pass
+    try:
+        url = page.url or ""
+        if "login.aspx" in url.lower():
+            return True
+    except Exception:
+        pass
+    try:
+        title = page.title() or ""
+        if "login" in title.lower():
+            return True
+    except Exception:
+        pass
+    return False
+
+
+def _strip_quotes(v: Optional[str]) -> str:
+    if v is None:
+        return ""
+    s = str(v).strip()
+    if len(s) >= 2 and ((s[0] == s[-1] == '"') or (s[0] == s[-1] == "'")):
+        s = s[1:-1]
+    return s.strip()
+
+
+def _extract_login_error(page) -> str:
+    """Tenta extrair mensagem de erro exibida no formulario de login."""
+    candidates = [
+        "#ctl00_cphMain_lblMensagem",
+        "#ctl00_cphMain_lblErro",
+        "#ctl00_cphMain_lblMsg",
+        ".dxValidationSummary, .dxvs, .dx-error, .dxeErrorCell",
+        ".alert, .erro, .error, .msgErro",
+    ]
+    messages: list[str] = []
+    for sel in candidates:
+        try:
+            loc = page.locator(sel)
+            if loc.count() > 0:
+                for t in loc.all_text_contents():
+                    t = (t or "").strip()
+                    if t and t not in messages:
+                        messages.append(t)
+        except Exception:
+            continue
+    if not messages:
+        try:
+            kw = page.locator(
+                "text=/senha|usu[aá]rio|captcha|verifica|inv[aá]lido|incorreto|bloqueado/i"
+            ).locator(":visible")
+            if kw.count() > 0:
+                t = (kw.first.inner_text() or "").strip()
+                if t:
+                    messages.append(t)
+        except Exception:
+            pass
+    if not messages:
+        return ""
+    msg = " | ".join(messages)
+    if len(msg) > 300:
+        msg = msg[:300] + "..."
+    return msg
+
+
+def login_etcm(
+    page,
+    url: str,
+    username: str,
+    password: str,
+    pause_after_login_ms: int = 0,
+    login_manual_wait_ms: int = 45000,
+    headless: bool = False,
+) -> None:
+    """Realiza login no e-TCM de forma robusta (DevExpress + captchas)."""
+    username = _strip_quotes(username)
+    password = _strip_quotes(password)
+
+    print(f"Acessando: {url}")
+    page.goto(url, wait_until="domcontentloaded", timeout=60000)
+
+    # Aguarda os campos de login ficarem visiveis quando existirem.
+    try:
+        page.locator("#ctl00_cphMain_txtUsuario_I, input[name='ctl00$cphMain$txtUsuario']").first.wait_for(
+            state="visible", timeout=30000
+        )
+    except Exception:
+        pass
+
+    # Usuario
+    try:
+        page.locator("#ctl00_cphMain_txtUsuario_I, input[name='ctl00$cphMain$txtUsuario']").first.fill(username)
+    except Exception:
+        try:
+            page.locator("input[placeholder*='Usu'], input[name*='Usuario' i]").first.fill(username)
+        except Exception:
+            page.locator("input[type='text']").first.fill(username)
+
+    # Senha
+    try:
+        page.locator("#ctl00_cphMain_txtSenha_I, input[name='ctl00$cphMain$txtSenha'][type='password']").first.fill(password)
+    except Exception:
+        try:
+            page.locator("input[type='password']").first.fill(password)
+        except Exception as e:
+            raise RuntimeError("Nao foi possivel localizar o campo de senha.") from e
+
+    btn_selectors = [
+        "#ctl00_cphMain_btnLogin_I",  # input interno DevExpress (mais confiavel)
+        "#ctl00_cphMain_btnLogin",
+        "input[name='ctl00$cphMain$btnLogin']",
+        "input[type='submit'][value*='Entrar' i]:not([readonly]):not([disabled])",
+        "button:has-text('Entrar')",
+        "text=/\\b(Entrar|Acessar|Login)\\b/i",
+    ]
+
+    clicked = False
+    for sel in btn_selectors:
+        try:
+            page.locator(sel).first.click(timeout=5000)
+        except Exception:
+            continue
+        # Considera sucesso quando os campos somem do DOM (reload/redirect).
+        try:
+            page.wait_for_function(
+                "() => document.querySelector('#ctl00_cphMain_txtUsuario_I') === null && "
+                "document.querySelector('#ctl00_cphMain_txtSenha_I') === null",
+                timeout=15000,
+            )
+            clicked = True
+            break
+        except Exception:
+            # Ainda na tela de login, tente outro seletor
+            continue
+
+    if not clicked:
+        try:
+            page.get_by_role("button", name=re.compile(r"Entrar|Acessar|Login", re.I)).click(timeout=5000)
+            clicked = True
+        except Exception:
+            pass
+
+    if not clicked:
+        try:
+            page.locator("#ctl00_cphMain_txtSenha_I, input[type='password']").first.press("Enter")
+            clicked = True
+        except Exception:
+            pass
+
+    if not clicked:
+        # Fallback JS: __doPostBack / submit do form (DevExpress)
+        try:
+            page.evaluate(
+                "(() => { try { __doPostBack('ctl00$cphMain$btnLogin',''); } catch(e) { "
+                "var f=document.forms['aspnetForm']; if(f){f.__EVENTTARGET.value='ctl00$cphMain$btnLogin'; "
+                "f.__EVENTARGUMENT.value=''; f.submit();} } })();"
+            )
+        except Exception as e:
+            raise RuntimeError("Nao foi possivel acionar o login (botao nao encontrado).") from e
+
+    try:
+        page.wait_for_load_state("networkidle", timeout=60000)
+    except Exception:
+        pass
+
+    if pause_after_login_ms > 0:
+        print(f"Pausa apos tentativa de login para acompanhamento: {pause_after_login_ms} ms")
+        time.sleep(pause_after_login_ms / 1000.0)
+        try:
+            page.wait_for_timeout(50)
+        except Exception:
+            pass
+
+    if _is_login_page(page):
+        if login_manual_wait_ms > 0:
+            print(
+                "Tela de login ainda visivel. Resolva captcha/erro de autenticacao manualmente e clique em Entrar. "
+                f"Aguardando ate {login_manual_wait_ms} ms..."
+            )
+            deadline = time.time() + (login_manual_wait_ms / 1000.0)
+            while time.time() < deadline:
+                if not _is_login_page(page):
+                    break
+                time.sleep(1.5)
+        if _is_login_page(page):
+            extra = ""
+            try:
+                if page.locator("#gRecaptchaToken, iframe[src*='recaptcha' i], div.g-recaptcha").count() > 0:
+                    extra = " Captcha/reCAPTCHA detectado."
+            except Exception:
+                pass
+            err_msg = _extract_login_error(page)
+            if err_msg:
+                extra += f" Mensagem do portal: {err_msg}"
+            if headless and "captcha" in extra.lower():
+                extra += " (modo headless nao permite resolver; use HEADLESS=false/SHOW_BROWSER=true)."
+            raise RuntimeError("Login nao concluido: formulario de login ainda visivel apos timeout." + extra)
+
+    # Garante que estamos na Mesa de Trabalho apos login
+    try:
+        if "mesatrabalho.aspx" not in (page.url or "").lower():
+            mesa_url = urljoin(url, "/paginas/mesatrabalho.aspx")
+            print(f"Abrindo Mesa de Trabalho: {mesa_url}")
+            page.goto(mesa_url, wait_until="load", timeout=60000)
+    except Exception:
+        pass
+
+
+def find_frame_with_text(page, text: str, timeout_ms: int = 30000):
+    """Loop through frames until one contains the given text (substring)."""
+    deadline = time.time() + (timeout_ms / 1000.0)
+    last_err = None
+    while time.time() < deadline:
+        for fr in page.frames:
+            try:
+                loc = fr.get_by_text(text, exact=False)
+                # .count() waits for DOM stability enough for text lookup
+                if loc.count() > 0:
+                    return fr
+            except Exception as e:
+                last_err = e
+                continue
+        time.sleep(0.3)
+    if last_err:
+        raise last_err
+    from playwright.sync_api import TimeoutError as PWTimeoutError
+
+    raise PWTimeoutError(f"Frame with text '{text}' not found in {timeout_ms}ms.")
+
+
+def find_frame_with_selector(page, selector: str, timeout_ms: int = 30000):
+    """Find a frame containing an element matching selector that is attached in DOM."""
+    deadline = time.time() + (timeout_ms / 1000.0)
+    while time.time() < deadline:
+        for fr in page.frames:
+            try:
+                loc = fr.locator(selector)
+                if loc.count() > 0:
+                    try:
+                        loc.first.wait_for(state="attached", timeout=1000)
+                    except Exception:
+                        pass
+                    return fr
+            except Exception:
+                continue
+        time.sleep(0.3)
+    from playwright.sync_api import TimeoutError as PWTimeoutError
+
+    raise PWTimeoutError(f"Frame with selector '{selector}' not found in {timeout_ms}ms.")
@@ -0,0 +1,88 @@
+"""Cache persistente do texto extraido dos PDFs (SQLite, texto por pagina comprimido).
+
+A chave e o SHA-256 do arquivo mais a versao do extrator: trocar a biblioteca ou a
+forma de extrair muda a versao e as entradas antigas deixam de ser usadas (e podem ser
+removidas com `prune`). Paginas sao gravadas individualmente, entao leituras parciais
+(ver `extract_text_from_pdf(pages=..., stop_when=...)`) tambem aproveitam e alimentam
+o cache. Cada processo abre a sua conexao; o SQLite serializa as escritas.
+"""
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    sha256 TEXT NOT NULL,
+    version TEXT NOT NULL,
+    n_pages INTEGER NOT NULL,
+    PRIMARY KEY (sha256, version)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    sha256 TEXT NOT NULL,
+    version TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    text BLOB NOT NULL,
+    PRIMARY KEY (sha256, version, page)
+);
+"""
+
+
+class TextCache:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def page_count(self, sha256: str, version: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT n_pages FROM docs WHERE sha256 = ? AND version = ?", (sha256, version)
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def get_pages(self, sha256: str, version: str, pages: Optional[Iterable[int]] = None) -> dict[int, str]:
+        """Texto das paginas em cache ({indice: texto}); `pages=None` traz todas."""
+        sql = "SELECT page, text FROM pages WHERE sha256 = ? AND version = ?"
+        args: list = [sha256, version]
+        wanted = None if pages is None else sorted(set(pages))
+        if wanted is not None:
+            if not wanted:
+                return {}
+            sql += f" AND page IN ({','.join('?' * len(wanted))})"
+            args.extend(wanted)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return {int(p): zlib.decompress(t).decode("utf-8") for p, t in rows}
+
+    def put(self, sha256: str, version: str, n_pages: int, pages: dict[int, str]) -> None:
+        """Registra o numero de paginas e o texto das paginas informadas."""
+        rows = [(sha256, version, int(i), zlib.compress(t.encode("utf-8"), 6)) for i, t in pages.items()]
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docs (sha256, version, n_pages) VALUES (?, ?, ?)",
+                (sha256, version, int(n_pages)),
+            )
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pages (sha256, version, page, text) VALUES (?, ?, ?, ?)", rows
+                )
+            self._conn.commit()
+
+    def prune(self, keep_version: str) -> int:
+        """Remove entradas de outras versoes do extrator; retorna quantos documentos foram removidos."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM docs WHERE version != ?", (keep_version,))
+            self._conn.execute("DELETE FROM pages WHERE version != ?", (keep_version,))
+            self._conn.commit()
+            removed = cur.rowcount
+        return removed
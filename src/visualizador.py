@@ -0,0 +1,788 @@
+"""Visualizador de pecas: captura/download dos PDFs, cache e pre-carregamento de processos."""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urljoin
+
+from comum import _env_int, env_bool, safe_filename
+from downloads import DownloadManager
+from extracao import extract_text_from_pdf
+from grid import _open_processo_viewer
+from pdf_cache import PdfCache, cod_key, url_key
+from pecas import PIECE_SELECTORS, READ_PIECES_JS, VIEWER_TREE_SELECTOR, piece_records, select_pieces
+from sessao import find_frame_with_selector
+
+
+PDF_ACCEPT_HEADER = "application/pdf,application/octet-stream;q=0.9,*/*;q=0.8"
+
+
+def _find_viewer_frame(page):
+    """Frame que contem a arvore de pecas do VisualizarDocsProtocolo (ou a propria pagina)."""
+    try:
+        return find_frame_with_selector(page, VIEWER_TREE_SELECTOR, timeout_ms=20000)
+    except Exception:
+        # Try alternative cues for the viewer
+        for sel in ["#imgNewWindow", "img#imgNewWindow", "#splLeitorDocumentos_pgcPecas_trePecas_D", "#splLeitorDocumentos_pgcPecas"]:
+            try:
+                return find_frame_with_selector(page, sel, timeout_ms=5000)
+            except Exception:
+                continue
+    # As a last resort, operate on the page itself
+    return page
+
+
+def _pick_attr(container, sel: str, attr: str) -> Optional[str]:
+    el = container.locator(sel)
+    if el.count() > 0:
+        val = el.first.get_attribute(attr)
+        if val:
+            return val
+    return None
+
+
+def _find_pdf_url_in_container(container) -> Optional[str]:
+    # Try several common embed patterns; URL may not end with .pdf
+    # Chromium's built-in PDF viewer exposes the original document URL in
+    # an `original-url` attribute on the <embed> element. Prefer this.
+    try:
+        return (
+            _pick_attr(container, "embed[original-url]", "original-url")
+            or _pick_attr(container, "iframe[src*='visualiza' i]", "src")
+            or _pick_attr(container, "iframe[src*='iFramevisualizardocumento' i]", "src")
+            or _pick_attr(container, "iframe[src]", "src")
+            or _pick_attr(container, "embed[type*='pdf']", "src")
+            or _pick_attr(container, "object[data]", "data")
+            or _pick_attr(container, "a[href*='.pdf']", "href")
+        )
+    except Exception:
+        return None
+
+
+def _is_pdf_payload(body: bytes, content_type: str) -> bool:
+    return (b"%PDF" in body[:8]) or ("application/pdf" in (content_type or "").lower())
+
+
+# fluxo principal e ProcessoPrefetcher compartilham os singletons abaixo
+_SINGLETONS_LOCK = threading.Lock()
+_PDF_CACHE: Optional[PdfCache] = None
+
+
+def _get_pdf_cache() -> Optional[PdfCache]:
+    """Cache de PDFs compartilhado (PDF_CACHE=false desativa)."""
+    global _PDF_CACHE
+    if _PDF_CACHE is None and env_bool("PDF_CACHE", True):
+        with _SINGLETONS_LOCK:
+            if _PDF_CACHE is None:
+                try:
+                    max_mb = float(os.getenv("PDF_CACHE_MAX_MB", "2048") or 0)
+                except ValueError:
+                    max_mb = 2048
+                _PDF_CACHE = PdfCache(Path(os.getenv("PDF_CACHE_DIR", "cache/pdf")), max_bytes=int(max_mb * 1024 * 1024))
+    return _PDF_CACHE
+
+
+def _pdf_from_cache(pdf_path: Path, *keys: str) -> Path | None:
+    cache = _get_pdf_cache()
+    if not cache or not any(keys):
+        return None
+    hit = cache.materialize(pdf_path, *keys)
+    if hit:
+        print(f"PDF reutilizado do cache: {pdf_path.resolve()}")
+    return hit
+
+
+def _save_pdf_body(body: bytes, pdf_path: Path, *keys: str) -> Path:
+    with open(pdf_path, "wb") as f:
+        f.write(body)
+    print(f"PDF salvo em: {pdf_path.resolve()}")
+    cache = _get_pdf_cache()
+    if cache:
+        try:
+            cache.put(body, *keys)
+        except Exception as e:
+            print(f"Aviso: nao foi possivel gravar o PDF no cache: {e}")
+    return pdf_path
+
+
+_DOWNLOAD_MANAGER: Optional[DownloadManager] = None
+
+
+def _get_download_manager() -> DownloadManager:
+    global _DOWNLOAD_MANAGER
+    if _DOWNLOAD_MANAGER is None:
+        with _SINGLETONS_LOCK:
+            if _DOWNLOAD_MANAGER is None:
+                try:
+                    workers = int(os.getenv("DOWNLOAD_WORKERS", "4") or 4)
+                    retries = int(os.getenv("DOWNLOAD_RETRIES", "3") or 3)
+                except ValueError:
+                    workers, retries = 4, 3
+                _DOWNLOAD_MANAGER = DownloadManager(max_workers=workers, retries=retries)
+    return _DOWNLOAD_MANAGER
+
+
+def _session_headers(context, abs_url: str, referer_url: str | None = None, user_agent: str = "") -> dict[str, str]:
+    """Cabecalhos para baixar fora do Playwright com a sessao autenticada (cookies do contexto)."""
+    headers = {"Accept": PDF_ACCEPT_HEADER}
+    if referer_url:
+        headers["Referer"] = referer_url
+    if user_agent:
+        headers["User-Agent"] = user_agent
+    try:
+        cookies = context.cookies(abs_url)
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+    except Exception:
+        pass
+    return headers
+
+
+def _stream_download_pdf(abs_url: str, pdf_path: Path, headers: dict[str, str], cod: str = "") -> Path | None:
+    """Baixa em streaming pelo DownloadManager (seguro entre threads) e alimenta o cache.
+
+    Consulta antes o cache de PDFs pelo codigo do documento ou, sem ele, por URL + ETag/
+    Content-Length (obtidos com um HEAD).
+    """
+    import urllib.request
+
+    hit = _pdf_from_cache(pdf_path, cod_key(cod))
+    if hit:
+        return hit
+    if not cod and _get_pdf_cache():
+        try:
+            with urllib.request.urlopen(urllib.request.Request(abs_url, headers=headers, method="HEAD"), timeout=15) as head:
+                hit = _pdf_from_cache(pdf_path, url_key(abs_url, head.headers.get("ETag") or "", head.headers.get("Content-Length") or ""))
+            if hit:
+                return hit
+        except Exception:
+            pass
+    try:
+        res = _get_download_manager().download(abs_url, pdf_path, headers)
+    except Exception as e:
+        print(f"Aviso: falha no download de {pdf_path.name}: {e}")
+        return None
+    if not res:
+        return None
+    print(f"PDF salvo em: {pdf_path.resolve()} (sha256 {res.sha256[:12]}, {res.size} bytes)")
+    cache = _get_pdf_cache()
+    if cache:
+        try:
+            length = "" if res.content_length is None else str(res.content_length)
+            cache.put_file(res.path, cod_key(cod), url_key(abs_url, res.etag, length), digest=res.sha256)
+        except Exception as e:
+            print(f"Aviso: nao foi possivel gravar o PDF no cache: {e}")
+    return res.path
+
+
+def _download_and_save_pdf(context, abs_url: str, pdf_path: Path, referer_url: str | None = None, cod: str = "") -> Path | None:
+    """Baixa o PDF com a sessao do contexto e grava em `pdf_path` (None se nao for PDF).
+
+    Usa o download em streaming; se ele falhar, tenta uma vez pelo `context.request`
+    (corpo inteiro em memoria), que herda proxy/certificados do navegador.
+    """
+    hit = _pdf_from_cache(pdf_path, cod_key(cod))
+    if hit:
+        return hit
+    saved = _stream_download_pdf(abs_url, pdf_path, _session_headers(context, abs_url, referer_url), cod=cod)
+    if saved:
+        return saved
+    try:
+        headers = {"Accept": PDF_ACCEPT_HEADER}
+        if referer_url:
+            headers["Referer"] = referer_url
+        resp = context.request.get(abs_url, headers=headers, timeout=60000)
+        if not resp.ok:
+            return None
+        body = resp.body()
+        if not _is_pdf_payload(body, resp.headers.get("content-type") or ""):
+            return None
+        ukey = url_key(abs_url, resp.headers.get("etag") or "", resp.headers.get("content-length") or "")
+        return _save_pdf_body(body, pdf_path, cod_key(cod), ukey)
+    except Exception:
+        return None
+
+
+class PdfResponseCapture:
+    """Guarda os bytes dos PDFs que o proprio visualizador carrega.
+
+    Um `page.route` intercepta os carregamentos de subframe/embed: a resposta e obtida
+    uma unica vez com `route.fetch()` e, se for PDF, o corpo e mantido. Com
+    `short_circuit` o embed recebe uma pagina vazia em vez do PDF (nao renderiza e o
+    documento nao precisa ser baixado de novo); sem ele a resposta segue intacta.
+    Os handlers so rodam durante chamadas Playwright, por isso quem espera deve usar
+    `page.wait_for_timeout` e nao `time.sleep`.
+    """
+
+    BLANK_HTML = "<html><body></body></html>"
+
+    def __init__(self, page, viewer_frame, short_circuit: bool = True):
+        self.page = page
+        self.viewer_frame = viewer_frame
+        self.short_circuit = short_circuit
+        self.captured: list[tuple[int, str, bytes]] = []  # (sequencia, url, corpo) ainda nao consumidos
+        self._seq = 0
+        self._attached = False
+
+    def _should_intercept(self, request) -> bool:
+        try:
+            rtype = request.resource_type
+            if rtype in ("object", "other"):
+                return True
+            if rtype != "document":
+                return False
+            frame = request.frame
+            return frame != self.page.main_frame and frame != self.viewer_frame
+        except Exception:
+            return False
+
+    def _handle(self, route) -> None:
+        # uma excecao aqui deixaria a requisicao pendurada (e a pagina inteira esperando)
+        try:
+            self._intercept(route)
+        except Exception:
+            try:
+                route.continue_()
+            except Exception:
+                pass
+
+    def _intercept(self, route) -> None:
+        request = route.request
+        if not self._should_intercept(request):
+            route.continue_()
+            return
+        try:
+            resp = route.fetch()
+        except Exception:
+            route.continue_()
+            return
+        try:
+            body = resp.body()
+            ct = resp.headers.get("content-type") or ""
+        except Exception:
+            route.fulfill(response=resp)
+            return
+        if not _is_pdf_payload(body, ct):
+            route.fulfill(response=resp)
+            return
+        self._seq += 1
+        self.captured.append((self._seq, request.url, body))
+        if self.short_circuit:
+            route.fulfill(status=200, content_type="text/html", body=self.BLANK_HTML)
+        else:
+            route.fulfill(response=resp, body=body)
+
+    def attach(self) -> "PdfResponseCapture":
+        if not self._attached:
+            self.page.route("**/*", self._handle)
+            self._attached = True
+        return self
+
+    def detach(self) -> None:
+        if self._attached:
+            try:
+                self.page.unroute("**/*", self._handle)
+            except Exception:
+                pass
+            self._attached = False
+
+    def mark(self) -> int:
+        """Marca o momento atual; capturas anteriores a ela sao descartadas pelo `take`."""
+        return self._seq
+
+    def take(self, mark: int, accept: Callable[[str], bool] = lambda url: True) -> Optional[tuple[str, bytes]]:
+        """Retira o PDF mais recente capturado depois de `mark` cuja URL `accept` aprova.
+
+        A captura devolvida sai da lista, e as anteriores a `mark` (nunca consumidas) sao descartadas.
+        """
+        self.captured = [c for c in self.captured if c[0] > mark]
+        for i in range(len(self.captured) - 1, -1, -1):
+            _, url, body = self.captured[i]
+            if accept(url):
+                del self.captured[i]
+                return url, body
+        return None
+
+
+class ViewerSession:
+    """Uma unica visita ao VisualizarDocsProtocolo para varias pecas.
+
+    Le a arvore de pecas uma vez (metadados de todas as pecas), permite selecionar
+    qualquer conjunto ("first", "last", "last-N", "first-N", "re:<regex do titulo>")
+    e baixa os PDFs escolhidos em paralelo com os cookies da sessao autenticada.
+    """
+
+    def __init__(self, context, page, output_dir: Path, processo: str, max_workers: int = 0, capture: Optional[bool] = None):
+        self.context = context
+        self.page = page
+        self.output_dir = output_dir
+        self.processo = processo
+        self.max_workers = max(1, max_workers or _get_download_manager().max_workers)
+        self.frame = _find_viewer_frame(page)
+        self._selector = ""
+        self.pieces: list[dict] = self._read_pieces()
+        self._cod_url: Optional[tuple[str, str]] = None
+        self._last_capture: Optional[tuple[str, bytes]] = None
+        self.capture: Optional[PdfResponseCapture] = None
+        if env_bool("VIEWER_CAPTURE_PDF", True) if capture is None else capture:
+            try:
+                self.capture = PdfResponseCapture(
+                    page, self.frame, short_circuit=env_bool("VIEWER_PDF_SHORT_CIRCUIT", True)
+                ).attach()
+            except Exception as e:
+                print(f"Aviso: captura de PDF do visualizador indisponivel: {e}")
+
+    def close(self) -> None:
+        """Remove a interceptacao de rede; chamar ao terminar de usar o visualizador."""
+        if self.capture:
+            self.capture.detach()
+
+    def __enter__(self) -> "ViewerSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _piece_locator(self):
+        return self.frame.locator(self._selector or PIECE_SELECTORS[-1])
+
+    def _read_pieces(self) -> list[dict]:
+        """Le toda a arvore com um unico evaluate; cai para leitura por elemento se falhar."""
+        try:
+            raw = self.frame.evaluate(READ_PIECES_JS, list(PIECE_SELECTORS)) or {}
+            self._selector = raw.get("selector") or ""
+            return piece_records(raw.get("items") or [])
+        except Exception as e:
+            print(f"Aviso: leitura em lote da arvore de pecas falhou ({e}); lendo peca a peca.")
+        loc = None
+        for sel in PIECE_SELECTORS:
+            loc = self.frame.locator(sel)
+            if loc.count() > 0:
+                self._selector = sel
+                break
+        items: list[dict] = []
+        for i in range(loc.count() if self._selector else 0):
+            item = loc.nth(i)
+            try:
+                title = item.inner_text(timeout=1000) or ""
+            except Exception:
+                title = ""
+            items.append({
+                "index_ato": item.get_attribute("index_ato"),
+                "index": item.get_attribute("index"),
+                "cod_arquivo_digital_criptografado": item.get_attribute("cod_arquivo_digital_criptografado"),
+                "title": title,
+                "tooltip": item.get_attribute("title"),
+            })
+        return piece_records(items)
+
+    def select(self, spec: str) -> list[dict]:
+        """Resolve uma especificacao de pecas para a lista de registros correspondentes."""
+        return select_pieces(self.pieces, spec)
+
+    def _label_for(self, spec: str, piece: dict) -> str:
+        low = (spec or "").lower()
+        if low == "first":
+            return "primeiro-ato"
+        if low == "last":
+            return "ultimo-ato"
+        return f"peca-{piece['order']:03d}"
+
+    def _click_piece(self, piece: dict) -> None:
+        path = piece.get("path")
+        if path:
+            loc = self.frame.locator(path)
+            if loc.count() == 1:
+                loc.click()
+                return
+        self._piece_locator().nth(piece["n"]).click()
+
+    def _current_pdf_url(self) -> Optional[str]:
+        pdf_url = _find_pdf_url_in_container(self.frame) or _find_pdf_url_in_container(self.page)
+        if not pdf_url:
+            return None
+        base_url = getattr(self.frame, "url", None) or self.page.url
+        return urljoin(base_url, pdf_url)
+
+    def open_piece(self, piece: dict, wait_s: float = 3.0) -> Optional[str]:
+        """Clica na peca e retorna a URL absoluta do PDF exibido no visualizador.
+
+        Se a captura estiver ativa, os bytes carregados pelo visualizador ficam em
+        `_last_capture` e o chamador nao precisa baixar o documento de novo.
+        """
+        before = self._current_pdf_url()
+        cod = piece.get("cod_arquivo_digital_criptografado") or ""
+        mark = self.capture.mark() if self.capture else 0
+        self._last_capture = None
+        self._click_piece(piece)
+        deadline = time.time() + wait_s
+        url = None
+        while time.time() < deadline:
+            url = self._current_pdf_url()
+            if self.capture:
+                # preferencia para a captura cuja URL traz o codigo da peca
+                self._last_capture = self.capture.take(mark, lambda u: bool(cod) and cod in u) or self.capture.take(
+                    mark, lambda u: self._capture_da_peca(piece, u, before)
+                )
+                if self._last_capture:
+                    break
+            if url and url != before:
+                break
+            self.page.wait_for_timeout(200)
+        url = url or self._current_pdf_url()
+        if self._last_capture and not (url and url != before):
+            url = self._last_capture[0]
+        if url and cod and cod in url:
+            self._cod_url = (cod, url)
+        return url
+
+    def _capture_da_peca(self, piece: dict, cap_url: str, before: Optional[str]) -> bool:
+        """A captura pertence a peca clicada? Evita gravar no cache o PDF atrasado da peca anterior."""
+        cod = piece.get("cod_arquivo_digital_criptografado") or ""
+        if cod and cod in cap_url:
+            return True
+        if before and cap_url == before:
+            return False
+        # URL sem o codigo da peca: so aceita se nao for de outra peca conhecida
+        outros = (p.get("cod_arquivo_digital_criptografado") for p in self.pieces if p is not piece)
+        return not any(c and c in cap_url for c in outros)
+
+    def pdf_url_for(self, piece: dict) -> Optional[str]:
+        """URL do PDF sem clicar, quando a URL de outra peca revelou o padrao pelo codigo."""
+        cod = piece.get("cod_arquivo_digital_criptografado") or ""
+        if self._cod_url and cod:
+            known_cod, known_url = self._cod_url
+            return known_url.replace(known_cod, cod)
+        return None
+
+    def _request_headers(self, abs_url: str) -> dict[str, str]:
+        referer = None
+        user_agent = ""
+        try:
+            referer = getattr(self.frame, "url", None) or self.page.url
+            user_agent = self.page.evaluate("() => navigator.userAgent") or ""
+        except Exception:
+            pass
+        return _session_headers(self.context, abs_url, referer, user_agent)
+
+    def _new_window_pdf(self, pdf_path: Path, cod: str = "") -> Path | None:
+        """Fallback: abre o PDF atual em nova janela e baixa pela URL exibida nela."""
+        btn_sel = "#imgNewWindow, img#imgNewWindow"
+        pdf_page = None
+        try:
+            host = self.frame if self.frame.locator(btn_sel).count() > 0 else self.page
+            if host.locator(btn_sel).count() == 0:
+                print("Aviso: Botao 'abrir em nova janela' nao encontrado e nenhum embed localizado.")
+                return None
+            with self.page.expect_popup(timeout=15000) as pop_info:
+                host.locator(btn_sel).first.click()
+            pdf_page = pop_info.value
+        except Exception:
+            print("Aviso: Botao 'abrir em nova janela' nao encontrado e nenhum embed localizado.")
+            return None
+
+        try:
+            try:
+                pdf_page.wait_for_load_state("domcontentloaded", timeout=30000)
+            except Exception:
+                pass
+            # Give the viewer a moment to inject the <embed> element
+            try:
+                pdf_page.wait_for_selector("embed[original-url], embed[type*='pdf'], iframe[src], object[data]", timeout=10000)
+            except Exception:
+                pass
+            pdf_url = (
+                _pick_attr(pdf_page, "embed[original-url]", "original-url")
+                or _pick_attr(pdf_page, "iframe[src]", "src")
+                or _pick_attr(pdf_page, "embed[type*='pdf']", "src")
+                or _pick_attr(pdf_page, "object[data]", "data")
+                or _pick_attr(pdf_page, "a[href*='.pdf']", "href")
+            )
+            if not pdf_url:
+                print("Aviso: URL do PDF nao encontrada na nova janela.")
+                return None
+            saved = _download_and_save_pdf(self.context, urljoin(pdf_page.url, pdf_url), pdf_path, referer_url=pdf_page.url, cod=cod)
+            if not saved:
+                print("Aviso: conteudo nao-PDF retornado na nova janela.")
+            return saved
+        finally:
+            try:
+                pdf_page.close()
+            except Exception:
+                pass
+
+    def fetch(self, specs: list[str]) -> dict[str, list[tuple[Path | None, Optional[str]]]]:
+        """Baixa as pecas pedidas; retorna {spec: [(pdf_path, titulo), ...]}.
+
+        As URLs sao resolvidas em sequencia (clique so quando o padrao da URL nao e
+        conhecido) e os downloads correm em paralelo. Cada peca e baixada uma unica vez,
+        mesmo que apareca em mais de uma especificacao; pecas ja presentes no cache de
+        PDFs (pelo codigo do documento) nao sao nem clicadas.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        plan: list[tuple[str, dict, Path]] = []
+        for spec in specs:
+            for piece in self.select(spec):
+                dest = self.output_dir / f"{safe_filename(self.processo)}-{self._label_for(spec, piece)}.pdf"
+                plan.append((spec, piece, dest))
+
+        downloaded: dict[int, Path | None] = {}
+        first_dest: dict[int, Path] = {}
+        cods: dict[int, str] = {}
+        for _, piece, dest in plan:
+            n = piece["n"]
+            if n in first_dest:
+                continue
+            first_dest[n] = dest
+            cods[n] = piece.get("cod_arquivo_digital_criptografado") or ""
+            hit = _pdf_from_cache(dest, cod_key(cods[n]))
+            if hit:
+                downloaded[n] = hit
+
+        urls: dict[int, Optional[str]] = {}
+        for _, piece, _ in plan:
+            n = piece["n"]
+            if n in urls or n in downloaded:
+                continue
+            urls[n] = self.pdf_url_for(piece)
+            if urls[n]:
+                continue
+            urls[n] = self.open_piece(piece)
+            if self._last_capture:
+                # O visualizador ja trouxe o PDF: grava sem novo download
+                cap_url, body = self._last_capture
+                self._last_capture = None
+                downloaded[n] = _save_pdf_body(body, first_dest[n], cod_key(cods[n]), url_key(cap_url, "", str(len(body))))
+
+        jobs = [(n, urls.get(n), first_dest[n]) for n in first_dest if n not in downloaded and urls.get(n)]
+        if len(jobs) > 1 and self.max_workers > 1:
+            headers = {url: self._request_headers(url) for _, url, _ in jobs}
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+                futs = {n: pool.submit(_stream_download_pdf, url, dest, headers[url], cods[n]) for n, url, dest in jobs}
+                downloaded.update({n: fut.result() for n, fut in futs.items()})
+        else:
+            referer = getattr(self.frame, "url", None) or self.page.url
+            for n, url, dest in jobs:
+                downloaded[n] = _download_and_save_pdf(self.context, url, dest, referer_url=referer, cod=cods[n])
+
+        results: dict[str, list[tuple[Path | None, Optional[str]]]] = {spec: [] for spec in specs}
+        fallback_done: set[int] = set()
+        for spec, piece, dest in plan:
+            n = piece["n"]
+            path = downloaded.get(n)
+            if path is None and n not in fallback_done:
+                # 4) Fallback: abre a peca em nova janela e extrai a URL de la
+                if urls.get(n):
+                    print("Aviso: conteudo nao-PDF retornado no embed direto. Tentando nova janela...")
+                self.open_piece(piece, wait_s=1.0)
+                path = self._new_window_pdf(first_dest[n], cod=cods[n])
+                downloaded[n] = path
+                fallback_done.add(n)
+            if path is not None and dest != path:
+                import shutil
+
+                shutil.copyfile(path, dest)
+                path = dest
+            results[spec].append((path, piece["title"] or None))
+        return results
+
+    def fetch_one(self, spec: str) -> tuple[Path | None, Optional[str]]:
+        got = self.fetch([spec]).get(spec) or []
+        return got[0] if got else (None, None)
+
+
+def click_last_piece_and_open_pdf(context, page, output_dir: Path, processo: str, position: str = "last") -> tuple[Path | None, Optional[str]]:
+    """Within the VisualizarDocsProtocolo viewer, click the most recent piece and download its PDF.
+
+    Set position to "first" to fetch the capa/first piece; defaults to the last piece.
+    Para varias pecas na mesma visita use `ViewerSession` diretamente.
+    """
+    with ViewerSession(context, page, output_dir, processo) as session:
+        if not session.pieces:
+            print("Aviso: Nenhuma peca encontrada no visualizador.")
+            return None, None
+        spec = "first" if (position or "last").lower().startswith("first") else "last"
+        return session.fetch_one(spec)
+
+
+def _extract_cover_text(context, page, output_dir: Path, processo: str) -> str:
+    """Download and extract text from the first (capa) PDF when available."""
+    try:
+        cover_pdf_path, _ = click_last_piece_and_open_pdf(context, page, output_dir, processo, position="first")
+        if cover_pdf_path:
+            return extract_text_from_pdf(cover_pdf_path)
+    except Exception as e:
+        print(f"Aviso: falha ao analisar PDF da capa: {e}")
+    return ""
+
+
+def _fetch_last_and_cover(context, page, output_dir: Path, processo: str) -> tuple[Path | None, Optional[str], str]:
+    """Uma visita ao visualizador: baixa ultima peca e capa juntas e extrai o texto da capa.
+
+    Retorna (pdf da ultima peca, titulo da ultima peca, texto da capa).
+    """
+    try:
+        session = ViewerSession(context, page, output_dir, processo)
+    except Exception as e:
+        print(f"Aviso: falha ao abrir o visualizador: {e}")
+        return None, None, ""
+    with session:
+        if not session.pieces:
+            print("Aviso: Nenhuma peca encontrada no visualizador.")
+            return None, None, ""
+        got = session.fetch(["last", "first"])
+    pdf_path, piece_title = (got.get("last") or [(None, None)])[0]
+    cover_pdf_path, _ = (got.get("first") or [(None, None)])[0]
+    cover_text = ""
+    if pdf_path and cover_pdf_path:
+        try:
+            cover_text = extract_text_from_pdf(cover_pdf_path, max_pages=_env_int("COVER_MAX_PAGES", 0))
+        except Exception as e:
+            print(f"Aviso: falha ao analisar PDF da capa: {e}")
+    return pdf_path, piece_title, cover_text
+
+
+def _save_pieces_meta(output_dir: Path, processo: str, piece_title: Optional[str]) -> None:
+    """Grava `<processo>-pecas.json` ao lado dos PDFs (usado pela regeneracao offline)."""
+    try:
+        import json
+        meta = {"processo": processo, "ultimo_titulo": piece_title or ""}
+        meta_path = output_dir / f"{safe_filename(processo)}-pecas.json"
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    except Exception as e:
+        print(f"Aviso: nao foi possivel gravar metadados das pecas: {e}")
+
+
+class ProcessoPrefetcher:
+    """Antecipa visualizador e PDFs dos proximos processos num segundo navegador.
+
+    Roda numa thread propria (a API sync do Playwright nao e compartilhavel entre
+    threads) com a sessao copiada do contexto principal via storage_state. Enquanto o
+    processo i esta nas etapas de comunicacao/anexo, baixa ultima peca e capa dos
+    processos i+1..i+depth; os PDFs vao para `output_dir` e para o cache de PDFs.
+    `fetcher(processo)` substitui o navegador (testes).
+    """
+
+    def __init__(
+        self,
+        storage_state: dict,
+        launch_kwargs: dict,
+        mesa_url: str,
+        output_dir: Path,
+        processos: list[str],
+        depth: int = 1,
+        fetcher: Optional[Callable[[str], tuple]] = None,
+    ):
+        self.storage_state = storage_state
+        self.launch_kwargs = launch_kwargs
+        self.mesa_url = mesa_url
+        self.output_dir = output_dir
+        self.processos = list(processos)
+        self.depth = max(1, depth)
+        self.fetcher = fetcher
+        self._cond = threading.Condition()
+        self._cursor = 0
+        self._stopped = False
+        self._cancelled: set[str] = set()
+        self._running: Optional[str] = None
+        self.results: dict[str, tuple[Path | None, Optional[str], str]] = {}
+        self._thread = threading.Thread(target=self._run, name="prefetch-processos", daemon=True)
+
+    def start(self) -> "ProcessoPrefetcher":
+        self._thread.start()
+        return self
+
+    def advance(self, processo: str) -> None:
+        """Informa que o fluxo principal comecou `processo` (libera a janela de antecipacao)."""
+        with self._cond:
+            if processo in self.processos:
+                self._cursor = max(self._cursor, self.processos.index(processo))
+            self._cond.notify_all()
+
+    def cancel(self, processo: str) -> None:
+        """Descarta o processo (ex.: pulado pelo fluxo principal); nao sera antecipado."""
+        with self._cond:
+            self._cancelled.add(processo)
+            self.results.pop(processo, None)
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=30)
+
+    def take(self, processo: str, timeout_s: float = 90.0) -> Optional[tuple[Path | None, Optional[str], str]]:
+        """Resultado antecipado (pdf, titulo, texto da capa); espera se estiver em andamento."""
+        with self._cond:
+            if processo not in self.results and self._running == processo:
+                self._cond.wait_for(lambda: self._running != processo or self._stopped, timeout=timeout_s)
+            got = self.results.pop(processo, None)
+            if got is None:
+                self._cancelled.add(processo)
+            return got
+
+    def _next(self) -> Optional[str]:
+        for pr in self.processos[self._cursor + 1 : self._cursor + 1 + self.depth]:
+            if pr not in self._cancelled and pr not in self.results:
+                return pr
+        return None
+
+    def _loop(self, fetch: Callable[[str], tuple]) -> None:
+        while True:
+            with self._cond:
+                pr = self._next()
+                while pr is None and not self._stopped:
+                    self._cond.wait(timeout=1.0)
+                    pr = self._next()
+                if self._stopped:
+                    break
+                self._running = pr
+            result = fetch(pr)
+            with self._cond:
+                self._running = None
+                if pr not in self._cancelled:
+                    self.results[pr] = result
+                self._cond.notify_all()
+
+    def _run(self) -> None:
+        try:
+            if self.fetcher is not None:
+                self._loop(self.fetcher)
+                return
+            from playwright.sync_api import sync_playwright
+
+            with sync_playwright() as p:
+                browser = p.chromium.launch(**self.launch_kwargs)
+                context = browser.new_context(storage_state=self.storage_state, viewport={"width": 1600, "height": 900})
+                page = context.new_page()
+                page.goto(self.mesa_url, wait_until="domcontentloaded", timeout=60000)
+                self._loop(lambda pr: self._prefetch_one(context, page, pr))
+                context.close()
+                browser.close()
+        except Exception as e:
+            print(f"Aviso: pre-carregamento de processos interrompido: {e}")
+        finally:
+            with self._cond:
+                self._running = None
+                self._stopped = True
+                self._cond.notify_all()
+
+    def _prefetch_one(self, context, page, processo: str) -> tuple[Path | None, Optional[str], str]:
+        print(f"[prefetch] Antecipando {processo}...")
+        viewer_page = None
+        try:
+            viewer_page = _open_processo_viewer(context, page, processo)
+            return _fetch_last_and_cover(context, viewer_page, self.output_dir, processo)
+        except Exception as e:
+            print(f"[prefetch] Aviso: falha ao antecipar {processo}: {e}")
+            return None, None, ""
+        finally:
+            try:
+                if viewer_page is not None and viewer_page != page:
+                    viewer_page.close()
+                page.goto(self.mesa_url, wait_until="domcontentloaded", timeout=60000)
+            except Exception:
+                pass
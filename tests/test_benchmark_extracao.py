@@ -0,0 +1,137 @@
+"""Benchmark de extracao de campos e classificacao sobre o corpus sintetico.
+
+Mede documentos/s de parse_fields_from_pdf_text + tipo + secretaria + decadencia e a
+precisao/revocacao por campo contra o gabarito, e compara com tests/benchmark_baseline.json:
+falha se alguma precisao/revocacao cair ou se a vazao relativa cair mais que
+BENCH_TOLERANCE (padrao 0.35). A vazao e dividida por uma calibracao da maquina medida na
+mesma execucao, para o baseline valer em maquinas diferentes.
+
+    python tests/test_benchmark_extracao.py --update-baseline   # regrava o baseline
+"""
+import json
+import os
+import re
+import sys
+import time
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from corpus_sintetico import CAMPOS, gerar_corpus
+
+BASELINE = ROOT / "tests" / "benchmark_baseline.json"
+N_DOCS = int(os.getenv("BENCH_DOCS", "240"))
+TOLERANCIA = float(os.getenv("BENCH_TOLERANCE", "0.35"))
+ROTULOS = ("tipo", "secretaria", "data_decadencia") + CAMPOS
+
+
+def _norm(v) -> str:
+    return re.sub(r"\s+", " ", str(v or "")).strip()
+
+
+def _calibrar() -> float:
+    """Operacoes/s de uma carga fixa de Python puro (regex + strings), melhor de 3."""
+    texto = "Processo nº 123/2024 Interessado: Fulano " * 200
+    pat = re.compile(r"interessado\s*[:\-]\s*(\w+)")
+    melhor = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(200):
+            low = texto.lower()
+            pat.search(low)
+            "".join(c for c in low[:2000] if c.isalpha())
+        melhor = min(melhor, time.perf_counter() - t0)
+    return 200 / melhor
+
+
+def _analisar(doc: dict) -> dict:
+    from extracao import (
+        _classify_tipo_from_text_and_piece,
+        _detect_secretaria_from_text,
+        extract_data_decadencia,
+        parse_fields_from_pdf_text,
+    )
+
+    texto, capa = doc["texto"], doc["capa"]
+    out = dict(parse_fields_from_pdf_text(texto))
+    out["tipo"] = _classify_tipo_from_text_and_piece(texto, doc["peca"], cover_text=capa)
+    out["secretaria"] = _detect_secretaria_from_text(f"{capa}\n{texto}")
+    d = extract_data_decadencia(texto)
+    out["data_decadencia"] = d.strftime("%d/%m/%Y") if d else ""
+    return out
+
+
+def avaliar(docs: list[dict], previstos: list[dict]) -> dict[str, dict[str, float]]:
+    """Precisao e revocacao por rotulo (valor vazio = ausente)."""
+    metricas = {}
+    for rot in ROTULOS:
+        tp = fp = fn = 0
+        for doc, prev in zip(docs, previstos):
+            v, p = _norm(doc["verdade"].get(rot)), _norm(prev.get(rot))
+            if p and p == v:
+                tp += 1
+                continue
+            fp += bool(p)
+            fn += bool(v)
+        metricas[rot] = {
+            "precisao": round(tp / (tp + fp), 4) if tp + fp else 1.0,
+            "revocacao": round(tp / (tp + fn), 4) if tp + fn else 1.0,
+        }
+    return metricas
+
+
+def rodar(n: int = N_DOCS) -> dict:
+    docs = list(gerar_corpus(n))
+    _analisar(docs[0])  # aquece imports e caches de regex
+    melhor = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        previstos = [_analisar(d) for d in docs]
+        melhor = min(melhor, time.perf_counter() - t0)
+    docs_s = n / melhor
+    calib = _calibrar()
+    return {
+        "documentos": n,
+        "docs_por_segundo": round(docs_s, 1),
+        "vazao_relativa": round(docs_s / calib, 4),
+        "campos": avaliar(docs, previstos),
+    }
+
+
+class TestBenchmarkExtracao(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.resultado = rodar()
+        cls.baseline = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else None
+        r = cls.resultado
+        print(f"\nbenchmark: {r['documentos']} docs, {r['docs_por_segundo']} docs/s (relativa {r['vazao_relativa']})")
+        for rot, m in r["campos"].items():
+            print(f"  {rot:>18}: precisao={m['precisao']:.2%} revocacao={m['revocacao']:.2%}")
+
+    def test_precision_recall_not_below_baseline(self) -> None:
+        if not self.baseline:
+            self.skipTest("sem baseline; rode com --update-baseline")
+        for rot, base in self.baseline["campos"].items():
+            atual = self.resultado["campos"].get(rot, {})
+            for k in ("precisao", "revocacao"):
+                self.assertGreaterEqual(atual.get(k, 0.0), base[k], f"{rot} {k} caiu")
+
+    def test_throughput_not_regressed(self) -> None:
+        if not self.baseline:
+            self.skipTest("sem baseline; rode com --update-baseline")
+        minimo = self.baseline["vazao_relativa"] * (1 - TOLERANCIA)
+        self.assertGreaterEqual(
+            self.resultado["vazao_relativa"], minimo,
+            f"vazao caiu: {self.resultado['docs_por_segundo']} docs/s (baseline {self.baseline['docs_por_segundo']})",
+        )
+
+
+if __name__ == "__main__":
+    if "--update-baseline" in sys.argv:
+        res = rodar()
+        BASELINE.write_text(json.dumps(res, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(json.dumps(res, ensure_ascii=False, indent=2))
+    else:
+        unittest.main()
@@ -0,0 +1,49 @@
+import re
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from campos import FIELD_TABLE, FLAGS, scan_fields
+
+TEXTS = [
+    "PROCESSO Nº 12.345/2023\nInteressado: MARIA DA SILVA\nAssunto - Aposentadoria  voluntária\n"
+    "São Paulo, 3 de Maio de 2023\nCPF: 123.456.789-00\nMATRÍCULA: 123.456-7\nFunção: Professora\n"
+    "Data de Nascimento: 01/02/1960\nCategoria: Pensão\nTipo: Outro\nProc. Externo: SEI 6016\n"
+    "Conselheiro Relator: JOÃO\nInstância: 1ª",
+    "Requerente: Fulano\nObjeto: revisão\n987.654.321-00 em 10/11/2022\nRF: 8.123.456\n"
+    "Natureza do Processo: Aposentadoria\nRelator: Beltrano\nExterno: 2020/1\nNo 55/2021 Processo",
+    "texto sem campos, só prosa com relator e processo mencionados.",
+    "Relator: ſérgio\nCargo: Analiſta",
+    "",
+]
+
+
+def _chained_search(text: str) -> dict[str, str]:
+    out = {}
+    for name, patterns in FIELD_TABLE:
+        for pat in patterns:
+            m = re.search(pat, text, flags=FLAGS)
+            if m:
+                out[name] = re.sub(r"\s+", " ", m.group(1).strip())
+                break
+    return out
+
+
+class TestCampos(unittest.TestCase):
+    def test_same_as_chained_search(self) -> None:
+        for text in TEXTS:
+            self.assertEqual(scan_fields(text), _chained_search(text) if text else {})
+
+    def test_values_keep_original_case(self) -> None:
+        found = scan_fields(TEXTS[0])
+        self.assertEqual(found["interessado"], "MARIA DA SILVA")
+        self.assertEqual(found["assunto"], "Aposentadoria voluntária")
+        self.assertEqual(found["data_documento"], "01/02/1960")
+        self.assertEqual(found["tipo_processo"], "Pensão")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from classificador import AhoCorasick, Classificador, Regra, load_rules
+from documento import NormalizedDocument
+
+
+def _doc(text: str) -> NormalizedDocument:
+    return NormalizedDocument.from_text(text)
+
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_same_as_brute_force(self) -> None:
+        rnd = random.Random(7)
+        patterns = ["he", "she", "his", "hers", "s", "ab", "bab", "abab"]
+        ac = AhoCorasick(patterns)
+        for _ in range(200):
+            text = "".join(rnd.choice("abehirs ") for _ in range(rnd.randint(0, 40)))
+            expected = sorted(
+                (i, i + len(p), k) for k, p in enumerate(patterns)
+                for i in range(len(text)) if text.startswith(p, i)
+            )
+            self.assertEqual(sorted(ac.iter_matches(text)), expected)
+
+
+class TestClassificador(unittest.TestCase):
+    def test_priority_scope_and_positions(self) -> None:
+        c = Classificador([
+            Regra("juízo singular", "tipo", "JUIZO", 100, ("peca",)),
+            Regra("reitere-se", "tipo", "REITERACAO", 60),
+            Regra("dilação", "tipo", "DILACAO", 70, ("pdf",)),
+            Regra("saúde", "secretaria", "Saúde", 10),
+        ])
+        r = c.classificar(pdf=_doc("Reitere-se.\nSecretaria de SAÚDE"), capa=_doc("pedido de dilação"))
+        self.assertEqual((r.tipo, r.secretaria), ("REITERACAO", "Saúde"))
+        motivo = r.motivo("secretaria")
+        self.assertEqual((motivo.fonte, motivo.inicio, motivo.fim, motivo.trecho), ("pdf", 26, 31, "SAÚDE"))
+        self.assertEqual(c.classificar(peca=_doc("Decisão de Juízo Singular")).tipo, "JUIZO")
+        self.assertEqual(c.classificar(pdf=_doc("nada")).secretaria, "Geral")
+
+    def test_flexible_space_and_whole_word(self) -> None:
+        c = Classificador([
+            Regra("juizo singular", "tipo", "JUIZO", 80, palavra_inteira=True, espaco_flexivel=True),
+            Regra("autorizo a prorrogacao", "tipo", "DILACAO", 70),
+        ])
+        self.assertEqual(c.classificar(pdf=_doc("o Juízo\n  Singular decidiu")).tipo, "JUIZO")
+        self.assertEqual(c.classificar(pdf=_doc("juizo singulares")).tipo, "UTAP")
+        self.assertEqual(c.classificar(pdf=_doc("autorizo  a prorrogacao")).tipo, "UTAP")
+        hit = c.classificar(pdf=_doc("x Juízo\n  Singular")).acertos[0]
+        self.assertEqual(hit.trecho, "Juízo\n  Singular")
+
+    def test_default_rules_file(self) -> None:
+        c = load_rules()
+        self.assertEqual(c.classificar(pdf=_doc("Autorizo a dilação de prazo"), capa=_doc("SME")).tipo, "DILACAO")
+        self.assertEqual(c.classificar(pdf=_doc("educação e saúde")).secretaria, "Educação")
+        self.assertEqual(c.classificar(pdf=_doc("Reitere-se"), peca=_doc("MANUTAP-OF")).tipo, "UTAP")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from corpus_sintetico import COLUNAS_APO_PEN, escrever_pdfs, escrever_xls, escrever_xlsx, gerar_corpus, linha_planilha
+
+try:
+    import xlwt  # type: ignore  # noqa: F401
+    HAS_XLWT = True
+except Exception:
+    HAS_XLWT = False
+
+
+class TestCorpusSintetico(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.docs = list(gerar_corpus(24, seed=9))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_deterministic_and_covers_models(self) -> None:
+        again = list(gerar_corpus(24, seed=9))
+        self.assertEqual([d["texto"] for d in again], [d["texto"] for d in self.docs])
+        combos = {(d["verdade"]["tipo"], d["verdade"]["secretaria"]) for d in self.docs}
+        self.assertEqual(len(combos), 12)
+        self.assertEqual(len({d["processo"] for d in self.docs}), 24)
+
+    def test_pdf_roundtrip(self) -> None:
+        from pypdf import PdfReader
+
+        doc = self.docs[0]
+        escrever_pdfs(doc, self.dir)
+        slug = doc["processo"].replace("/", "_")
+        text = "\n".join(p.extract_text() for p in PdfReader(str(self.dir / f"{slug}-ultimo-ato.pdf")).pages)
+        self.assertIn(doc["verdade"]["{{CPF}}"], text)
+        self.assertIn("TRIBUNAL DE CONTAS DO MUNICÍPIO", text)
+        self.assertTrue((self.dir / f"{slug}-primeiro-ato.pdf").exists())
+        self.assertTrue((self.dir / f"{slug}-pecas.json").exists())
+
+    def test_xlsx(self) -> None:
+        from openpyxl import load_workbook
+
+        path = self.dir / "export.xlsx"
+        self.assertEqual(escrever_xlsx(path, (linha_planilha(d) for d in self.docs)), 24)
+        rows = list(load_workbook(str(path), read_only=True).active.iter_rows(values_only=True))
+        self.assertEqual(rows[0], COLUNAS_APO_PEN)
+        self.assertEqual(rows[1][0], self.docs[0]["processo"])
+
+    @unittest.skipUnless(HAS_XLWT, "xlwt nao instalado")
+    def test_xls(self) -> None:
+        import xlrd
+
+        path = self.dir / "export.xls"
+        self.assertEqual(escrever_xls(path, (linha_planilha(d) for d in self.docs)), 24)
+        sheet = xlrd.open_workbook(str(path)).sheet_by_index(0)
+        self.assertEqual(sheet.nrows, 25)
+        self.assertEqual(sheet.cell_value(24, 0), self.docs[-1]["processo"])
+
+
+if __name__ == "__main__":
+    unittest.main()
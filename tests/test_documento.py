@@ -0,0 +1,49 @@
+import sys
+import unicodedata
+import unittest
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from documento import NormalizedDocument, analisar_documento
+
+
+def _normalize_antigo(s: str) -> str:
+    s = (s or "").replace("º", "o").replace("°", "o").replace("ª", "a")
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(c for c in s if not unicodedata.combining(c)).lower()
+
+
+class TestNormalizedDocument(unittest.TestCase):
+    def test_same_as_normalize(self) -> None:
+        for text in ["Secretaria Municipal de EDUCAÇÃO", "Ofício nº 12ª – Decadência: 1/2/2025", "ﬁm ½ São", ""]:
+            self.assertEqual(NormalizedDocument.from_text(text).norm, _normalize_antigo(text))
+
+    def test_offsets(self) -> None:
+        doc = NormalizedDocument.from_text("Prazo de Decadência: 10/05/2026")
+        start = doc.norm.index("decadencia")
+        self.assertEqual(doc.original(start, start + len("decadencia")), "Decadência")
+        self.assertEqual(len(doc.offsets), len(doc.norm))
+
+
+class TestAnalisarDocumento(unittest.TestCase):
+    def test_all_detectors(self) -> None:
+        a = analisar_documento(
+            "Autorizo a dilação de prazo. Data limite: 05/06/2026",
+            "Despacho",
+            "Secretaria Municipal da Saúde",
+        )
+        self.assertEqual((a.tipo, a.secretaria, a.data_decadencia), ("DILACAO", "Saúde", date(2026, 6, 5)))
+        self.assertIn("dilação de prazo", [h.trecho for h in a.acertos][0])
+
+    def test_piece_name_first(self) -> None:
+        a = analisar_documento("Reitere-se.", "Decisão de Juízo Singular", None)
+        self.assertEqual((a.tipo, a.secretaria, a.data_decadencia), ("JUIZO", "Geral", None))
+        self.assertEqual(analisar_documento("Reitere-se.", "MANUTAP-OF").tipo, "UTAP")
+        self.assertEqual(analisar_documento("Reitere-se.").tipo, "REITERACAO")
+
+
+if __name__ == "__main__":
+    unittest.main()
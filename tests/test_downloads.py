@@ -0,0 +1,92 @@
+import hashlib
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from downloads import DownloadManager
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 2048 + b"\n%%EOF\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    truncated_once: set = set()
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path == "/login":
+            body = b"<html>login</html>" * 1000
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        start = 0
+        rng = self.headers.get("Range")
+        if rng:
+            start = int(rng.split("=")[1].split("-")[0])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(PDF) - 1}/{len(PDF)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(PDF) - start))
+        self.end_headers()
+        if self.path == "/flaky" and self.path not in self.truncated_once:
+            self.truncated_once.add(self.path)
+            self.wfile.write(PDF[start: start + 100000])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(PDF[start:])
+
+
+class TestDownloadManager(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_concurrent_downloads_with_checksum(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            mgr = DownloadManager(max_workers=3, chunk_size=8192)
+            jobs = [(f"{self.base}/doc{i}", Path(tmp) / f"d{i}.pdf", {}) for i in range(3)]
+            results = mgr.download_many(jobs)
+            for res in results:
+                self.assertEqual(res.path.read_bytes(), PDF)
+                self.assertEqual(res.sha256, hashlib.sha256(PDF).hexdigest())
+                self.assertEqual(res.size, len(PDF))
+                self.assertEqual(res.content_length, len(PDF))
+
+    def test_rejects_non_pdf(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = Path(tmp) / "x.pdf"
+            self.assertIsNone(DownloadManager(retries=0).download(f"{self.base}/login", dest))
+            self.assertEqual(list(Path(tmp).iterdir()), [])
+
+    def test_resumes_partial_transfer(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            mgr = DownloadManager(retries=2, chunk_size=4096)
+            res = mgr.download(f"{self.base}/flaky", Path(tmp) / "f.pdf")
+            self.assertIsNotNone(res)
+            self.assertEqual(res.path.read_bytes(), PDF)
+            self.assertEqual(res.sha256, hashlib.sha256(PDF).hexdigest())
+            self.assertEqual(res.content_length, len(PDF))
+
+
+if __name__ == "__main__":
+    unittest.main()
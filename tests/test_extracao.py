@@ -0,0 +1,48 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import extracao
+from extracao import extract_text_from_pdf, stop_when_fields_found
+
+
+class TestStopWhenFieldsFound(unittest.TestCase):
+    def test_scans_each_page_once_and_latches(self) -> None:
+        paginas = ["Relatorio\n" + "x " * 3000 + "Interessado:", " Fulano de Tal\nsem campos", "Relator: Beltrano", "fim"]
+        vistos: list[str] = []
+        original = extracao.parse_fields_from_pdf_text
+
+        def parse(texto, processo=None):
+            vistos.append(texto)
+            return original(texto, processo)
+
+        done = stop_when_fields_found(["{{INTERESSADO}}", "@@nome_relator"])
+        with mock.patch.object(extracao, "parse_fields_from_pdf_text", side_effect=parse):
+            # o interessado atravessa a quebra de pagina: o fim da pagina 1 e reanalisado com a 2
+            self.assertEqual([done(p) for p in paginas], [False, False, True, True])
+        self.assertEqual(len(vistos), 3)  # com tudo achado, nao analisa mais
+        self.assertTrue(all(len(v) <= extracao._STOP_TAIL + 1 + max(map(len, paginas)) for v in vistos))
+        self.assertNotIn("Relatorio", vistos[1])
+
+    def test_extract_passes_only_new_pages(self) -> None:
+        paginas = [(0, "Interessado: Fulano"), (1, ""), (2, "Relator: Beltrano"), (3, "nao lida")]
+        recebidos: list[str] = []
+        done = stop_when_fields_found(["{{INTERESSADO}}", "@@nome_relator"])
+
+        def stop(texto: str) -> bool:
+            recebidos.append(texto)
+            return done(texto)
+
+        with mock.patch.object(extracao, "iter_pdf_pages", side_effect=lambda *a: (p for p in paginas)), \
+                mock.patch.object(extracao, "_ocr_blank_pages", return_value={}):
+            texto = extract_text_from_pdf(Path("doc.pdf"), stop_when=stop)
+        self.assertEqual(recebidos, ["Interessado: Fulano", "Relator: Beltrano"])
+        self.assertEqual(texto, "Interessado: Fulano\nRelator: Beltrano")
+
+
+if __name__ == "__main__":
+    unittest.main()
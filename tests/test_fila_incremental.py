@@ -0,0 +1,56 @@
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from fila_incremental import FilaIncremental, canonicalize_processo, row_fingerprint
+
+
+class TestFilaIncremental(unittest.TestCase):
+    def test_canonicalize_processo(self) -> None:
+        for raw in (" tc 11724/2020 ", "TC-011724-2020", "TC/011724/2020", "tc/11724/20"):
+            self.assertEqual(canonicalize_processo(raw), "TC/011724/2020")
+        self.assertEqual(canonicalize_processo("  abc  def "), "ABC DEF")
+
+    def test_canonicalize_two_digit_year_pivot(self) -> None:
+        self.assertEqual(canonicalize_processo("TC 123/98"), "TC/000123/1998")
+        self.assertEqual(canonicalize_processo("TC 123/05"), "TC/000123/2005")
+        atual = f"{date.today().year % 100:02d}"
+        self.assertEqual(canonicalize_processo(f"TC 123/{atual}"), f"TC/000123/{date.today().year}")
+
+    def test_fingerprint_ignores_columns(self) -> None:
+        a = row_fingerprint({"Processo": "TC/1/2020", "Dias na pasta": "3"}, ["dias na pasta"])
+        b = row_fingerprint({"Processo": "TC/1/2020", "Dias na pasta": "4"}, ["dias na pasta"])
+        self.assertEqual(a, b)
+
+    def test_plan_only_new_changed_and_stale(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            state = Path(td) / "fila.json"
+            rows = [
+                ("TC/000001/2020", {"Processo": "TC/000001/2020", "Assunto": "A"}),
+                ("TC/000002/2020", {"Processo": "TC/000002/2020", "Assunto": "B"}),
+            ]
+            fila = FilaIncremental(state, today=date(2026, 1, 1))
+            self.assertEqual(fila.plan(rows), ["TC/000001/2020", "TC/000002/2020"])
+            fila.mark_processed("TC/000001/2020")
+            fila.mark_processed("tc 2/2020")
+            fila.save()
+
+            rows[1] = ("TC/000002/2020", {"Processo": "TC/000002/2020", "Assunto": "B2"})
+            rows.append(("TC/000003/2020", {"Processo": "TC/000003/2020", "Assunto": "C"}))
+            fila = FilaIncremental(state, today=date(2026, 1, 2))
+            self.assertEqual(fila.plan(rows), ["TC/000002/2020", "TC/000003/2020"])
+
+            fila = FilaIncremental(state, recheck_after_days=5, today=date(2026, 1, 10))
+            self.assertIn("TC/000001/2020", fila.plan(rows))
+
+    def test_plan_returns_canonical_numbers(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            rows = [(" tc 11724/2020 ", {"Processo": " tc 11724/2020 "}), ("TC-5-2021", {"Processo": "TC-5-2021"})]
+            fila = FilaIncremental(Path(td) / "fila.json", today=date(2026, 1, 1))
+            # mesma forma que a leitura direta da planilha (iter_processos) entrega ao portal
+            self.assertEqual(fila.plan(rows), ["TC/011724/2020", "TC/000005/2021"])
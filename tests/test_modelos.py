@@ -0,0 +1,168 @@
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from docx import Document
+
+from modelos import CT_DOCUMENT, CT_TEMPLATE, CacheModelos, CatalogoModelos, _redistribuir, indexar, substituir
+
+DOTX = ROOT / "modelos_dilacao" / "SSG - Aposentadoria Dilação - Geral.dotx"
+DOCX = ROOT / "modelos_utap" / "SSG - Aposentadoria Providências - Geral.docx"
+
+
+class TestCacheModelos(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_dotx_converted_once(self) -> None:
+        cache = CacheModelos()
+        a = cache.get(DOTX)
+        self.assertIs(cache.get(DOTX), a)
+        self.assertEqual(cache.compilacoes, 1)
+        with zipfile.ZipFile(DOTX) as zin:
+            originais = {i.filename: zin.read(i.filename) for i in zin.infolist()}
+        with zipfile.ZipFile(io.BytesIO(a.docx_bytes)) as z:
+            ct = z.read("[Content_Types].xml").decode("utf-8")
+            self.assertIn(CT_DOCUMENT, ct)
+            self.assertNotIn(CT_TEMPLATE, ct)
+            for nome, data in originais.items():
+                if nome != "[Content_Types].xml":
+                    self.assertEqual(z.read(nome), data, nome)
+
+    def test_render_copies_do_not_touch_cache(self) -> None:
+        cache = CacheModelos()
+        modelo = cache.get(DOCX)
+        original = [p.text for p in modelo.novo_documento().paragraphs]
+        doc = modelo.novo_documento()
+        for p in doc.paragraphs:
+            for r in p.runs:
+                r.text = r.text.replace("@@processo", "TC/000001/2024")
+        out = self.dir / "out.docx"
+        doc.save(str(out))
+        self.assertEqual([p.text for p in modelo.novo_documento().paragraphs], original)
+        salvo = Document(str(out))
+        self.assertIn("TC/000001/2024", "\n".join(p.text for p in salvo.paragraphs))
+        self.assertNotIn("TC/000001/2024", "\n".join(p.text for p in modelo.novo_documento().paragraphs))
+
+    def test_invalidated_when_file_changes(self) -> None:
+        p = self.dir / "modelo.dotx"
+        p.write_bytes(DOTX.read_bytes())
+        cache = CacheModelos()
+        a = cache.get(p)
+        st = p.stat()
+        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        b = cache.get(p)
+        self.assertIsNot(a, b)
+        self.assertEqual(cache.compilacoes, 2)
+        self.assertIs(cache.get(p), b)
+
+
+def _doc_com_runs():
+    doc = Document()
+    p = doc.add_paragraph()
+    for t in ("Processo @@", "proc", "esso e ", "@@processoexterno"):
+        p.add_run(t)
+    doc.add_paragraph("Sem placeholder aqui.")
+    cell = doc.add_table(rows=1, cols=1).cell(0, 0)
+    cell.paragraphs[0].add_run("{{INTER")
+    cell.paragraphs[0].add_run("ESSADO}}").bold = True
+    hp = doc.sections[0].header.paragraphs[0]
+    hp.add_run("Ref. @@pro")
+    hp.add_run("cesso")
+    return doc
+
+
+class TestIndicePlaceholders(unittest.TestCase):
+    def test_index_locations(self) -> None:
+        indice = indexar(_doc_com_runs())
+        self.assertEqual(len(indice.por_placeholder["@@processo"]), 2)
+        self.assertEqual(len(indice.por_placeholder["{{INTERESSADO}}"]), 1)
+        partes = {indice.locais[i].parte for i in indice.por_placeholder["@@processo"]}
+        self.assertEqual(partes, {0, 1})  # corpo e cabecalho
+
+    def test_split_runs_replaced(self) -> None:
+        doc = _doc_com_runs()
+        mapping = {"@@processo": "TC/1/2024", "@@processoexterno": "EXT", "{{INTERESSADO}}": "Ana"}
+        self.assertEqual(substituir(doc, indexar(doc), mapping), 3)
+        p = doc.paragraphs[0]
+        self.assertEqual(p.text, "Processo TC/1/2024 e EXT")
+        self.assertEqual([r.text for r in p.runs], ["Processo TC/1/2024", "", " e ", "EXT"])
+        self.assertEqual(doc.tables[0].cell(0, 0).text, "Ana")
+        self.assertEqual(doc.sections[0].header.paragraphs[0].text, "Ref. TC/1/2024")
+        self.assertEqual(doc.paragraphs[1].text, "Sem placeholder aqui.")
+
+    def test_prefix_key_without_longer_key(self) -> None:
+        # como str.replace: sem a chave longa, o prefixo tambem e trocado dentro dela
+        doc = _doc_com_runs()
+        substituir(doc, indexar(doc), {"@@processo": "X"})
+        self.assertEqual(doc.paragraphs[0].text, "Processo X e Xexterno")
+
+    def test_redistribuir(self) -> None:
+        self.assertEqual(_redistribuir(["a@@", "x", "b"], [(1, 4, "V")]), ["aV", "", "b"])
+        self.assertEqual(_redistribuir(["", "@@x"], [(0, 3, "V")]), ["", "V"])
+
+
+class TestCatalogoModelos(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self.tmp.name)
+        for nome in ("Modelo - Geral.dotx", "Modelo - Saúde.dotx", "Modelo - Saúde.docx", "~$delo - Saúde.docx"):
+            (self.base / "modelos_utap").mkdir(exist_ok=True)
+            (self.base / "modelos_utap" / nome).write_bytes(b"x")
+        (self.base / "modelos_juizo").mkdir()
+        (self.base / "modelos_juizo" / "Juizo - Educação.dotx").write_bytes(b"x")
+        (self.base / "oficios").mkdir()
+        (self.base / "oficios" / "b.dotx").write_bytes(b"x")
+        (self.base / "oficios" / "c.docx").write_bytes(b"x")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _catalogo(self, **kw) -> CatalogoModelos:
+        return CatalogoModelos(base=self.base, secretarias=("Geral", "Saúde", "Educação"), **kw)
+
+    def test_lookup(self) -> None:
+        cat = self._catalogo(templates_dir=str(self.base / "oficios"))
+        utap = self.base / "modelos_utap"
+        self.assertEqual(cat.modelo_para("utap", "SAUDE"), utap / "Modelo - Saúde.docx")
+        self.assertEqual(cat.modelo_para("UTAP", "Educação"), utap / "Modelo - Geral.dotx")
+        self.assertEqual(cat.modelo_para("UTAP", ""), utap / "Modelo - Geral.dotx")
+        self.assertEqual(cat.modelo_para("JUIZO", "Geral"), self.base / "modelos_juizo" / "Juizo - Educação.dotx")
+        self.assertIsNone(cat.modelo_para("DILACAO", "Geral"))
+        self.assertIsNone(cat.modelo_para("OUTRO", "Geral"))
+        self.assertEqual(cat.padrao(), self.base / "oficios" / "c.docx")
+        self.assertEqual(self._catalogo(template="b.dotx", templates_dir=str(self.base / "oficios")).padrao(),
+                         self.base / "oficios" / "b.dotx")
+
+    def test_validar(self) -> None:
+        problemas = self._catalogo().validar()
+        self.assertTrue(any("DILACAO" in p and "nenhum modelo" in p for p in problemas))
+        self.assertTrue(any("UTAP, secretaria Educação" in p for p in problemas))
+        self.assertFalse(any("UTAP, secretaria Saúde" in p for p in problemas))
+
+    def test_watch_rebuilds_on_new_file(self) -> None:
+        cat = self._catalogo(watch_seconds=0.001)
+        d = self.base / "modelos_utap"
+        (d / "Modelo - Educação.dotx").write_bytes(b"x")
+        st = d.stat()
+        os.utime(d, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        time.sleep(0.01)
+        self.assertEqual(cat.modelo_para("UTAP", "Educação"), d / "Modelo - Educação.dotx")
+        self.assertEqual(cat.montagens, 2)
+        self.assertEqual(self._catalogo().modelo_para("UTAP", "Educação"), d / "Modelo - Educação.dotx")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import oficios
+import offline_regen
+from corpus_sintetico import escrever_pdf, escrever_pdfs, gerar_corpus
+
+
+class TestOfflineRegen(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.input = self.dir / "input"
+        self.input.mkdir()
+        self.docs = list(gerar_corpus(6, seed=4))
+        for doc in self.docs:
+            escrever_pdfs(doc, self.input)
+        self.slugs = sorted(d["processo"].replace("/", "_") for d in self.docs)
+        # sem capa: o primeiro ato e opcional
+        (self.input / f"{self.slugs[-1]}-primeiro-ato.pdf").unlink()
+        # capa sem ultimo ato: nao forma par
+        escrever_pdf(self.input / "TC_000999_2020-primeiro-ato.pdf", "capa avulsa")
+        env = {
+            "TEXT_CACHE": "false",
+            "OCR_FALLBACK": "false",
+            "OFICIO_CACHE": "true",
+            "OFICIO_CACHE_DIR": str(self.dir / "cache_oficios"),
+        }
+        self.patches = [mock.patch.dict(os.environ, env), mock.patch.object(oficios, "_OFICIO_CACHE", None)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in reversed(self.patches):
+            p.stop()
+        self.tmp.cleanup()
+
+    def _verdade(self) -> dict[str, dict]:
+        return {d["processo"]: d["verdade"] for d in self.docs}
+
+    def test_find_pdf_pairs(self) -> None:
+        jobs = offline_regen.find_pdf_pairs(self.input)
+        self.assertEqual([j["slug"] for j in jobs], self.slugs)
+        self.assertTrue(all(j["ultimo"].endswith("-ultimo-ato.pdf") and j["pecas"] for j in jobs))
+        self.assertEqual([bool(j["primeiro"]) for j in jobs], [True] * 5 + [False])
+
+    def _check(self, results: list[dict], output: Path) -> None:
+        verdade = self._verdade()
+        self.assertEqual([r["slug"] for r in results], self.slugs)
+        for r in results:
+            self.assertTrue(r["ok"], r)
+            self.assertEqual(r["tipo"], verdade[r["processo"]]["tipo"])
+            self.assertEqual(r["secretaria"], verdade[r["processo"]]["secretaria"])
+            self.assertTrue(r["modelo"])
+            self.assertEqual(Path(r["docx"]).parent, output)
+            self.assertTrue(Path(r["docx"]).exists())
+
+    def test_serial_and_parallel_agree(self) -> None:
+        # o paralelo roda primeiro, com o cache de oficios vazio: os workers gravam o manifesto juntos
+        paralelo = offline_regen.regenerar_todos(self.input, self.dir / "paralelo", workers=3)
+        self._check(paralelo, self.dir / "paralelo")
+        manifesto = json.loads((self.dir / "cache_oficios" / "manifest.json").read_text(encoding="utf-8"))
+        self.assertEqual(len(manifesto["entries"]), 6)
+        serial = offline_regen.regenerar_todos(self.input, self.dir / "serial", workers=1)
+        self._check(serial, self.dir / "serial")
+        campos = ("processo", "tipo", "secretaria", "prazo", "data_decadencia", "modelo")
+        self.assertEqual([[r[c] for c in campos] for r in serial], [[r[c] for c in campos] for r in paralelo])
+
+    def test_main_writes_summary(self) -> None:
+        output = self.dir / "out"
+        argv = ["offline_regen.py", "--input", str(self.input), "--output", str(output), "--workers", "2"]
+        with mock.patch.object(sys, "argv", argv):
+            self.assertEqual(offline_regen.main(), 0)
+        resumo = json.loads((output / "resumo_offline.json").read_text(encoding="utf-8"))
+        self.assertEqual((resumo["total"], resumo["gerados"], resumo["falhas"]), (6, 6, 0))
+        tipos: dict[str, int] = {}
+        for v in self._verdade().values():
+            tipos[v["tipo"]] = tipos.get(v["tipo"], 0) + 1
+        self.assertEqual(resumo["por_tipo"], tipos)
+        self.assertEqual([p["slug"] for p in resumo["processos"]], self.slugs)
+
+    def test_missing_input(self) -> None:
+        with mock.patch.object(sys, "argv", ["offline_regen.py", "--input", str(self.dir / "nao_existe")]):
+            self.assertEqual(offline_regen.main(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
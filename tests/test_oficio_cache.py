@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import oficios
+from modelos import CacheModelos
+from oficio_cache import CacheOficios, campos_sha256, render_key
+
+DOCX = ROOT / "modelos_utap" / "SSG - Aposentadoria Providências - Geral.docx"
+
+
+def _gravar_varios(args: tuple) -> None:
+    """Worker: cada processo abre o proprio CacheOficios e grava `n` oficios."""
+    root, docx, worker, n = args
+    cache = CacheOficios(Path(root))
+    for i in range(n):
+        cache.put_file(f"{worker:032x}{i:032x}", Path(docx))
+
+
+class TestCacheOficios(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.docx = self.dir / "oficio.docx"
+        self.docx.write_bytes(b"PK docx gerado" * 100)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_key_canonical(self) -> None:
+        a = {"@@processo": "TC/1/2024", "{{DATA}}": "01/01/2024"}
+        b = {"{{DATA}}": "01/01/2024", "@@processo": "TC/1/2024"}
+        self.assertEqual(campos_sha256(a), campos_sha256(b))
+        self.assertEqual(render_key("m", a, "ooxml"), render_key("m", b, "ooxml"))
+        self.assertNotEqual(render_key("m", a, "ooxml"), render_key("m", a, "python-docx"))
+        self.assertNotEqual(render_key("m", a, "ooxml"), render_key("n", a, "ooxml"))
+        self.assertNotEqual(render_key("m", a, "ooxml"), render_key("m", {**a, "@@processo": "x"}, "ooxml"))
+
+    def test_put_and_materialize(self) -> None:
+        cache = CacheOficios(self.dir / "cache")
+        key = render_key("m", {"a": "1"}, "ooxml")
+        self.assertIsNone(cache.materialize(key, self.dir / "out.docx"))
+        cache.put_file(key, self.docx, modelo="x.dotx", renderer="ooxml")
+
+        reaberto = CacheOficios(self.dir / "cache")
+        self.assertEqual(reaberto.entries[key]["modelo"], "x.dotx")
+        out = self.dir / "rerun" / "oficio.docx"
+        self.assertEqual(reaberto.materialize(key, out), out)
+        self.assertEqual(out.read_bytes(), self.docx.read_bytes())
+        self.assertEqual(reaberto.entries[key]["saida"], str(out))
+        if hasattr(os, "link"):
+            self.assertTrue(os.path.samefile(out, reaberto.object_path(key)))
+
+    def test_corrupted_object_dropped(self) -> None:
+        cache = CacheOficios(self.dir / "cache")
+        cache.put_file("ab" * 32, self.docx)
+        cache.object_path("ab" * 32).write_bytes(b"editado")
+        self.assertIsNone(cache.materialize("ab" * 32, self.dir / "out.docx"))
+        self.assertNotIn("ab" * 32, cache.entries)
+
+    def test_lru_limit(self) -> None:
+        cache = CacheOficios(self.dir / "cache", max_bytes=2000)
+        for i in range(3):
+            cache.put_file(f"{i:064x}", self.docx)
+        self.assertLessEqual(cache.total_bytes(), 2000)
+        self.assertIn(f"{2:064x}", cache.entries)
+
+    def test_concurrent_processes_keep_every_entry(self) -> None:
+        root = self.dir / "cache"
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            list(pool.map(_gravar_varios, [(str(root), str(self.docx), w, 15) for w in range(4)]))
+        self.assertEqual(len(CacheOficios(root).entries), 60)
+        self.assertEqual(len(list((root / "objects").rglob("*.docx"))), 60)
+
+    def test_sees_entries_written_by_other_instance(self) -> None:
+        a = CacheOficios(self.dir / "cache")
+        b = CacheOficios(self.dir / "cache")
+        a.put_file("cd" * 32, self.docx)
+        b.put_file("ef" * 32, self.docx)
+        self.assertIsNotNone(a.materialize("ef" * 32, self.dir / "b.docx"))
+        self.assertEqual(set(CacheOficios(self.dir / "cache").entries), {"cd" * 32, "ef" * 32})
+
+
+class TestSalvarOficio(unittest.TestCase):
+    def test_unused_keys_do_not_change_the_key(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            env = {"OFICIO_CACHE": "true", "OFICIO_CACHE_DIR": str(tmp / "cache"), "OFICIO_RENDERER": "ooxml"}
+            with mock.patch.dict(os.environ, env), mock.patch.object(oficios, "_OFICIO_CACHE", None):
+                modelo = CacheModelos().get(DOCX)
+                campos = {"@@processo": "TC/000001/2024", "{{DATA}}": "01/01/2024", "{{EXTRATO}}": "a"}
+                self.assertEqual(modelo.campos_usados(campos), {"@@processo": "TC/000001/2024"})
+                self.assertNotEqual(oficios._salvar_oficio(modelo, campos, tmp / "a.docx"), "cache")
+                outro_dia = {**campos, "{{DATA}}": "02/01/2024", "{{EXTRATO}}": "b"}
+                self.assertEqual(oficios._salvar_oficio(modelo, outro_dia, tmp / "b.docx"), "cache")
+                usado = {**campos, "@@processo": "TC/000002/2024"}
+                self.assertNotEqual(oficios._salvar_oficio(modelo, usado, tmp / "c.docx"), "cache")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from docx import Document
+
+from modelos import CacheModelos, _paragrafos, partes_texto
+from ooxml import conteudo_run
+
+MODELOS = sorted(p for p in ROOT.glob("modelos_*/*") if p.suffix.lower() in (".docx", ".dotx"))
+
+
+def _textos(path: Path) -> list[list[str]]:
+    doc = Document(str(path))
+    return [["".join(r.text for r in p.r_lst) for p in _paragrafos(parte)] for parte in partes_texto(doc)]
+
+
+class TestOoxmlRenderer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.cache = CacheModelos()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _par(self, modelo, mapping):
+        a, b = self.dir / "docx.docx", self.dir / "ooxml.docx"
+        self.assertEqual(modelo.salvar(mapping, a, renderer="python-docx"), "python-docx")
+        self.assertEqual(modelo.salvar(mapping, b, renderer="ooxml"), "ooxml")
+        with zipfile.ZipFile(b) as z:
+            self.assertIsNone(z.testzip())
+        return a, b
+
+    def test_same_output_as_python_docx(self) -> None:
+        self.assertEqual(len(MODELOS), 12)
+        for path in MODELOS:
+            modelo = self.cache.get(path)
+            todos = {ph: f"v{i} & <{i}>" for i, ph in enumerate(modelo.ooxml.placeholders)}
+            todos[modelo.ooxml.placeholders[0]] = " com\tespacos\ne quebra "
+            a, b = self._par(modelo, {"@@processo": "TC/000001/2024", "{{DATA}}": "01/01/2024"})
+            self.assertEqual(_textos(a), _textos(b), path.name)
+            a, b = self._par(modelo, todos)
+            self.assertEqual(_textos(a), _textos(b), path.name)
+            with zipfile.ZipFile(a) as za, zipfile.ZipFile(b) as zb:
+                # todos os placeholders com valor: XML do corpo identico ao do python-docx
+                self.assertEqual(za.read("word/document.xml"), zb.read("word/document.xml"), path.name)
+
+    def test_unchanged_members_copied(self) -> None:
+        path = ROOT / "modelos_utap" / "SSG - Aposentadoria Providências - Geral.docx"
+        out = self.dir / "o.docx"
+        self.cache.get(path).salvar({"@@processo": "X"}, out)
+        with zipfile.ZipFile(path) as zin, zipfile.ZipFile(out) as zout:
+            self.assertEqual(zin.namelist(), zout.namelist())
+            for info in zin.infolist():
+                if info.filename != "word/document.xml":
+                    self.assertEqual(zout.getinfo(info.filename).compress_size, info.compress_size)
+                    self.assertEqual(zout.read(info.filename), zin.read(info.filename))
+
+    def test_falls_back_when_key_is_free_text(self) -> None:
+        modelo = self.cache.get(ROOT / "modelos_utap" / "SSG - Aposentadoria Providências - Geral.docx")
+        self.assertFalse(modelo.ooxml.aceita({"Prezado(a)": "Caro"}))
+        self.assertFalse(modelo.ooxml.aceita({"@@processo": "a\x01b"}))
+        self.assertTrue(modelo.ooxml.aceita({"chave que nao aparece": "x", "@@processo": "y"}))
+        self.assertEqual(modelo.salvar({"Prezado(a)": "Caro"}, self.dir / "f.docx"), "python-docx")
+
+    def test_conteudo_run(self) -> None:
+        self.assertEqual(conteudo_run("a\tb"), "<w:t>a</w:t><w:tab/><w:t>b</w:t>")
+        self.assertEqual(conteudo_run(" x&y\n"), '<w:t xml:space="preserve"> x&amp;y</w:t><w:br/>')
+        self.assertEqual(conteudo_run(""), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
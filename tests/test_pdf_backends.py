@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from pdf_backends import PdftotextBackend, PypdfBackend, get_backend
+
+# Falso pdftotext: imprime "pagina N" para cada pagina pedida, separadas por \f
+FAKE_PDFTOTEXT = """#!/usr/bin/env python3
+import sys
+a = sys.argv
+first = int(a[a.index("-f") + 1])
+last = int(a[a.index("-l") + 1]) if "-l" in a else 5
+with open(a[-2] + ".calls", "a") as f:
+    f.write(f"{first}-{last}\\n")
+sys.stdout.write("".join(f"pagina {n}\\f" for n in range(first, last + 1)))
+"""
+
+
+class TestPdfBackends(unittest.TestCase):
+    def test_unknown_or_missing_backend_falls_back_to_pypdf(self) -> None:
+        with mock.patch.dict(os.environ, {"PDFTOTEXT_CMD": ""}), mock.patch("shutil.which", return_value=None):
+            self.assertIsInstance(get_backend("pdftotext"), PypdfBackend)
+        self.assertIsInstance(get_backend("nao-existe"), PypdfBackend)
+
+    @unittest.skipIf(os.name == "nt", "script falso depende de shebang")
+    def test_pdftotext_groups_contiguous_pages(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = Path(tmp) / "pdftotext"
+            cmd.write_text(FAKE_PDFTOTEXT.replace("/usr/bin/env python3", sys.executable))
+            cmd.chmod(0o755)
+            pdf = Path(tmp) / "doc.pdf"
+            pdf.write_bytes(b"%PDF-1.4")
+            with mock.patch.dict(os.environ, {"PDFTOTEXT_CMD": str(cmd), "PDFINFO_CMD": "/nao/existe"}):
+                backend = PdftotextBackend()
+                self.assertTrue(backend.available())
+                pages = list(backend.extract_pages(pdf, [0, 1, 2, 4]))
+            self.assertEqual(pages, [(0, "pagina 1"), (1, "pagina 2"), (2, "pagina 3"), (4, "pagina 5")])
+            self.assertEqual(Path(str(pdf) + ".calls").read_text().split(), ["1-3", "5-5"])
+
+    @unittest.skipIf(os.name == "nt", "script falso depende de shebang")
+    def test_page_count_without_pdfinfo_reuses_full_extraction(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = Path(tmp) / "pdftotext"
+            cmd.write_text(FAKE_PDFTOTEXT.replace("/usr/bin/env python3", sys.executable))
+            cmd.chmod(0o755)
+            pdf = Path(tmp) / "doc.pdf"
+            pdf.write_bytes(b"%PDF-1.4")  # pypdf nao consegue abrir: cai na extracao completa
+            with mock.patch.dict(os.environ, {"PDFTOTEXT_CMD": str(cmd), "PDFINFO_CMD": "/nao/existe"}):
+                backend = PdftotextBackend()
+                self.assertEqual(backend.page_count(pdf), 5)
+                pages = list(backend.extract_pages(pdf, [0, 4]))
+            self.assertEqual(pages, [(0, "pagina 1"), (4, "pagina 5")])
+            self.assertEqual(Path(str(pdf) + ".calls").read_text().split(), ["1-5"])
+
+    def test_extraction_failure_is_none_not_empty(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf = Path(tmp) / "doc.pdf"
+            pdf.write_bytes(b"%PDF-1.4")
+            with mock.patch.dict(os.environ, {"PDFTOTEXT_CMD": str(Path(tmp) / "nao-existe")}):
+                self.assertEqual(list(PdftotextBackend().extract_pages(pdf, [0, 1])), [(0, None), (1, None)])
+
+    def test_pdftotext_version_probed_once(self) -> None:
+        out = mock.Mock(stdout="", stderr="pdftotext version 24.02.0")
+        with mock.patch.dict(os.environ, {"PDFTOTEXT_CMD": "/opt/poppler-teste/pdftotext"}), \
+                mock.patch("subprocess.run", return_value=out) as run:
+            versions = {PdftotextBackend().version() for _ in range(3)}
+        self.assertEqual(versions, {"pdftotext-1/24.02.0"})
+        self.assertEqual(run.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
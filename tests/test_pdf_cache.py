@@ -0,0 +1,46 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from pdf_cache import PdfCache, cod_key, url_key
+
+
+class TestPdfCache(unittest.TestCase):
+    def test_put_get_and_reload(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PdfCache(Path(tmp) / "c")
+            digest = cache.put(b"%PDF-1.4 a", cod_key("X1"), url_key("http://h/a", etag='"e1"'))
+            self.assertEqual(url_key("http://h/a"), "")
+            reloaded = PdfCache(Path(tmp) / "c")
+            self.assertEqual(reloaded.get(cod_key("X1")).name, f"{digest}.pdf")
+            dest = reloaded.materialize(Path(tmp) / "out" / "p.pdf", "", url_key("http://h/a", etag='"e1"'))
+            self.assertEqual(dest.read_bytes(), b"%PDF-1.4 a")
+            self.assertIsNone(reloaded.get(cod_key("outro")))
+
+    def test_corrupted_entry_is_dropped(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PdfCache(Path(tmp))
+            digest = cache.put(b"%PDF-1.4 b", cod_key("X2"))
+            cache.object_path(digest).write_bytes(b"%PDF-1.4 truncado")
+            self.assertIsNone(cache.get(cod_key("X2")))
+            self.assertNotIn(cod_key("X2"), cache.keys)
+
+    def test_lru_eviction(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PdfCache(Path(tmp), max_bytes=25)
+            cache.put(b"%PDF-1 aaaaa", "k1")
+            cache.put(b"%PDF-1 bbbbb", "k2")
+            cache.get("k1")
+            cache.put(b"%PDF-1 ccccc", "k3")
+            self.assertIsNotNone(cache.get("k1"))
+            self.assertIsNone(cache.get("k2"))
+            self.assertIsNotNone(cache.get("k3"))
+            self.assertLessEqual(cache.total_bytes(), 25)
+
+
+if __name__ == "__main__":
+    unittest.main()
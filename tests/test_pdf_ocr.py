@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import pdf_ocr
+
+# Falsos pdftoppm/tesseract: a "imagem" e o numero da pagina; o OCR registra cada chamada
+FAKE_PDFTOPPM = """#!PYTHON
+import sys
+a = sys.argv
+open(a[-1] + ".png", "wb").write(b"PNG pagina " + a[a.index("-f") + 1].encode())
+"""
+FAKE_TESSERACT = """#!PYTHON
+import sys
+if "--version" in sys.argv:
+    open(sys.argv[0] + ".versions", "a").write("v\\n")
+    print("tesseract 5.0.0"); sys.exit(0)
+data = open(sys.argv[1], "rb").read().decode()
+open(sys.argv[0] + ".calls", "a").write(data + "\\n")
+print("texto de " + data)
+"""
+
+
+def _fake_tools(tmp: Path) -> dict[str, Path]:
+    tools = {}
+    for name, src in (("pdftoppm", FAKE_PDFTOPPM), ("tesseract", FAKE_TESSERACT)):
+        exe = tmp / name
+        exe.write_text(src.replace("PYTHON", sys.executable))
+        exe.chmod(0o755)
+        tools[name] = exe
+    return tools
+
+
+@unittest.skipIf(os.name == "nt", "executaveis falsos dependem de shebang")
+class TestPdfOcr(unittest.TestCase):
+    def test_ocr_pages_with_cap_and_image_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            tools = _fake_tools(tmp)
+            pdf = tmp / "scan.pdf"
+            pdf.write_bytes(b"%PDF-1.4")
+            env = {"PDFTOPPM_CMD": str(tools["pdftoppm"]), "TESSERACT_CMD": str(tools["tesseract"])}
+            with mock.patch.dict(os.environ, env), mock.patch.object(pdf_ocr, "_has_pdfium", return_value=False):
+                self.assertTrue(pdf_ocr.ocr_available())
+                cache = tmp / "text.sqlite"
+                got = pdf_ocr.ocr_pages(pdf, [0, 2, 3], workers=1, max_pages=2, cache_path=cache)
+                self.assertEqual({k: v.strip() for k, v in got.items()}, {0: "texto de PNG pagina 1", 2: "texto de PNG pagina 3"})
+                again = pdf_ocr.ocr_pages(pdf, [0, 2], workers=1, cache_path=cache)
+                self.assertEqual(again, got)
+            calls = Path(str(tools["tesseract"]) + ".calls").read_text().split("\n")
+            self.assertEqual([c for c in calls if c], ["PNG pagina 1", "PNG pagina 3"])
+            self.assertEqual(Path(str(tools["tesseract"]) + ".versions").read_text().split(), ["v"])
+
+    def test_cache_hits_close_connection_and_no_nested_pool(self) -> None:
+        from text_cache import TextCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            tools = _fake_tools(tmp)
+            pdf = tmp / "scan.pdf"
+            pdf.write_bytes(b"%PDF-1.4")
+            env = {"PDFTOPPM_CMD": str(tools["pdftoppm"]), "TESSERACT_CMD": str(tools["tesseract"])}
+            cache = tmp / "text.sqlite"
+            with mock.patch.dict(os.environ, env), mock.patch.object(pdf_ocr, "_has_pdfium", return_value=False):
+                pdf_ocr.ocr_pages(pdf, [0, 1], workers=1, cache_path=cache)
+                # simula um worker do offline_regen: o OCR nao pode abrir outro pool
+                with mock.patch("multiprocessing.parent_process", return_value=object()), \
+                        mock.patch.object(pdf_ocr, "ProcessPoolExecutor", side_effect=AssertionError("pool aninhado")), \
+                        mock.patch.object(TextCache, "close", autospec=True, side_effect=TextCache.close) as close:
+                    got = pdf_ocr.ocr_pages(pdf, [0, 1], workers=4, cache_path=cache)
+            self.assertEqual(sorted(got), [0, 1])
+            self.assertEqual(close.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from pecas import piece_records, select_pieces
+
+RAW = [
+    {"index_ato": "2", "cod_arquivo_digital_criptografado": "B", "title": " Parecer  SMADS - 03/04/2023 "},
+    {"index_ato": "1", "cod_arquivo_digital_criptografado": "A", "title": "Capa", "tooltip": "Juntada em 1/2/2023"},
+    {"index_ato": "3", "cod_arquivo_digital_criptografado": "C", "title": "Informação técnica"},
+    {"index_ato": "3", "cod_arquivo_digital_criptografado": "D", "title": "Despacho"},
+]
+
+
+class TestPecas(unittest.TestCase):
+    def test_records(self) -> None:
+        recs = piece_records(RAW)
+        self.assertEqual([r["order"] for r in recs], [2, 1, 3, 3])
+        self.assertEqual(recs[0]["title"], "Parecer SMADS - 03/04/2023")
+        self.assertEqual(recs[0]["date"], "03/04/2023")
+        self.assertEqual(recs[1]["date"], "01/02/2023")
+        self.assertEqual(piece_records([{"title": "x"}, {"title": "y"}])[1]["order"], 1)
+
+    def test_select(self) -> None:
+        recs = piece_records(RAW)
+        cod = lambda spec: [r["cod_arquivo_digital_criptografado"] for r in select_pieces(recs, spec)]
+        self.assertEqual(cod("first"), ["A"])
+        self.assertEqual(cod("last"), ["D"])
+        self.assertEqual(cod("last-2"), ["C", "D"])
+        self.assertEqual(cod("re:informacao"), ["C"])
+        self.assertEqual(select_pieces([], "last"), [])
+        with self.assertRaises(ValueError):
+            select_pieces(recs, "middle")
+
+
+if __name__ == "__main__":
+    unittest.main()
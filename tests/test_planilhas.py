@@ -0,0 +1,162 @@
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from corpus_sintetico import escrever_xls, escrever_xlsx, gerar_corpus, linha_planilha
+from planilhas import (
+    PlanilhaExportada,
+    _coluna,
+    _linhas_openpyxl,
+    detectar_formato,
+    iter_linhas,
+    iter_processos,
+    primeiro_processo,
+)
+
+try:
+    import xlwt  # type: ignore  # noqa: F401
+    HAS_XLWT = True
+except Exception:
+    HAS_XLWT = False
+
+
+class TestPlanilhas(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.linhas = [linha_planilha(d) for d in gerar_corpus(30, seed=5)]
+        self.esperado = [linha[0] for linha in self.linhas]
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_xlsx_inline_strings(self) -> None:
+        path = self.dir / "export.xlsx"
+        escrever_xlsx(path, self.linhas)
+        self.assertEqual(detectar_formato(path), "xlsx")
+        self.assertEqual(list(iter_processos(path)), self.esperado)
+        self.assertEqual(list(iter_processos(path.read_bytes())), self.esperado)
+        self.assertEqual(primeiro_processo(io.BytesIO(path.read_bytes())), self.esperado[0])
+
+    def test_xlsx_shared_strings_matches_openpyxl(self) -> None:
+        from openpyxl import Workbook  # type: ignore
+
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["Relatorio APO-PEN"])
+        ws.append(["Interessado", "Processo", "Valor"])
+        ws.append(["Ana", " tc 11724/2020 ", 1.5])
+        ws.append(["Bia", 2024, True])
+        ws.append(["Caio", None, 3])
+        ws.append(["Davi", "TC-011724-2020", 4])
+        path = self.dir / "shared.xlsx"
+        wb.save(str(path))
+        self.assertEqual(list(iter_processos(path, canonical=False)), list(_coluna(_linhas_openpyxl(path))))
+        self.assertEqual(list(iter_processos(path)), ["TC/011724/2020", "2024", "TC/011724/2020"])
+        self.assertEqual(list(iter_processos(path, unique=True)), ["TC/011724/2020", "2024"])
+        linhas = list(iter_linhas(path))
+        self.assertEqual(linhas[0], ("tc 11724/2020", {"Interessado": "Ana", "Processo": " tc 11724/2020 ", "Valor": "1.5"}))
+        self.assertEqual(linhas[1][1]["Valor"], "True")
+
+    @unittest.skipUnless(HAS_XLWT, "xlwt nao instalado")
+    def test_xls(self) -> None:
+        path = self.dir / "export.xls"
+        escrever_xls(path, self.linhas)
+        self.assertEqual(detectar_formato(path), "xls")
+        self.assertEqual(list(iter_processos(path)), self.esperado)
+        self.assertEqual(primeiro_processo(path.read_bytes()), self.esperado[0])
+        self.assertEqual([p for p, _ in iter_linhas(path)], self.esperado)
+
+    def test_csv(self) -> None:
+        texto = "Nº Processo;Interessado\nTC/1/2020;José\n\n;sem processo\nTC 2/2021;Ana\n"
+        path = self.dir / "export.csv"
+        path.write_bytes(texto.encode("cp1252"))
+        self.assertEqual(detectar_formato(path), "csv")
+        self.assertEqual(list(iter_processos(path)), ["TC/000001/2020", "TC/000002/2021"])
+        linhas = list(iter_linhas(io.BytesIO(texto.encode("utf-8-sig"))))
+        self.assertEqual(linhas[0], ("TC/1/2020", {"Nº Processo": "TC/1/2020", "Interessado": "José"}))
+
+    def test_lazy_and_missing_column(self) -> None:
+        path = self.dir / "export.xlsx"
+        escrever_xlsx(path, self.linhas)
+        it = iter_processos(path)
+        self.assertEqual(next(it), self.esperado[0])
+        it.close()
+        sem = self.dir / "sem.csv"
+        sem.write_text("a,b\n1,2\n", encoding="utf-8")
+        self.assertEqual(list(iter_processos(sem)), [])
+        self.assertIsNone(primeiro_processo(sem))
+
+    def test_default_column_is_opt_in(self) -> None:
+        from openpyxl import Workbook  # type: ignore
+
+        import bot
+        import grid
+
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["A", "B", "C", "D", "E"])
+        ws.append(["1", "2", "3", "4", "TC 7/2021"])
+        path = self.dir / "sem_cabecalho.xlsx"
+        wb.save(str(path))
+        self.assertEqual(list(iter_processos(path)), [])
+        self.assertEqual(list(iter_processos(path, coluna_padrao=4)), ["TC/000007/2021"])
+        self.assertEqual([p for p, _ in iter_linhas(path, coluna_padrao=4)], ["TC 7/2021"])
+        # bot nunca teve a coluna E como reserva; a mesa de trabalho (grid) sempre teve
+        self.assertEqual(bot.extract_processes_from_excel(path), [])
+        self.assertEqual(grid.read_processos_from_excel(path), ["TC/000007/2021"])
+
+
+class _Download:
+    def __init__(self, origem: Path, local: bool = True):
+        self.origem = origem
+        self.local = local
+        self.suggested_filename = "export.xlsx"
+        self.salvos: list[str] = []
+
+    def path(self):
+        if not self.local:
+            raise RuntimeError("navegador remoto")
+        return str(self.origem)
+
+    def save_as(self, destino: str) -> None:
+        self.salvos.append(destino)
+        Path(destino).write_bytes(self.origem.read_bytes())
+
+
+class TestPlanilhaExportada(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.origem = self.dir / "download"
+        escrever_xlsx(self.origem, [linha_planilha(d) for d in gerar_corpus(5, seed=2)])
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_read_from_memory_and_persist_in_background(self) -> None:
+        download = _Download(self.origem)
+        planilha = PlanilhaExportada.de_download(download)
+        self.assertEqual(download.salvos, [])
+        self.assertEqual(planilha.name, "export.xlsx")
+        self.assertEqual(len(list(iter_processos(planilha))), 5)
+        self.assertIsNone(planilha.aguardar())
+        destino = planilha.persistir(self.dir / "out" / planilha.name)
+        self.assertEqual(planilha.aguardar(timeout=10), destino)
+        self.assertEqual(destino.read_bytes(), self.origem.read_bytes())
+        self.assertFalse(destino.with_name(destino.name + ".part").exists())
+
+    def test_remote_browser_falls_back_to_save_as(self) -> None:
+        download = _Download(self.origem, local=False)
+        planilha = PlanilhaExportada.de_download(download)
+        self.assertEqual(len(download.salvos), 1)
+        self.assertEqual(planilha.dados, self.origem.read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
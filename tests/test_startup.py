@@ -0,0 +1,89 @@
+"""Orcamento de inicializacao: tempo de import de cada modulo e bibliotecas carregadas.
+
+Cada modulo e importado num interpretador novo com `-X importtime` (melhor de 3). O teste
+falha se o import cumulativo passar do orcamento em tests/startup_budget.json ou se
+carregar alguma biblioteca pesada (navegador, docx, pdf, planilhas, Word) que so deve
+ser importada quando usada.
+
+    python tests/test_startup.py --update-baseline   # regrava o orcamento (3x o medido)
+"""
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET = ROOT / "tests" / "startup_budget.json"
+MODULOS = (
+    "main", "offline_regen", "sessao", "grid", "visualizador", "extracao", "oficios", "acoes_portal",
+    "planilhas", "modelos", "ooxml", "etcm_oficios_apo_pen",
+)
+PESADOS = ("playwright", "docx", "pypdf", "openpyxl", "xlrd", "win32com", "pythoncom", "pandas", "yaml", "dotenv", "lxml")
+FATOR = 3.0
+MINIMO_MS = 100.0
+
+
+def medir_import(modulo: str) -> tuple[float, set[str]]:
+    """(ms cumulativos do import de `modulo`, modulos carregados) num interpretador novo."""
+    codigo = f"import sys; sys.path.insert(0, {str(ROOT / 'src')!r}); import {modulo}"
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPROFILEIMPORTTIME"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True, env=env, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {modulo} falhou:\n{proc.stderr[-2000:]}")
+    ms = 0.0
+    carregados: set[str] = set()
+    for linha in proc.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha.split("|", 2)
+        nome = nome.strip()
+        carregados.add(nome)
+        if nome == modulo and cumulativo.strip().isdigit():
+            ms = int(cumulativo) / 1000.0
+    return ms, carregados
+
+
+def medir(repeticoes: int = 3) -> dict[str, dict]:
+    out = {}
+    for modulo in MODULOS:
+        tempos, carregados = [], set()
+        for _ in range(repeticoes):
+            ms, carregados = medir_import(modulo)
+            tempos.append(ms)
+        out[modulo] = {"ms": round(min(tempos), 1), "carregados": carregados}
+    return out
+
+
+class TestStartup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.medidas = medir()
+        cls.budget = json.loads(BUDGET.read_text(encoding="utf-8")) if BUDGET.exists() else {}
+        print("\nimport (ms, melhor de 3):")
+        for modulo, m in cls.medidas.items():
+            print(f"  {modulo:>14}: {m['ms']:7.1f} (orcamento {cls.budget.get(modulo, '-')})")
+
+    def test_no_heavy_imports(self) -> None:
+        for modulo, m in self.medidas.items():
+            pesados = sorted(n for n in m["carregados"] if n.split(".")[0] in PESADOS)
+            self.assertEqual(pesados, [], f"import {modulo} carrega {pesados}")
+
+    def test_within_budget(self) -> None:
+        if not self.budget:
+            self.skipTest("sem orcamento; rode com --update-baseline")
+        for modulo, m in self.medidas.items():
+            if modulo in self.budget:
+                self.assertLessEqual(m["ms"], self.budget[modulo], f"import {modulo} passou do orcamento")
+
+
+if __name__ == "__main__":
+    if "--update-baseline" in sys.argv:
+        res = {modulo: round(max(m["ms"] * FATOR, MINIMO_MS)) for modulo, m in medir().items()}
+        BUDGET.write_text(json.dumps(res, indent=2) + "\n", encoding="utf-8")
+        print(json.dumps(res, indent=2))
+    else:
+        unittest.main()
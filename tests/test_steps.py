@@ -1,4 +1,3 @@
-import importlib.util
 import sys
 import unittest
 from pathlib import Path
@@ -6,13 +5,6 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
 
-selectors_path = ROOT / "src" / "selectors.py"
-spec = importlib.util.spec_from_file_location("selectors", selectors_path)
-module = importlib.util.module_from_spec(spec) if spec else None
-if spec and spec.loader and module:
-    spec.loader.exec_module(module)
-    sys.modules["selectors"] = module
-
 from bot import read_yaml_steps
 
 
@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import extracao
+from pdf_backends import PdfTextBackend
+from text_cache import TextCache
+
+
+class _Instavel(PdfTextBackend):
+    """Backend falso: a pagina 1 falha na primeira leitura; a pagina 2 nao tem texto."""
+
+    name = "instavel"
+
+    def __init__(self) -> None:
+        self.lidas: list[int] = []
+
+    def version(self) -> str:
+        return "instavel-1"
+
+    def page_count(self, pdf_path: Path) -> int:
+        return 3
+
+    def extract_pages(self, pdf_path, indices):
+        for i in indices:
+            self.lidas.append(i)
+            if i == 1 and self.lidas.count(1) == 1:
+                yield i, None
+            else:
+                yield i, "" if i == 2 else f"pagina {i}"
+
+
+class TestTextCache(unittest.TestCase):
+    def test_pages_roundtrip_and_versioning(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Path(tmp) / "t.sqlite"
+            cache = TextCache(db)
+            self.assertIsNone(cache.page_count("abc", "v1"))
+            cache.put("abc", "v1", 3, {0: "Relator: Fulano", 2: "decadência 01/02/2030"})
+            cache.put("abc", "v1", 3, {1: ""})
+            cache.close()
+
+            cache = TextCache(db)
+            self.assertEqual(cache.page_count("abc", "v1"), 3)
+            self.assertEqual(cache.get_pages("abc", "v1"), {0: "Relator: Fulano", 1: "", 2: "decadência 01/02/2030"})
+            self.assertEqual(cache.get_pages("abc", "v1", [2, 9]), {2: "decadência 01/02/2030"})
+            self.assertIsNone(cache.page_count("abc", "v2"))
+            cache.put("abc", "v2", 1, {0: "x"})
+            self.assertEqual(cache.prune("v2"), 1)
+            self.assertEqual(cache.get_pages("abc", "v1"), {})
+            self.assertEqual(cache.get_pages("abc", "v2"), {0: "x"})
+            cache.close()
+
+
+    def test_failed_pages_are_retried_not_cached_blank(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf = Path(tmp) / "doc.pdf"
+            pdf.write_bytes(b"%PDF-1.4 falso")
+            env = {"TEXT_CACHE": "true", "TEXT_CACHE_PATH": str(Path(tmp) / "t.sqlite")}
+            with mock.patch.dict(os.environ, env), mock.patch.object(extracao, "_TEXT_CACHE", None):
+                backend = _Instavel()
+                primeira = list(extracao.iter_pdf_pages(pdf, backend=backend))
+                segunda = list(extracao.iter_pdf_pages(pdf, backend=backend))
+                terceira = list(extracao.iter_pdf_pages(pdf, backend=backend))
+                extracao._TEXT_CACHE.close()
+            self.assertEqual(primeira, [(0, "pagina 0"), (1, ""), (2, "")])
+            self.assertEqual(segunda, [(0, "pagina 0"), (1, "pagina 1"), (2, "")])
+            self.assertEqual(terceira, segunda)
+            # a pagina vazia fica em cache; so a que falhou e lida de novo
+            self.assertEqual(backend.lidas, [0, 1, 2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+import visualizador
+from visualizador import PdfResponseCapture, ProcessoPrefetcher, ViewerSession
+
+PDF = b"%PDF-1.4 corpo"
+
+
+def _esperar(cond, timeout_s: float = 5.0) -> bool:
+    limite = time.monotonic() + timeout_s
+    while time.monotonic() < limite:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestProcessoPrefetcher(unittest.TestCase):
+    def test_hands_off_prefetched_results_in_order(self) -> None:
+        chamadas: list[str] = []
+
+        def fetcher(pr: str) -> tuple:
+            chamadas.append(pr)
+            return Path(f"{pr}.pdf"), f"titulo {pr}", f"capa {pr}"
+
+        pf = ProcessoPrefetcher({}, {}, "", Path("."), ["A", "B", "C", "D"], depth=2, fetcher=fetcher)
+        pf.cancel("C")
+        pf.start()
+        try:
+            pf.advance("A")
+            self.assertIsNone(pf.take("A"))  # o atual nunca e antecipado
+            self.assertTrue(_esperar(lambda: "B" in pf.results))
+            self.assertEqual(pf.take("B"), (Path("B.pdf"), "titulo B", "capa B"))
+            self.assertIsNone(pf.take("B"))
+            pf.advance("B")
+            self.assertTrue(_esperar(lambda: "D" in pf.results))
+        finally:
+            pf.stop()
+        self.assertEqual(chamadas, ["B", "D"])
+        self.assertFalse(pf._thread.is_alive())
+
+    def test_stop_ends_thread_waiting_for_work(self) -> None:
+        pf = ProcessoPrefetcher({}, {}, "", Path("."), ["A"], fetcher=lambda pr: (None, None, "")).start()
+        pf.stop()
+        self.assertFalse(pf._thread.is_alive())
+
+
+class _Request:
+    def __init__(self, url: str, resource_type: str = "object", frame=None):
+        self.url = url
+        self.resource_type = resource_type
+        self.frame = frame
+
+
+class _Response:
+    def __init__(self, body: bytes, content_type: str = ""):
+        self._body = body
+        self.headers = {"content-type": content_type} if content_type else {}
+
+    def body(self) -> bytes:
+        return self._body
+
+
+class _Route:
+    def __init__(self, request: _Request, response=None, fulfill_error: bool = False):
+        self.request = request
+        self.response = response
+        self.fulfill_error = fulfill_error
+        self.acoes: list[tuple] = []
+
+    def fetch(self):
+        if self.response is None:
+            raise RuntimeError("rede indisponivel")
+        return self.response
+
+    def fulfill(self, **kwargs) -> None:
+        if self.fulfill_error:
+            raise RuntimeError("rota ja tratada")
+        self.acoes.append(("fulfill", kwargs))
+
+    def continue_(self) -> None:
+        self.acoes.append(("continue", {}))
+
+
+class _Page:
+    main_frame = object()
+
+    def wait_for_timeout(self, ms: float) -> None:
+        time.sleep(ms / 1000)
+
+
+class TestPdfResponseCapture(unittest.TestCase):
+    def setUp(self) -> None:
+        self.capture = PdfResponseCapture(_Page(), object())
+
+    def test_captures_pdf_and_short_circuits_embed(self) -> None:
+        route = _Route(_Request("http://h/doc"), _Response(PDF, "application/octet-stream"))
+        self.capture._handle(route)
+        self.assertEqual(self.capture.take(0), ("http://h/doc", PDF))
+        self.assertEqual(self.capture.captured, [])
+        self.assertEqual(route.acoes, [("fulfill", {"status": 200, "content_type": "text/html", "body": PdfResponseCapture.BLANK_HTML})])
+
+    def test_non_pdf_and_other_resources_pass_through(self) -> None:
+        html = _Response(b"<html></html>", "text/html")
+        route = _Route(_Request("http://h/pagina"), html)
+        self.capture._handle(route)
+        self.assertEqual(route.acoes, [("fulfill", {"response": html})])
+        script = _Route(_Request("http://h/app.js", resource_type="script"), html)
+        self.capture._handle(script)
+        self.assertEqual(script.acoes, [("continue", {})])
+        self.assertIsNone(self.capture.take(0))
+
+    def test_failures_continue_the_request(self) -> None:
+        sem_rede = _Route(_Request("http://h/doc"))
+        self.capture._handle(sem_rede)
+        self.assertEqual(sem_rede.acoes, [("continue", {})])
+        quebrada = _Route(_Request("http://h/doc"), _Response(PDF), fulfill_error=True)
+        self.capture._handle(quebrada)
+        self.assertEqual(quebrada.acoes, [("continue", {})])
+
+
+class TestOpenPieceCapture(unittest.TestCase):
+    def _session(self) -> ViewerSession:
+        session = ViewerSession.__new__(ViewerSession)
+        session.page = _Page()
+        session.frame = None
+        session.capture = PdfResponseCapture(session.page, object())
+        session._cod_url = None
+        session._last_capture = None
+        session.pieces = [{"n": i, "cod_arquivo_digital_criptografado": f"C{i}"} for i in range(2)]
+        return session
+
+    def _abrir(self, session: ViewerSession, chegam: list[str]) -> None:
+        def clicar(piece) -> None:
+            for url in chegam:
+                session.capture._handle(_Route(_Request(url), _Response(PDF + url.encode())))
+
+        with mock.patch.object(session, "_current_pdf_url", return_value="http://h/C0"), \
+                mock.patch.object(session, "_click_piece", side_effect=clicar):
+            session.open_piece(session.pieces[1], wait_s=0.05)
+
+    def test_late_pdf_of_previous_piece_is_not_taken(self) -> None:
+        session = self._session()
+        self._abrir(session, ["http://h/C0"])
+        self.assertIsNone(session._last_capture)
+
+    def test_capture_of_clicked_piece_is_taken_and_released(self) -> None:
+        session = self._session()
+        self._abrir(session, ["http://h/C0", "http://h/C1", "http://h/outro"])
+        self.assertEqual(session._last_capture, ("http://h/C1", PDF + b"http://h/C1"))
+        self.assertNotIn("http://h/C1", [url for _, url, _ in session.capture.captured])
+        # capturas anteriores a uma nova marca nao ficam guardadas
+        session.capture.take(session.capture.mark())
+        self.assertEqual(session.capture.captured, [])
+
+
+class TestViewerSessionFetch(unittest.TestCase):
+    def _session(self, output_dir: Path) -> ViewerSession:
+        session = ViewerSession.__new__(ViewerSession)
+        session.context = None
+        session.page = None
+        session.frame = None
+        session.output_dir = output_dir
+        session.processo = "TC/000001/2020"
+        session.max_workers = 2
+        session.capture = None
+        session._cod_url = None
+        session._last_capture = None
+        session.pieces = [
+            {"n": i, "order": i + 1, "title": f"peca {i + 1}", "cod_arquivo_digital_criptografado": f"C{i}"}
+            for i in range(3)
+        ]
+        return session
+
+    def test_capture_saves_without_download_and_rest_in_parallel(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {"PDF_CACHE": "false"}):
+            session = self._session(Path(tmp))
+            baixados: list[str] = []
+
+            def open_piece(piece, wait_s=3.0):
+                # so a primeira peca chega pelo visualizador; as outras ficam so com a URL
+                session._last_capture = ("http://h/C0", PDF) if piece["n"] == 0 else None
+                return f"http://h/{piece['cod_arquivo_digital_criptografado']}"
+
+            def stream(url, dest, headers, cod=""):
+                baixados.append(url)
+                dest.write_bytes(PDF)
+                return dest
+
+            with mock.patch.object(session, "open_piece", side_effect=open_piece), \
+                    mock.patch.object(session, "_request_headers", return_value={}), \
+                    mock.patch.object(visualizador, "_stream_download_pdf", side_effect=stream):
+                got = session.fetch(["first", "last-3"])
+            self.assertEqual(sorted(baixados), ["http://h/C1", "http://h/C2"])
+            self.assertEqual(got["first"], [(Path(tmp) / "TC_000001_2020-primeiro-ato.pdf", "peca 1")])
+            self.assertEqual([t for _, t in got["last-3"]], ["peca 1", "peca 2", "peca 3"])
+            self.assertTrue(all(p.read_bytes() == PDF for p, _ in got["last-3"]))
+
+
+class TestSingletons(unittest.TestCase):
+    def test_pdf_cache_created_once_across_threads(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.dict(os.environ, {"PDF_CACHE": "true", "PDF_CACHE_DIR": tmp}), \
+                mock.patch.object(visualizador, "_PDF_CACHE", None):
+            barreira = threading.Barrier(8)
+            vistos = []
+
+            def pegar() -> None:
+                barreira.wait()
+                vistos.append(visualizador._get_pdf_cache())
+
+            threads = [threading.Thread(target=pegar) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(len({id(c) for c in vistos}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
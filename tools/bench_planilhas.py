@@ -0,0 +1,99 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+def leitura_antiga(path: Path) -> list[str]:
+    """Leitura de antes de `planilhas`: todas as celulas de todas as linhas viram texto."""
+    from planilhas import find_processo_column_index
+
+    processos: list[str] = []
+    if path.suffix.lower() == ".xlsx":
+        from openpyxl import load_workbook  # type: ignore
+
+        wb = load_workbook(filename=str(path), read_only=True, data_only=True)
+        header = idx = None
+        for row in wb.active.iter_rows(values_only=True):
+            values = ["" if v is None else str(v) for v in row]
+            if header is None:
+                header = values
+                idx = find_processo_column_index(header)
+                continue
+            if idx is not None and idx < len(values) and values[idx].strip():
+                processos.append(values[idx].strip())
+        wb.close()
+    else:
+        import xlrd  # type: ignore
+
+        sheet = xlrd.open_workbook(str(path)).sheet_by_index(0)
+        idx = find_processo_column_index([str(sheet.cell_value(0, c)) for c in range(sheet.ncols)])
+        for r in range(1, sheet.nrows):
+            row = [str(sheet.cell_value(r, c)) for c in range(sheet.ncols)]
+            if idx is not None and row[idx].strip():
+                processos.append(row[idx].strip())
+    return processos
+
+
+def medir(fn, *args) -> tuple[float, object]:
+    started = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - started, out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mede a leitura de processos das planilhas de exportacao APO-PEN.")
+    parser.add_argument("arquivos", nargs="*", help="Planilhas .xlsx/.xls (padrao: geradas com --linhas).")
+    parser.add_argument("--linhas", type=int, default=100000, help="Linhas das planilhas geradas.")
+    parser.add_argument("--pasta", default="cache/bench_planilhas", help="Onde gravar as planilhas geradas.")
+    parser.add_argument("--sem-antiga", action="store_true", help="Nao mede a leitura antiga (lenta).")
+    parser.add_argument("--json", default="", help="Grava os resultados neste arquivo.")
+    args = parser.parse_args()
+
+    from planilhas import iter_linhas, iter_processos, primeiro_processo
+
+    arquivos = [Path(a) for a in args.arquivos]
+    if not arquivos:
+        from corpus_sintetico import escrever_xls, escrever_xlsx, gerar_corpus, linha_planilha
+
+        pasta = Path(args.pasta)
+        pasta.mkdir(parents=True, exist_ok=True)
+        linhas = [linha_planilha(d) for d in gerar_corpus(args.linhas)]
+        for fmt, escrever in (("xlsx", escrever_xlsx), ("xls", escrever_xls)):
+            path = pasta / f"apo_pen_{args.linhas}.{fmt}"
+            if not path.exists():
+                try:
+                    escrever(path, linhas)
+                except ImportError as e:
+                    print(f"Aviso: {fmt} nao gerado ({e}).")
+                    continue
+            arquivos.append(path)
+
+    resultados = []
+    for path in arquivos:
+        r = {"arquivo": str(path)}
+        r["processos_s"], processos = medir(lambda p: list(iter_processos(p)), path)
+        r["linhas"] = len(processos)
+        r["primeiro_s"], _ = medir(primeiro_processo, path)
+        r["linhas_completas_s"], _ = medir(lambda p: sum(1 for _ in iter_linhas(p)), path)
+        if not args.sem_antiga:
+            r["antiga_s"], antigos = medir(leitura_antiga, path)
+            r["mesmos_processos"] = len(antigos) == len(processos)
+        resultados.append(r)
+        extra = f" antiga={r['antiga_s']:.2f}s ({r['antiga_s'] / max(r['processos_s'], 1e-9):.1f}x)" if "antiga_s" in r else ""
+        print(
+            f"{path.name}: {r['linhas']} processos em {r['processos_s']:.2f}s "
+            f"primeiro={r['primeiro_s'] * 1000:.0f}ms linhas_completas={r['linhas_completas_s']:.2f}s{extra}"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultados, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
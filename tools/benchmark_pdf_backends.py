@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+DEFAULT_FIELDS = [
+    "{{INTERESSADO}}",
+    "{{ASSUNTO}}",
+    "{{CPF}}",
+    "{{MATRICULA}}",
+    "{{DATA_DOCUMENTO}}",
+    "@@nome_relator",
+    "data_decadencia",
+]
+
+
+def _norm_value(v) -> str:
+    return re.sub(r"\s+", " ", str(v or "")).strip().lower()
+
+
+def extract_fields(text: str, fields: list[str]) -> dict[str, str]:
+    from extracao import extract_data_decadencia, parse_fields_from_pdf_text
+
+    parsed = parse_fields_from_pdf_text(text)
+    out = {}
+    for f in fields:
+        if f == "data_decadencia":
+            d = extract_data_decadencia(text)
+            out[f] = d.strftime("%d/%m/%Y") if d else ""
+        else:
+            out[f] = parsed.get(f, "")
+    return out
+
+
+def run_backend(backend, pdfs: list[Path], fields: list[str]) -> dict:
+    per_doc: dict[str, dict[str, str]] = {}
+    pages = 0
+    errors = 0
+    started = time.perf_counter()
+    for pdf in pdfs:
+        try:
+            n = backend.page_count(pdf)
+            text = "\n".join(t for _, t in backend.extract_pages(pdf, range(n)) if t)
+            pages += n
+        except Exception:
+            text = ""
+            errors += 1
+        per_doc[pdf.name] = extract_fields(text, fields)
+    elapsed = time.perf_counter() - started
+    return {"fields": per_doc, "segundos": elapsed, "paginas": pages, "erros": errors}
+
+
+def accuracy(found: dict[str, dict[str, str]], truth: dict[str, dict[str, str]], fields: list[str]) -> float:
+    """Fracao dos pares (documento, campo) da verdade reproduzidos pelo backend."""
+    total = hits = 0
+    for doc, expected in truth.items():
+        got = found.get(doc, {})
+        for f in fields:
+            if f not in expected:
+                continue
+            total += 1
+            hits += _norm_value(got.get(f)) == _norm_value(expected.get(f))
+    return hits / total if total else 1.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compara backends de texto de PDF e grava o mais rapido que atinge a acuracia minima.")
+    parser.add_argument("--corpus", default="output", help="Pasta com PDFs (busca recursiva).")
+    parser.add_argument("--truth", default="", help="JSON {arquivo.pdf: {campo: valor}}; sem ele, o pypdf e a referencia.")
+    parser.add_argument("--fields", default=",".join(DEFAULT_FIELDS), help="Campos avaliados (separados por virgula).")
+    parser.add_argument("--backends", default="", help="Backends a testar (padrao: todos os disponiveis).")
+    parser.add_argument("--threshold", type=float, default=0.98, help="Acuracia minima (0-1).")
+    parser.add_argument("--limit", type=int, default=0, help="Limita o numero de PDFs (0 = todos).")
+    parser.add_argument("--output", default="", help="Arquivo da escolha (padrao: PDF_BACKEND_CHOICE_PATH ou cache/pdf_backend.json).")
+    parser.add_argument("--no-save", action="store_true", help="Apenas mostra o resultado.")
+    args = parser.parse_args()
+
+    from pdf_backends import BACKENDS, DEFAULT_CHOICE_PATH, available_backends
+
+    corpus = Path(args.corpus)
+    pdfs = sorted(corpus.rglob("*.pdf"))
+    if args.limit > 0:
+        pdfs = pdfs[: args.limit]
+    if not pdfs:
+        print(f"ERRO: nenhum PDF encontrado em {corpus}")
+        return 2
+    fields = [f.strip() for f in args.fields.split(",") if f.strip()]
+    names = [b.strip() for b in args.backends.split(",") if b.strip()] or available_backends()
+    names = [n for n in names if n in BACKENDS and BACKENDS[n]().available()]
+    if not names:
+        print("ERRO: nenhum backend disponivel.")
+        return 2
+
+    results: dict[str, dict] = {}
+    for name in names:
+        print(f"Medindo {name} em {len(pdfs)} PDFs...")
+        results[name] = run_backend(BACKENDS[name](), pdfs, fields)
+
+    if args.truth:
+        truth = json.loads(Path(args.truth).read_text(encoding="utf-8"))
+    else:
+        ref = results.get("pypdf") or run_backend(BACKENDS["pypdf"](), pdfs, fields)
+        truth = ref["fields"]
+
+    summary = []
+    for name, r in results.items():
+        secs = max(r["segundos"], 1e-9)
+        summary.append({
+            "backend": name,
+            "acuracia": round(accuracy(r["fields"], truth, fields), 4),
+            "docs_por_segundo": round(len(pdfs) / secs, 2),
+            "paginas_por_segundo": round(r["paginas"] / secs, 2),
+            "segundos": round(r["segundos"], 3),
+            "erros": r["erros"],
+        })
+    for row in summary:
+        print(
+            f"{row['backend']:>10}: acuracia={row['acuracia']:.2%} "
+            f"{row['docs_por_segundo']} docs/s {row['paginas_por_segundo']} pag/s erros={row['erros']}"
+        )
+
+    eligible = [row for row in summary if row["acuracia"] >= args.threshold]
+    if not eligible:
+        print(f"Nenhum backend atingiu {args.threshold:.0%}; mantendo pypdf.")
+        chosen = "pypdf"
+    else:
+        chosen = max(eligible, key=lambda row: row["paginas_por_segundo"])["backend"]
+    print(f"Backend escolhido: {chosen}")
+
+    if not args.no_save:
+        out = Path(args.output or os.getenv("PDF_BACKEND_CHOICE_PATH", DEFAULT_CHOICE_PATH))
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps({
+            "backend": chosen,
+            "threshold": args.threshold,
+            "corpus": str(corpus),
+            "documentos": len(pdfs),
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "resultados": summary,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Escolha gravada em {out} (use PDF_TEXT_BACKEND=auto).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
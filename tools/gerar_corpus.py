@@ -0,0 +1,65 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Gera processos sinteticos (PDFs + planilhas de exportacao APO-PEN) para testes de carga offline."
+    )
+    parser.add_argument("--output", default="corpus_sintetico", help="Pasta de saida.")
+    parser.add_argument("--processos", type=int, default=200, help="Processos com PDFs gerados.")
+    parser.add_argument("--linhas", type=int, default=0, help="Linhas das planilhas (padrao: igual a --processos; ate 100000+).")
+    parser.add_argument("--formatos", default="xlsx,xls", help="Planilhas a gerar: xlsx, xls (separados por virgula; vazio = nenhuma).")
+    parser.add_argument("--paginas", type=int, default=1, help="Paginas de texto corrido por PDF (aumenta o tamanho).")
+    parser.add_argument("--seed", type=int, default=1234, help="Semente (mesma semente = mesmo corpus).")
+    args = parser.parse_args()
+
+    from corpus_sintetico import escrever_pdfs, escrever_xls, escrever_xlsx, gerar_corpus, linha_planilha
+
+    out = Path(args.output)
+    pdf_dir = out / "pdfs"
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+    linhas_total = args.linhas or args.processos
+    total = max(args.processos, linhas_total)
+    formatos = [f.strip().lower() for f in args.formatos.split(",") if f.strip()]
+
+    started = time.perf_counter()
+    linhas: list[list[str]] = []
+    with (out / "gabarito.jsonl").open("w", encoding="utf-8") as gabarito:
+        for i, doc in enumerate(gerar_corpus(total, seed=args.seed, paginas_prosa=args.paginas)):
+            if i < args.processos:
+                escrever_pdfs(doc, pdf_dir)
+                registro = {"processo": doc["processo"], "modelo": doc["modelo"], "peca": doc["peca"], **doc["verdade"]}
+                gabarito.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            if i < linhas_total and formatos:
+                linhas.append(linha_planilha(doc))
+            if (i + 1) % 10000 == 0:
+                print(f"{i + 1}/{total} processos gerados...")
+    print(f"PDFs: {args.processos} processos em {pdf_dir} (gabarito em {out / 'gabarito.jsonl'}).")
+
+    for fmt in formatos:
+        path = out / f"apo_pen_export.{fmt}"
+        try:
+            if fmt == "xlsx":
+                n = escrever_xlsx(path, linhas)
+            elif fmt == "xls":
+                n = escrever_xls(path, linhas)
+            else:
+                print(f"Aviso: formato de planilha desconhecido '{fmt}'.")
+                continue
+        except ImportError as e:
+            print(f"Aviso: {fmt} nao gerado ({e}).")
+            continue
+        print(f"Planilha {path}: {n} linhas.")
+    print(f"Concluido em {time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())